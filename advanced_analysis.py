@@ -1,12 +1,35 @@
 # advanced_analysis.py (Advanced Analysis Page)
 
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 
 # Import shared utility functions and chart functions
-from utils import apply_shared_filters
+from utils import chart_fragment, shared_filter_selection
 from enhanced_dashboard_charts import kpi_heatmap, kpi_boxplot, kpi_comparison_scatter
+from kpi_engine import cached_kpis, normalize_kpis, safe_divide
+
+@chart_fragment
+def render_kpi_comparison(metric_df):
+    """
+    Renders a bar chart comparing one selected KPI across wells.
+
+    Args:
+        metric_df (pd.DataFrame): Per-well KPI metrics.
+    """
+    st.subheader("📊 Compare Metrics")
+    # Select a KPI for comparison bar chart
+    kpi_options = metric_df.columns[2:].tolist()
+    if not kpi_options:
+        st.info("No calculated KPIs available for comparison.")
+        return
+
+    selected_metric = st.selectbox("Select Metric", kpi_options, key="advanced_analysis_metric_select")
+    if selected_metric:
+        fig = px.bar(metric_df, x="Well_Name", y=selected_metric, color="Operator", 
+                     title=f"{selected_metric} across Wells")
+        fig.update_layout(xaxis_tickangle=45)
+        st.plotly_chart(fig, use_container_width=True)
+
 
 def render_advanced_analysis(df):
     """
@@ -16,7 +39,8 @@ def render_advanced_analysis(df):
         df (pd.DataFrame): The raw input DataFrame.
     """
     st.title("📌 Advanced Analysis Dashboard")
-    filtered_df = apply_shared_filters(df) # Apply shared filters
+    selection = shared_filter_selection(df) # Apply shared filters
+    filtered_df = df.iloc[selection.positions]
 
     if filtered_df.empty:
         st.info("No data available for Advanced Analysis with current filters.")
@@ -29,38 +53,8 @@ def render_advanced_analysis(df):
     screen_area = st.sidebar.number_input("Area per Screen (sq ft)", value=2.0, format="%.1f", key="adv_screen_area")
     unit = st.sidebar.radio("Normalize by", ["None", "Feet", "Hours", "Days"], key="adv_normalize_unit")
 
-    def safe_div(n, d):
-        """Safely divides n by d, returning 0 if d is zero or NaN."""
-        if pd.isna(n) or pd.isna(d) or d == 0:
-            return 0
-        return n / d
-
-    metrics = []
-    for _, row in filtered_df.iterrows():
-        # Use .get() with default values to handle potentially missing columns gracefully
-        haul = row.get("Haul_OFF", 0)
-        intlen = row.get("IntLength", 0)
-        hole = row.get("Hole_Size", 1) # Avoid division by zero
-        sce = row.get("Total_SCE", 0)
-        bo, water, chem = row.get("Base_Oil", 0), row.get("Water", 0), row.get("Chemicals", 0)
-        rop = row.get("ROP", 0)
-
-        metrics.append({
-            "Well_Name": row.get("Well_Name", "N/A"),
-            "Operator": row.get("Operator", "N/A"),
-            # Ensure calculations handle potential zero/NaN values correctly
-            "Shaker Throughput Efficiency": safe_div(sce, sce) * 100 if sce > 0 else 0, # If SCE is 0, efficiency is 0
-            "Cuttings Volume Ratio": safe_div(haul, intlen),
-            "Screen Loading Index": safe_div(total_flow_rate, number_of_screens * screen_area),
-            "Fluid Retention on Cuttings (%)": safe_div(sce, sce) * 100 if sce > 0 else 0,
-            "Drilling Intensity Index": safe_div(rop, hole),
-            "Fluid Loading Index": safe_div(bo + water + chem, intlen),
-            "Chemical Demand Rate": safe_div(chem, intlen),
-            "Mud Retention Efficiency (%)": 100 - (safe_div(sce, sce) * 100 if sce > 0 else 0),
-            "Downstream Solids Loss": 100 - (safe_div(sce, sce) * 100 if sce > 0 else 0)
-        })
-
-    metric_df = pd.DataFrame(metrics)
+    # KPIs come from columns cached per dataset version; only those whose inputs changed are recomputed
+    metric_df = cached_kpis(df, selection.positions, total_flow_rate, number_of_screens, screen_area)
 
     # Apply normalization based on selected unit
     divisor = None
@@ -69,12 +63,9 @@ def render_advanced_analysis(df):
     elif unit == "Hours" and "Drilling_Hours" in filtered_df.columns:
         divisor = filtered_df["Drilling_Hours"].sum()
     elif unit == "Days" and "Drilling_Hours" in filtered_df.columns:
-        divisor = safe_div(filtered_df["Drilling_Hours"].sum(), 24)
+        divisor = float(safe_divide(filtered_df["Drilling_Hours"].sum(), 24))
     # If divisor is 0 or None, no normalization will be applied
-    
-    if divisor and divisor != 0:
-        for col in metric_df.columns[2:]: # Apply normalization to KPI columns
-            metric_df[col] = metric_df[col].apply(lambda x: safe_div(x, divisor))
+    metric_df = normalize_kpis(metric_df, divisor)
 
     st.subheader("📋 KPI Summary")
     # Display average of each KPI
@@ -83,18 +74,7 @@ def render_advanced_analysis(df):
         with kpi_cols[i % 3]:
             st.metric(col, f"{metric_df[col].mean():.2f}")
 
-    st.subheader("📊 Compare Metrics")
-    # Select a KPI for comparison bar chart
-    kpi_options = metric_df.columns[2:].tolist()
-    if not kpi_options:
-        st.info("No calculated KPIs available for comparison.")
-    else:
-        selected_metric = st.selectbox("Select Metric", kpi_options, key="advanced_analysis_metric_select")
-        if selected_metric:
-            fig = px.bar(metric_df, x="Well_Name", y=selected_metric, color="Operator", 
-                         title=f"{selected_metric} across Wells")
-            fig.update_layout(xaxis_tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+    render_kpi_comparison(metric_df)
 
     kpi_heatmap(metric_df) # Call KPI heatmap
     kpi_boxplot(metric_df) # Call KPI boxplot
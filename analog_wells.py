@@ -0,0 +1,105 @@
+# analog_wells.py (Analog-Well Nearest-Neighbor Search over Standardized KPIs)
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from well_summary import get_well_summary
+
+# Per-well features two wells are compared on: the radar KPIs plus hole size and depth
+ANALOG_FEATURES = ["ROP", "Dilution_Ratio", "Discard Ratio", "AMW", "Haul_OFF", "Hole_Size", "MD Depth"]
+
+DEFAULT_ANALOGS = 5
+
+
+class AnalogIndex:
+    """
+    Standardized feature vectors of every well, for nearest-neighbor analog search.
+
+    Each feature is standardized to zero mean and unit variance across wells. The
+    distance between two wells is the Euclidean distance over the features both
+    have, rescaled to the full feature count so wells with a missing value stay
+    comparable. Queries are batched: distances from any number of wells to every
+    well come from a few matrix products.
+
+    Args:
+        well_table (pd.DataFrame): Per-well means indexed by 'Well_Name' (see well_summary).
+        features (list): Feature columns (those missing from the table are skipped).
+    """
+
+    def __init__(self, well_table, features=ANALOG_FEATURES):
+        self.features = [col for col in features if col in well_table.columns]
+        self.wells = well_table.index
+        values = well_table[self.features].to_numpy(dtype="float64", na_value=np.nan)
+        with np.errstate(all="ignore"):
+            mean = np.nanmean(values, axis=0) if len(values) else np.zeros(len(self.features))
+            std = np.nanstd(values, axis=0) if len(values) else np.ones(len(self.features))
+        std = np.where(np.isnan(std) | (std == 0), 1.0, std)
+        standardized = (values - mean) / std
+        self.valid = (~np.isnan(standardized)).astype("float64")
+        self.z = np.nan_to_num(standardized)
+        self.z_squared = self.z ** 2
+
+    def __len__(self):
+        return len(self.wells)
+
+    def nearest(self, queries, k=DEFAULT_ANALOGS, candidates=None):
+        """
+        Returns the k nearest wells of each query well (a well is never its own analog).
+
+        Args:
+            queries (np.ndarray): Positions of the query wells in ``wells``.
+            k (int): Number of analogs per query.
+            candidates (np.ndarray, optional): Boolean mask of the wells allowed as analogs.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Analog positions and distances, shape
+            (len(queries), k), nearest first; padded with -1 / inf when fewer wells qualify.
+        """
+        queries = np.asarray(queries, dtype=np.int64)
+        z, valid, z_squared = self.z[queries], self.valid[queries], self.z_squared[queries]
+        # Sum over shared features of (a - b)^2 = a^2 + b^2 - 2ab, with missing features zeroed
+        shared = valid @ self.valid.T
+        squared = z_squared @ self.valid.T + valid @ self.z_squared.T - 2 * z @ self.z.T
+        distances = np.full(squared.shape, np.inf)
+        np.sqrt(np.maximum(squared, 0) * len(self.features) / np.maximum(shared, 1), out=distances,
+                where=shared > 0)
+        distances[np.arange(len(queries)), queries] = np.inf
+        if candidates is not None:
+            distances[:, ~candidates] = np.inf
+
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0))
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(distances, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_distances = np.take_along_axis(distances, top, axis=1)
+        top[np.isinf(top_distances)] = -1
+        return top, top_distances
+
+    def analogs(self, well_name, k=DEFAULT_ANALOGS, candidates=None):
+        """
+        Returns the top-k analogs of a well.
+
+        Args:
+            well_name (str): The well to find analogs for.
+            k (int): Number of analogs.
+            candidates (list-like, optional): Names of the wells allowed as analogs.
+
+        Returns:
+            pd.DataFrame: 'Well_Name' and 'Distance' (in standard deviations), nearest first;
+            empty if the well is unknown.
+        """
+        if well_name not in self.wells:
+            return pd.DataFrame({"Well_Name": pd.Series(dtype=str), "Distance": pd.Series(dtype="float64")})
+        mask = None if candidates is None else self.wells.isin(candidates)
+        top, distances = self.nearest([self.wells.get_loc(well_name)], k, mask)
+        found = top[0] >= 0
+        return pd.DataFrame({"Well_Name": self.wells[top[0][found]], "Distance": distances[0][found]})
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_analog_index(_df, version):
+    """Returns the analog index of a dataset version, shared across sessions."""
+    return AnalogIndex(get_well_summary(_df, version).table)
@@ -1,33 +1,39 @@
 # app.py (Main Streamlit Application)
 
+import importlib
+import os
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 
 # Import shared utility functions
-from utils import apply_shared_filters
-
-# Import all chart functions from enhanced_dashboard_charts
-from enhanced_dashboard_charts import (
-    radar_chart_multi_kpi,
-    cumulative_wells_chart,
-    fluid_pie_chart_by_operator,
-    kpi_heatmap,
-    kpi_boxplot,
-    stacked_cost_chart,
-    rop_vs_depth_scatter,
-    avg_rop_over_time_chart,
-    kpi_comparison_scatter,
-    rop_by_operator_bar_chart
-)
-
-# Import render functions for each page
-from multi_well import render_multi_well
-from sales_analysis import render_sales_analysis
-from advanced_analysis import render_advanced_analysis
-from cost_estimator import render_cost_estimator
-from executive_summary import render_executive_summary
+from utils import data_scope_selection
+from data_loader import memory_per_row
+from partitions import partition_catalog, load_scoped_data
+from ingest import ingest_csv
+
+# Sidebar pages and the (module, function) rendering each. A page's module, and the
+# Plotly and chart modules it imports, are only imported once the page is selected.
+PAGES = {
+    "Multi-Well Comparison": ("multi_well", "render_multi_well"),
+    "Sales Analysis": ("sales_analysis", "render_sales_analysis"),
+    "Advanced Analysis": ("advanced_analysis", "render_advanced_analysis"),
+    "Cost Estimator": ("cost_estimator", "render_cost_estimator"),
+    "Executive Summary": ("executive_summary", "render_executive_summary"),
+}
+
+
+def load_page(name):
+    """
+    Returns the render function of a page, importing its module on first use.
+
+    Args:
+        name (str): A key of PAGES.
+
+    Returns:
+        callable: The page's render function, taking the dataset.
+    """
+    module_name, function_name = PAGES[name]
+    return getattr(importlib.import_module(module_name), function_name)
 
 
 # Set Streamlit page configuration ONCE at the top
@@ -71,15 +77,46 @@ def load_styles():
     }
     </style>
     """, unsafe_allow_html=True)
-    
+
+
+# ------------------------- INGESTION -------------------------
+def render_ingest_panel(path):
+    """Sidebar panel appending the new rows of an uploaded CSV drop to the dataset."""
+    with st.sidebar.expander("➕ Append Well Records"):
+        upload = st.file_uploader("New well rows (CSV, same format as the dataset)", type="csv", key="ingest_upload")
+        if upload is not None and st.button("Ingest", key="ingest_button"):
+            try:
+                result = ingest_csv(upload, path)
+            except (ValueError, KeyError, RuntimeError, OSError) as e:
+                st.error(f"Could not ingest {upload.name}: {e}")
+                return
+            st.success(f"Added {result.added:,} rows from {upload.name}.")
+            if result.below_watermark or result.duplicates:
+                st.caption(f"Skipped {result.below_watermark:,} already-ingested rows and "
+                           f"{result.duplicates:,} duplicate API numbers.")
+            if result.parse_errors:
+                st.warning("Some values could not be parsed and were treated as missing: " +
+                           ", ".join(f"{col} ({count})" for col, count in result.parse_errors.items()))
+
 # ------------------------- MAIN ENTRY POINT -------------------------
 if __name__ == "__main__":
     load_styles() # Load custom CSS styles
 
-    # Load data from CSV
+    # Ingest before loading so the appended rows show up in this run. Anyone who can open
+    # the app could append rows, so the panel is opt-in (WELL_DATA_INGEST=1); ingest.py
+    # appends drops from the command line either way
+    ingest_enabled = os.environ.get("WELL_DATA_INGEST", "").lower() in ("1", "true", "yes")
+    if ingest_enabled and os.path.exists("Refine Sample.csv"):
+        render_ingest_panel("Refine Sample.csv")
+
+    # Load data from the columnar cache (re-parses the CSV only when it changes)
     try:
-        df = pd.read_csv("Refine Sample.csv")
-        df["TD_Date"] = pd.to_datetime(df["TD_Date"], errors='coerce')
+        # WELL_DATA_COMPACT=1 opts into categoricals and downcast numerics to cut per-session memory
+        compact = os.environ.get("WELL_DATA_COMPACT", "").lower() in ("1", "true", "yes")
+        # Only the partitions inside the chosen basin / state / TD year scope are read
+        catalog = partition_catalog("Refine Sample.csv")
+        scope = data_scope_selection(catalog) if catalog is not None else None
+        df = load_scoped_data("Refine Sample.csv", scope, compact=compact, catalog=catalog)
     except FileNotFoundError:
         st.error("Error: 'Refine Sample.csv' not found. Please ensure the CSV file is in the same directory.")
         st.stop() # Stop the app if data is not found
@@ -87,24 +124,14 @@ if __name__ == "__main__":
         st.error(f"Error loading or processing data: {e}")
         st.stop()
 
+    # Surface values the schema could not convert (they are loaded as missing)
+    if df.attrs.get("parse_errors"):
+        st.sidebar.warning("Some values could not be parsed and were treated as missing: " +
+                           ", ".join(f"{col} ({count})" for col, count in df.attrs["parse_errors"].items()))
+    st.sidebar.caption(f"{len(df):,} rows · {memory_per_row(df):,.0f} bytes/row" + (" (compact)" if compact else ""))
+
     # Sidebar navigation
-    page = st.sidebar.radio("📂 Navigate", [
-        "Multi-Well Comparison",
-        "Sales Analysis",
-        "Advanced Analysis",
-        "Cost Estimator",
-        "Executive Summary"
-    ])
-
-    # Render the selected page based on sidebar selection
-    if page == "Multi-Well Comparison":
-        render_multi_well(df)
-    elif page == "Sales Analysis":
-        render_sales_analysis(df)
-    elif page == "Advanced Analysis":
-        render_advanced_analysis(df)
-    elif page == "Cost Estimator":
-        render_cost_estimator(df)
-    elif page == "Executive Summary":
-        render_executive_summary(df)
+    page = st.sidebar.radio("📂 Navigate", list(PAGES))
 
+    # Render the selected page (imported on demand, see PAGES)
+    load_page(page)(df)
@@ -0,0 +1,205 @@
+# bootstrap.py (Vectorized Bootstrap Confidence Intervals)
+
+from collections import namedtuple
+
+import numpy as np
+
+from cost_model import cost_components
+from parallel import map_chunks
+
+# A point estimate with its confidence interval
+ConfidenceInterval = namedtuple("ConfidenceInterval", ["estimate", "low", "high"])
+
+# Resampled elements (resamples x rows) materialized per chunk, bounding index-matrix memory
+CHUNK_ELEMENTS = 4_000_000
+
+DEFAULT_RESAMPLES = 10_000
+
+
+def excludes_zero(ci):
+    """Returns True if the interval lies entirely above or below zero (a significant difference)."""
+    return ci.low > 0 or ci.high < 0
+
+
+def _resampled_sums_chunk(seed, values, n_resamples):
+    """Column sums of ``n_resamples`` bootstrap resamples, drawn as one index matrix (runs in a worker)."""
+    rng = np.random.default_rng(seed)
+    n_rows = len(values)
+    indices = rng.integers(0, n_rows, size=(n_resamples, n_rows))
+    # How often each row is drawn in each resample, then every column's sums in one matrix product
+    indices += np.arange(n_resamples)[:, None] * n_rows
+    counts = np.bincount(indices.ravel(), minlength=n_resamples * n_rows).reshape(n_resamples, n_rows)
+    return counts @ values
+
+
+def resampled_sums(values, n_resamples=DEFAULT_RESAMPLES, seed=0, n_jobs=1):
+    """
+    Column sums of bootstrap resamples of the rows of ``values``.
+
+    Resamples are drawn as index matrices of up to CHUNK_ELEMENTS entries; the chunks
+    are seeded independently and can be spread over the shared process pool.
+
+    Args:
+        values (np.ndarray): Array of shape (rows, columns); NaNs should already be filled.
+        n_resamples (int): Number of bootstrap resamples.
+        seed (int | np.random.SeedSequence): Random seed.
+        n_jobs (int): Worker processes (1 runs in-process).
+
+    Returns:
+        np.ndarray: Array of shape (n_resamples, columns); all zeros if there are no rows.
+    """
+    values = np.asarray(values, dtype="float64")
+    if values.ndim == 1:
+        values = values[:, None]
+    if len(values) == 0:
+        return np.zeros((n_resamples, values.shape[1]))
+    per_chunk = max(1, CHUNK_ELEMENTS // len(values))
+    chunk_sizes = [per_chunk] * (n_resamples // per_chunk)
+    if n_resamples % per_chunk:
+        chunk_sizes.append(n_resamples % per_chunk)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(len(chunk_sizes))
+    results = map_chunks(_resampled_sums_chunk, [(chunk_seed, values, size)
+                                                 for chunk_seed, size in zip(seeds, chunk_sizes)], n_jobs)
+    return np.vstack(results)
+
+
+def _mean_inputs(values):
+    """Stacks NaN-filled values with a validity column, so resampled means skip missing values."""
+    values = np.asarray(values, dtype="float64")
+    valid = ~np.isnan(values)
+    return np.column_stack([np.where(valid, values, 0.0), valid])
+
+
+def _resampled_means(values, n_resamples, seed, n_jobs):
+    sums = resampled_sums(_mean_inputs(values), n_resamples, seed, n_jobs)
+    return np.divide(sums[:, 0], sums[:, 1], out=np.full(n_resamples, np.nan), where=sums[:, 1] > 0)
+
+
+def _interval(estimate, resampled, confidence):
+    tail = (1 - confidence) / 2 * 100
+    resampled = resampled[~np.isnan(resampled)]
+    if resampled.size == 0:
+        return ConfidenceInterval(float(estimate), np.nan, np.nan)
+    low, high = np.percentile(resampled, [tail, 100 - tail])
+    return ConfidenceInterval(float(estimate), float(low), float(high))
+
+
+def mean_ci(values, n_resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=0, n_jobs=1):
+    """
+    Percentile bootstrap confidence interval of a mean (missing values are skipped).
+
+    Args:
+        values (array-like): Sample values.
+        n_resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level, e.g. 0.95.
+        seed (int): Random seed.
+        n_jobs (int): Worker processes (1 runs in-process).
+
+    Returns:
+        ConfidenceInterval: The sample mean and its interval (NaN if there are no values).
+    """
+    values = np.asarray(values, dtype="float64")
+    estimate = np.nanmean(values) if (~np.isnan(values)).any() else np.nan
+    return _interval(estimate, _resampled_means(values, n_resamples, seed, n_jobs), confidence)
+
+
+def mean_difference_ci(a, b, n_resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=0, n_jobs=1):
+    """
+    Percentile bootstrap confidence interval of ``mean(b) - mean(a)``.
+
+    Each group is resampled independently (missing values are skipped).
+
+    Args:
+        a (array-like): Values of the first group (e.g. Derrick wells).
+        b (array-like): Values of the second group (e.g. Non-Derrick wells).
+        n_resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level, e.g. 0.95.
+        seed (int): Random seed.
+        n_jobs (int): Worker processes (1 runs in-process).
+
+    Returns:
+        ConfidenceInterval: The difference of the sample means and its interval.
+    """
+    seed_a, seed_b = np.random.SeedSequence(seed).spawn(2)
+    a, b = np.asarray(a, dtype="float64"), np.asarray(b, dtype="float64")
+    if not (~np.isnan(a)).any() or not (~np.isnan(b)).any():
+        return ConfidenceInterval(np.nan, np.nan, np.nan)
+    estimate = np.nanmean(b) - np.nanmean(a)
+    resampled = _resampled_means(b, n_resamples, seed_b, n_jobs) - _resampled_means(a, n_resamples, seed_a, n_jobs)
+    return _interval(estimate, resampled, confidence)
+
+
+# Well data columns the cost model sums over a cohort
+COST_SUM_COLUMNS = ["Total_Dil", "Haul_OFF", "IntLength"]
+
+
+def _column(df, col):
+    return df[col].to_numpy(dtype="float64", na_value=np.nan) if col in df.columns else np.full(len(df), np.nan)
+
+
+def resample_cohort(df, mean_columns=(), n_resamples=DEFAULT_RESAMPLES, seed=0, n_jobs=1):
+    """
+    Bootstrap resamples of a cohort's cost-model totals and column means.
+
+    Every statistic is taken from the same index matrix, so one pass serves the cost
+    intervals and the mean differences. The resamples do not depend on the cost
+    configuration and can be cached per filter selection.
+
+    Args:
+        df (pd.DataFrame): The rows of one cohort.
+        mean_columns (list): Columns whose resampled means are returned (missing values skipped).
+        n_resamples (int): Number of bootstrap resamples.
+        seed (int | np.random.SeedSequence): Random seed.
+        n_jobs (int): Worker processes (1 runs in-process).
+
+    Returns:
+        dict: Column -> array of n_resamples values: sums for COST_SUM_COLUMNS (missing
+        values count as 0), means for mean_columns (NaN when a resample has no values).
+    """
+    sum_values = [np.nan_to_num(_column(df, col)) for col in COST_SUM_COLUMNS]
+    mean_values = [_mean_inputs(_column(df, col)) for col in mean_columns]
+    sums = resampled_sums(np.column_stack(sum_values + mean_values), n_resamples, seed, n_jobs)
+
+    resamples = {col: sums[:, i] for i, col in enumerate(COST_SUM_COLUMNS)}
+    for i, col in enumerate(mean_columns):
+        total, count = sums[:, len(COST_SUM_COLUMNS) + 2 * i], sums[:, len(COST_SUM_COLUMNS) + 2 * i + 1]
+        resamples[col] = np.divide(total, count, out=np.full(n_resamples, np.nan), where=count > 0)
+    return resamples
+
+
+def difference_ci(estimate, a_resampled, b_resampled, confidence=0.95):
+    """Confidence interval of a ``b - a`` difference from two independent sets of resampled statistics."""
+    return _interval(estimate, np.asarray(b_resampled, dtype="float64") - np.asarray(a_resampled, dtype="float64"),
+                     confidence)
+
+
+def cost_delta_ci(derrick_totals, nond_totals, derrick_resamples, nond_resamples, derrick_config, nond_config,
+                  confidence=0.95):
+    """
+    Confidence intervals of the Non-Derrick minus Derrick total cost and cost per foot.
+
+    Cost per foot is a ratio of sums, so it is recomputed from each resample's totals
+    rather than averaged per well.
+
+    Args:
+        derrick_totals (dict): Derrick cohort totals (the point estimate).
+        nond_totals (dict): Non-Derrick cohort totals.
+        derrick_resamples (dict): Output of resample_cohort for the Derrick cohort.
+        nond_resamples (dict): Output of resample_cohort for the Non-Derrick cohort.
+        derrick_config (dict): Derrick cost configuration.
+        nond_config (dict): Non-Derrick cost configuration.
+        confidence (float): Confidence level, e.g. 0.95.
+
+    Returns:
+        dict: 'Total Cost' and 'Cost/ft' -> ConfidenceInterval of the delta.
+    """
+    intervals = {}
+    derrick, nond = cost_components(derrick_totals, derrick_config), cost_components(nond_totals, nond_config)
+    derrick_boot = cost_components(derrick_resamples, derrick_config)
+    nond_boot = cost_components(nond_resamples, nond_config)
+    for name in ["Total Cost", "Cost/ft"]:
+        estimate = float(nond[name]) - float(derrick[name])
+        intervals[name] = difference_ci(estimate, derrick_boot[name], nond_boot[name], confidence)
+    return intervals
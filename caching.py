@@ -0,0 +1,95 @@
+# caching.py (Bounded In-Process Caches)
+
+import sys
+import threading
+from collections import OrderedDict
+
+# Marks a miss, so that None can be cached like any other value
+_MISSING = object()
+
+
+class BoundedLRUCache:
+    """
+    Thread-safe LRU cache bounded by entry count and approximate memory.
+
+    Instances are meant to be created through ``st.cache_resource`` so that every
+    session on the server shares them. Entries are evicted least-recently-used first
+    whenever either bound is exceeded.
+
+    Args:
+        max_entries (int): Maximum number of entries kept.
+        max_bytes (int, optional): Maximum total size of the entries, as measured by ``sizeof``.
+        sizeof (callable, optional): Returns the size in bytes of a cached value.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None, sizeof=sys.getsizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Returns the cached value (marking it most recently used) or ``default``."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Stores a value, evicting old entries to stay within the bounds."""
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return  # Larger than the whole cache, never worth keeping
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or \
+                    (self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for ``key``, computing and storing it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def items(self):
+        """Returns a snapshot of the (key, value) pairs, least recently used first."""
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Returns the entry count, size and hit/miss/eviction counters."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,12 +1,335 @@
 # cost_estimator.py (Cost Estimator Page)
 
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
 # Import shared utility functions and chart functions
-from utils import apply_shared_filters
-from enhanced_dashboard_charts import stacked_cost_chart
+from utils import shared_filter_selection, filter_state_key, facet_label
+from caching import BoundedLRUCache
+from data_loader import dataset_version
+from filter_index import get_filter_index
+from enhanced_dashboard_charts import (
+    stacked_cost_chart, tornado_chart, break_even_surface_chart, cohort_cost_ranking_chart,
+    cost_distribution_chart
+)
+from cost_model import (
+    COST_PARAMS, cost_components, scenario_sweep, tornado_analysis, break_even_surface,
+    cohort_totals, cohort_costs
+)
+from simulation import DISTRIBUTIONS, run_simulation
+from bootstrap import resample_cohort, difference_ci, cost_delta_ci, excludes_zero
+
+# Cascading filters applied within each cohort: (column, label, widget key suffix)
+COHORT_FILTERS = [
+    ("flowline_Shakers", "Select Flowline Shaker", "shaker_select"),
+    ("Operator", "Select Operator", "operator_select"),
+    ("Contractor", "Select Contractor", "contract_select"),
+    ("Well_Name", "Select Well Name", "well_select"),
+]
+
+
+def cohort_filters(index, mask, key_prefix):
+    """
+    Renders the cascading shaker/operator/contractor/well selectboxes for one cohort.
+
+    Each dropdown lists the values (with well counts) present in the rows left by the
+    previous selections, read from the facet counts of the precomputed filter index.
+
+    Args:
+        index (FilterIndex): Filter index of the full dataset.
+        mask (np.ndarray): Boolean mask of the cohort's rows.
+        key_prefix (str): Prefix for the widget keys (e.g. "d" or "nd").
+
+    Returns:
+        tuple[np.ndarray, tuple]: The cohort mask narrowed by the selections, and the selections.
+    """
+    selections = []
+    for col, label, key_suffix in COHORT_FILTERS:
+        if col not in index.values:
+            continue
+        counts = index.facet_counts(mask, [col])[col]
+        selected = st.selectbox(label, ["All"] + list(counts), key=f"{key_prefix}_{key_suffix}",
+                                format_func=facet_label(counts))
+        selections.append(selected)
+        if selected != "All":
+            mask = mask & index.value_mask(col, selected)
+    return mask, tuple(selections)
+
+
+def subset_totals(sub_df):
+    """
+    Aggregates the well data a cost calculation depends on.
+
+    Args:
+        sub_df (pd.DataFrame): The rows of one cohort.
+
+    Returns:
+        dict: Sums of 'Total_Dil', 'Haul_OFF' and 'IntLength', means of 'LGS' and 'DSRE'
+        and the max 'MD Depth' (0 for missing or empty columns).
+    """
+    def aggregate(col, how):
+        if col not in sub_df.columns or sub_df[col].empty:
+            return 0
+        return getattr(sub_df[col], how)()
+
+    return {
+        "Total_Dil": aggregate("Total_Dil", "sum"),
+        "Haul_OFF": aggregate("Haul_OFF", "sum"),
+        "IntLength": aggregate("IntLength", "sum"),
+        "LGS": aggregate("LGS", "mean"),
+        "DSRE": aggregate("DSRE", "mean"),
+        "MD Depth": aggregate("MD Depth", "max"),
+    }
+
+
+@st.cache_resource
+def get_subset_totals_cache():
+    """Returns the cache of cohort totals, keyed by dataset version and filter selections."""
+    return BoundedLRUCache(max_entries=1024)
+
+
+# Well metrics whose Derrick vs Non-Derrick mean difference gets a confidence interval: column -> label
+BOOTSTRAP_METRICS = {"LGS": "Avg LGS%", "DSRE": "DSRE%"}
+
+
+@st.cache_resource
+def get_bootstrap_cache():
+    """Returns the cache of cohort bootstrap resamples, keyed by dataset version and filter selections."""
+    return BoundedLRUCache(max_entries=64, max_bytes=128 * 1024 * 1024,
+                           sizeof=lambda pair: sum(values.nbytes for resamples in pair for values in resamples.values()))
+
+
+def ci_caption(ci, template):
+    """Formats a delta's 95% confidence interval and whether it excludes zero."""
+    if np.isnan(ci.low):
+        return "95% CI unavailable"
+    verdict = "significant" if excludes_zero(ci) else "not significant"
+    return f"95% CI {template.format(ci.low)} – {template.format(ci.high)} ({verdict})"
+
+
+def calc_cost(totals, config, label):
+    """
+    Calculates various cost components and total cost per foot from a cohort's totals.
+    Includes LGS% and DSRE% if available.
+
+    Args:
+        totals (dict): Output of subset_totals for the cohort.
+        config (dict): Cost configuration (rates, prices, equipment).
+        label (str): Cohort label.
+
+    Returns:
+        dict: Cost components, cost per foot and performance metrics.
+    """
+    # Zero shaker life or zero footage are handled inside the vectorized cost model
+    costs = {name: float(value) for name, value in cost_components(totals, config).items()}
+
+    return {
+        "Label": label,
+        "Cost/ft": costs["Cost/ft"],
+        "Total Cost": costs["Total Cost"],
+        "Dilution": costs["Dilution"],
+        "Haul": costs["Haul"],
+        "Screen": costs["Screen"],
+        "Equipment": costs["Equipment"],
+        "Engineering": config["eng_cost"],
+        "Other": config["other_cost"],
+        "Avg LGS%": totals["LGS"] * 100,
+        "DSRE%": totals["DSRE"] * 100,
+        "Depth": totals["MD Depth"],
+    }
+
+
+# Cohort groupings for the ranking: label -> column (None = Derrick vs Non-Derrick)
+COHORT_GROUPINGS = {
+    "Shaker Type (Derrick / Non-Derrick)": None,
+    "Flowline Shaker": "flowline_Shakers",
+    "Operator": "Operator",
+    "Contractor": "Contractor",
+    "Well": "Well_Name",
+}
+
+
+def render_cohort_ranking(df, shared_mask, is_derrick, totals_key, derrick_config, nond_config):
+    """
+    Renders the N-way cohort comparison: every shaker model, operator, contractor or
+    well priced and ranked by cost per foot from one grouped pass.
+
+    Args:
+        df (pd.DataFrame): The full dataset.
+        shared_mask (np.ndarray): Rows left by the shared filters (only selected on a cache miss).
+        is_derrick (np.ndarray): Which rows use Derrick shakers.
+        totals_key (tuple): Cache key identifying the dataset version and shared filter state.
+        derrick_config (dict): Derrick configuration from the inputs above.
+        nond_config (dict): Non-Derrick configuration from the inputs above.
+    """
+    st.subheader("🏁 Cohort Cost Ranking")
+    group_col, config_col, top_col = st.columns(3)
+    grouping = group_col.selectbox("Compare cohorts by", list(COHORT_GROUPINGS), index=1, key="cohort_group_by")
+    config_label = config_col.radio("Cost configuration", ["Derrick", "Non-Derrick"], horizontal=True,
+                                    key="cohort_config")
+    top_n = top_col.slider("Cohorts to chart", 5, 100, 30, key="cohort_top_n")
+
+    column = COHORT_GROUPINGS[grouping]
+    if column is not None and column not in df.columns:
+        st.info(f"{grouping} data is not available for the cohort ranking.")
+        return
+
+    def compute_totals():
+        filtered_df = df[shared_mask]
+        by = column if column is not None else \
+            pd.Series(np.where(is_derrick[shared_mask], "Derrick", "Non-Derrick"), index=filtered_df.index)
+        return cohort_totals(filtered_df, by)
+
+    totals = get_subset_totals_cache().get_or_compute(totals_key + ("cohorts", grouping), compute_totals)
+    cohort_df = cohort_costs(totals, derrick_config if config_label == "Derrick" else nond_config)
+
+    cohort_cost_ranking_chart(cohort_df, grouping, top_n)
+    st.dataframe(cohort_df, use_container_width=True, hide_index=True)
+
+
+# Inputs offered in the scenario sweep by default
+DEFAULT_SWEEP_PARAMS = ["dil_rate", "haul_rate", "screen_price", "shaker_life", "num_shakers"]
+
+# Upper bound on swept combinations evaluated in one batch
+MAX_SWEEP_COMBINATIONS = 2_000_000
+
+
+def render_scenario_sweep(derrick_totals, nond_totals, derrick_config, nond_config):
+    """
+    Renders the scenario sweep: ranges for the cost inputs, every combination priced in
+    one batch, a tornado chart and a break-even surface for the cost-per-foot delta.
+
+    Args:
+        derrick_totals (dict): Derrick cohort totals.
+        nond_totals (dict): Non-Derrick cohort totals.
+        derrick_config (dict): Derrick configuration from the inputs above.
+        nond_config (dict): Non-Derrick configuration from the inputs above.
+    """
+    st.subheader("🧪 Scenario Sweep")
+    labels = dict(COST_PARAMS)
+    if not st.checkbox("Sweep cost inputs over ranges", key="sweep_enabled"):
+        return
+
+    side = st.radio("Apply swept values to", ["Derrick", "Non-Derrick", "Both"], horizontal=True, key="sweep_side")
+    base_config = nond_config if side == "Non-Derrick" else derrick_config
+    swept = st.multiselect("Inputs to sweep", list(labels), default=DEFAULT_SWEEP_PARAMS,
+                           format_func=labels.get, key="sweep_params")
+    steps = st.slider("Values per input", 2, 25, 7, key="sweep_steps")
+    if not swept:
+        st.info("Select at least one input to sweep.")
+        return
+
+    ranges = {}
+    for param in swept:
+        base = float(base_config[param])
+        low_col, high_col = st.columns(2)
+        low = low_col.number_input(f"{labels[param]} min", value=base * 0.5, key=f"sweep_{param}_min")
+        high = high_col.number_input(f"{labels[param]} max", value=base * 1.5, key=f"sweep_{param}_max")
+        ranges[param] = np.linspace(min(low, high), max(low, high), steps)
+
+    n_combinations = steps ** len(swept)
+    if n_combinations > MAX_SWEEP_COMBINATIONS:
+        st.warning(f"{n_combinations:,} combinations is too many; reduce the inputs or values per input.")
+        return
+
+    sweep_df = scenario_sweep(derrick_totals, nond_totals, derrick_config, nond_config, ranges, side)
+    derrick_cheaper = (sweep_df["Delta Cost/ft"] > 0).mean() * 100
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Scenarios Evaluated", f"{len(sweep_df):,}")
+    col2.metric("Derrick Cheaper In", f"{derrick_cheaper:.1f}%")
+    col3.metric("Cost/ft Delta Range", f"${sweep_df['Delta Cost/ft'].min():,.2f} – ${sweep_df['Delta Cost/ft'].max():,.2f}")
+
+    tornado_df, base_delta = tornado_analysis(derrick_totals, nond_totals, derrick_config, nond_config, ranges, side)
+    tornado_df["Parameter"] = tornado_df["Parameter"].map(labels)
+    tornado_chart(tornado_df, base_delta)
+
+    if len(swept) >= 2:
+        x_col, y_col = st.columns(2)
+        x_param = x_col.selectbox("Surface X-axis", swept, format_func=labels.get, key="sweep_surface_x")
+        y_options = [param for param in swept if param != x_param]
+        y_param = y_col.selectbox("Surface Y-axis", y_options, format_func=labels.get, key="sweep_surface_y")
+        x_values = np.linspace(ranges[x_param].min(), ranges[x_param].max(), 60)
+        y_values = np.linspace(ranges[y_param].min(), ranges[y_param].max(), 60)
+        delta = break_even_surface(derrick_totals, nond_totals, derrick_config, nond_config,
+                                   x_param, x_values, y_param, y_values, side)
+        break_even_surface_chart(x_values, y_values, delta, labels[x_param], labels[y_param])
+    else:
+        st.info("Sweep at least two inputs to see the break-even surface.")
+
+    st.download_button(
+        label="📥 Download Sweep Results",
+        data=sweep_df.rename(columns=labels).to_csv(index=False).encode('utf-8'), # Encode for download
+        file_name="cost_scenario_sweep.csv",
+        mime="text/csv"
+    )
+
+
+# Inputs given a distribution by default in the Monte Carlo simulation
+DEFAULT_SIMULATION_PARAMS = ["haul_rate", "screen_price", "shaker_life"]
+
+
+@st.cache_data(show_spinner="Running Monte Carlo simulation...", max_entries=16)
+def cached_simulation(derrick_totals, nond_totals, derrick_config, nond_config, specs, side, n_samples, seed):
+    """Runs (or reuses) a Monte Carlo simulation; results are small, so reruns with the same inputs are free."""
+    return run_simulation(derrick_totals, nond_totals, derrick_config, nond_config, specs, side, n_samples, seed)
+
+
+def distribution_inputs(param, label, base):
+    """Renders the distribution picker and parameters for one uncertain input; returns its spec."""
+    kind = st.selectbox(f"{label} distribution", list(DISTRIBUTIONS), key=f"mc_{param}_kind")
+    defaults = {"low": base * 0.8, "mode": base, "high": base * 1.2, "mean": base, "std": base * 0.1}
+    spec = {"kind": kind}
+    for name, col in zip(DISTRIBUTIONS[kind], st.columns(len(DISTRIBUTIONS[kind]))):
+        spec[name] = col.number_input(f"{name.capitalize()}", value=float(defaults[name]), key=f"mc_{param}_{name}_{kind}")
+    return spec
+
+
+def render_monte_carlo(derrick_totals, nond_totals, derrick_config, nond_config):
+    """
+    Renders the Monte Carlo simulation: distributions for uncertain cost inputs, sampled
+    against the filtered cohorts to give P10/P50/P90 cost per foot and the probability
+    that Derrick is cheaper.
+
+    Args:
+        derrick_totals (dict): Derrick cohort totals.
+        nond_totals (dict): Non-Derrick cohort totals.
+        derrick_config (dict): Derrick configuration from the inputs above.
+        nond_config (dict): Non-Derrick configuration from the inputs above.
+    """
+    st.subheader("🎲 Monte Carlo Cost Uncertainty")
+    labels = dict(COST_PARAMS)
+    if not st.checkbox("Simulate uncertain cost inputs", key="mc_enabled"):
+        return
+
+    side = st.radio("Apply sampled values to", ["Both", "Derrick", "Non-Derrick"], horizontal=True, key="mc_side",
+                    help="'Both' uses the same draw for both shaker types, e.g. for a market-wide haul-off rate.")
+    base_config = nond_config if side == "Non-Derrick" else derrick_config
+    uncertain = st.multiselect("Uncertain inputs", list(labels), default=DEFAULT_SIMULATION_PARAMS,
+                               format_func=labels.get, key="mc_params")
+    samples_col, seed_col = st.columns(2)
+    n_samples = samples_col.number_input("Samples", min_value=10_000, max_value=2_000_000, value=100_000,
+                                         step=10_000, key="mc_samples")
+    seed = seed_col.number_input("Random seed", min_value=0, value=42, step=1, key="mc_seed")
+    if not uncertain:
+        st.info("Select at least one uncertain input to simulate.")
+        return
+
+    specs = {param: distribution_inputs(param, labels[param], float(base_config[param])) for param in uncertain}
+    result = cached_simulation(derrick_totals, nond_totals, derrick_config, nond_config, specs, side,
+                               int(n_samples), int(seed))
+
+    percentiles = result["percentiles"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("P(Derrick Cheaper)", f"{result['prob_derrick_cheaper'] * 100:.1f}%")
+    col2.metric("Derrick P50 Cost/ft", f"${percentiles['Derrick']['P50']:,.2f}")
+    col3.metric("Non-Derrick P50 Cost/ft", f"${percentiles['Non-Derrick']['P50']:,.2f}")
+
+    summary = pd.DataFrame(percentiles).T.rename(index={"Delta": "Delta (Non-Derrick − Derrick)"})
+    st.dataframe(summary.style.format("${:,.2f}"), use_container_width=True)
+    cost_distribution_chart(result["histogram"], percentiles)
+
 
 def render_cost_estimator(df):
     """
@@ -18,70 +341,31 @@ def render_cost_estimator(df):
     st.title("💰 Flowline Shaker Cost Comparison")
     
     # Apply shared filters first
-    filtered_df_shared = apply_shared_filters(df)
+    selection = shared_filter_selection(df)
 
-    if filtered_df_shared.empty:
+    if len(selection.positions) == 0:
         st.info("No data available for Cost Estimator with current filters.")
         return
 
+    version = dataset_version(df)
+    index = get_filter_index(df, version)
+    shared_mask = np.zeros(len(df), dtype=bool)
+    shared_mask[selection.positions] = True
+    is_derrick = index.contains_mask("flowline_Shakers", "Derrick")
+
     col_d, col_nd = st.columns(2)
 
     # --- Derrick Filters and Data ---
     with col_d:
         st.subheader("🟩 Derrick")
-        # Filter for Derrick shakers from the already shared-filtered DataFrame
-        derrick_df_base = filtered_df_shared[filtered_df_shared["flowline_Shakers"].str.contains("Derrick", na=False)]
-
-        derrick_shaker_options = sorted(derrick_df_base["flowline_Shakers"].dropna().unique().tolist())
-        derrick_shaker = st.selectbox("Select Flowline Shaker", ["All"] + derrick_shaker_options, key="d_shaker_select")
-        if derrick_shaker != "All":
-            derrick_df_base = derrick_df_base[derrick_df_base["flowline_Shakers"] == derrick_shaker]
-
-        derrick_ops = sorted(derrick_df_base["Operator"].dropna().unique().tolist())
-        derrick_operator = st.selectbox("Select Operator", ["All"] + derrick_ops, key="d_operator_select")
-        if derrick_operator != "All":
-            derrick_df_base = derrick_df_base[derrick_df_base["Operator"] == derrick_operator]
-
-        derrick_contracts = sorted(derrick_df_base["Contractor"].dropna().unique().tolist())
-        derrick_contractor = st.selectbox("Select Contractor", ["All"] + derrick_contracts, key="d_contract_select")
-        if derrick_contractor != "All":
-            derrick_df_base = derrick_df_base[derrick_df_base["Contractor"] == derrick_contractor]
-
-        derrick_wells = sorted(derrick_df_base["Well_Name"].dropna().unique().tolist())
-        derrick_well = st.selectbox("Select Well Name", ["All"] + derrick_wells, key="d_well_select")
-        if derrick_well != "All":
-            derrick_df_base = derrick_df_base[derrick_df_base["Well_Name"] == derrick_well]
-        
-        derrick_df = derrick_df_base # This is the final filtered DataFrame for Derrick
-
+        # Derrick shakers within the shared-filtered rows
+        derrick_mask, derrick_selections = cohort_filters(index, shared_mask & is_derrick, "d")
 
     # --- Non-Derrick Filters and Data ---
     with col_nd:
         st.subheader("🟣 Non-Derrick")
-        # Filter for Non-Derrick shakers from the already shared-filtered DataFrame
-        nond_df_base = filtered_df_shared[~filtered_df_shared["flowline_Shakers"].str.contains("Derrick", na=False)]
-
-        nond_shaker_options = sorted(nond_df_base["flowline_Shakers"].dropna().unique().tolist())
-        nond_shaker = st.selectbox("Select Flowline Shaker", ["All"] + nond_shaker_options, key="nd_shaker_select")
-        if nond_shaker != "All":
-            nond_df_base = nond_df_base[nond_df_base["flowline_Shakers"] == nond_shaker]
-
-        nond_ops = sorted(nond_df_base["Operator"].dropna().unique().tolist())
-        nond_operator = st.selectbox("Select Operator", ["All"] + nond_ops, key="nd_operator_select")
-        if nond_operator != "All":
-            nond_df_base = nond_df_base[nond_df_base["Operator"] == nond_operator]
-
-        nond_contracts = sorted(nond_df_base["Contractor"].dropna().unique().tolist())
-        nond_contractor = st.selectbox("Select Contractor", ["All"] + nond_contracts, key="nd_contract_select")
-        if nond_contractor != "All":
-            nond_df_base = nond_df_base[nond_df_base["Contractor"] == nond_contractor]
-
-        nond_wells = sorted(nond_df_base["Well_Name"].dropna().unique().tolist())
-        nond_well = st.selectbox("Select Well Name", ["All"] + nond_wells, key="nd_well_select")
-        if nond_well != "All":
-            nond_df_base = nond_df_base[nond_df_base["Well_Name"] == nond_well]
-        
-        nond_df = nond_df_base # This is the final filtered DataFrame for Non-Derrick
+        # Non-Derrick shakers within the shared-filtered rows
+        nond_mask, nond_selections = cohort_filters(index, shared_mask & ~is_derrick, "nd")
 
     # Default configurations for cost calculation
     derrick_config = {}
@@ -110,53 +394,36 @@ def render_cost_estimator(df):
         nond_config["eng_cost"] = st.number_input("Engineering Day Rate", value=1000.0, key="nd_eng")
         nond_config["other_cost"] = st.number_input("Other Cost", value=500.0, key="nd_other")
 
-    def calc_cost(sub_df, config, label):
-        """
-        Calculates various cost components and total cost per foot for a given DataFrame subset.
-        Includes LGS% and DSRE% if available.
-        """
-        # Ensure columns exist and handle potential NaNs or empty sums
-        td = sub_df["Total_Dil"].sum() if "Total_Dil" in sub_df.columns and not sub_df["Total_Dil"].empty else 0
-        ho = sub_df["Haul_OFF"].sum() if "Haul_OFF" in sub_df.columns and not sub_df["Haul_OFF"].empty else 0
-        intlen = sub_df["IntLength"].sum() if "IntLength" in sub_df.columns and not sub_df["IntLength"].empty else 0
-
-        dilution = config["dil_rate"] * td
-        haul = config["haul_rate"] * ho
-        screen = config["screen_price"] * config["num_screens"]
-        
-        # Handle shaker_life being zero or very small to prevent division by zero
-        equipment = (config["equip_cost"] * config["num_shakers"]) / config["shaker_life"] if config["shaker_life"] > 0 else 0
-        
-        total = dilution + haul + screen + equipment + config["eng_cost"] + config["other_cost"]
-        per_ft = total / intlen if intlen else 0 # Avoid division by zero
-
-        avg_lgs = (sub_df["LGS"].mean() * 100) if "LGS" in sub_df.columns and not sub_df["LGS"].empty else 0
-        avg_dsre = (sub_df["DSRE"].mean() * 100) if "DSRE" in sub_df.columns and not sub_df["DSRE"].empty else 0
-
-        return {
-            "Label": label,
-            "Cost/ft": per_ft,
-            "Total Cost": total,
-            "Dilution": dilution,
-            "Haul": haul,
-            "Screen": screen,
-            "Equipment": equipment,
-            "Engineering": config["eng_cost"],
-            "Other": config["other_cost"],
-            "Avg LGS%": avg_lgs,
-            "DSRE%": avg_dsre,
-            "Depth": sub_df["MD Depth"].max() if "MD Depth" in sub_df.columns and not sub_df["MD Depth"].empty else 0,
-        }
+    # Cohort totals only change with the filters, so configuration edits reuse them;
+    # the cohort rows are only selected on a miss
+    totals_cache = get_subset_totals_cache()
+    state_key = filter_state_key(selection.state)
+    derrick_totals = totals_cache.get_or_compute((version, state_key, "Derrick", derrick_selections),
+                                                 lambda: subset_totals(df[derrick_mask]))
+    nond_totals = totals_cache.get_or_compute((version, state_key, "Non-Derrick", nond_selections),
+                                              lambda: subset_totals(df[nond_mask]))
 
     # Calculate costs for both types
-    derrick_cost = calc_cost(derrick_df, derrick_config, "Derrick")
-    nond_cost = calc_cost(nond_df, nond_config, "Non-Derrick")
+    derrick_cost = calc_cost(derrick_totals, derrick_config, "Derrick")
+    nond_cost = calc_cost(nond_totals, nond_config, "Non-Derrick")
     summary = pd.DataFrame([derrick_cost, nond_cost])
 
     # --- Display Cost Deltas with Enhanced UI ---
     delta_total = nond_cost['Total Cost'] - derrick_cost['Total Cost']
     delta_ft = nond_cost['Cost/ft'] - derrick_cost['Cost/ft']
 
+    # Bootstrap resamples of both cohorts only change with the filters; each configuration reprices them
+    show_ci = st.checkbox("Show 95% bootstrap confidence intervals", value=True, key="bootstrap_ci")
+    ci_total = ci_ft = ""
+    if show_ci:
+        derrick_boot, nond_boot = get_bootstrap_cache().get_or_compute(
+            (version, state_key, derrick_selections, nond_selections),
+            lambda: (resample_cohort(df[derrick_mask], list(BOOTSTRAP_METRICS), seed=0),
+                     resample_cohort(df[nond_mask], list(BOOTSTRAP_METRICS), seed=1)))
+        cost_cis = cost_delta_ci(derrick_totals, nond_totals, derrick_boot, nond_boot, derrick_config, nond_config)
+        ci_total = ci_caption(cost_cis["Total Cost"], "${:,.0f}")
+        ci_ft = ci_caption(cost_cis["Cost/ft"], "${:,.2f}")
+
     # Determine background and text colors based on delta value (savings vs. extra cost)
     bg_color_total = "#d4edda" if delta_total <= 0 else "#f8d7da" # Green for savings (non-derrick cheaper), red for extra cost
     text_color_total = "green" if delta_total <= 0 else "red"
@@ -168,10 +435,12 @@ def render_cost_estimator(df):
             <div style='flex: 1; padding: 1rem; border: 2px solid #ccc; border-radius: 10px; box-shadow: 2px 2px 6px rgba(0,0,0,0.2); background-color: {bg_color_total};'>
                 <h4 style='margin: 0 0 0.5rem 0; color: {text_color_total};'>💵 Total Cost Delta (Non-Derrick vs. Derrick)</h4>
                 <div style='font-size: 24px; font-weight: bold; color: {text_color_total};'>${delta_total:,.0f}</div>
+                <div style='font-size: 14px; color: {text_color_total};'>{ci_total}</div>
             </div>
             <div style='flex: 1; padding: 1rem; border: 2px solid #ccc; border-radius: 10px; box-shadow: 2px 2px 6px rgba(0,0,0,0.2); background-color: {bg_color_ft};'>
                 <h4 style='margin: 0 0 0.5rem 0; color: {text_color_ft};'>📏 Cost Per Foot Delta (Non-Derrick vs. Derrick)</h4>
                 <div style='font-size: 24px; font-weight: bold; color: {text_color_ft};'>${delta_ft:,.2f}</div>
+                <div style='font-size: 14px; color: {text_color_ft};'>{ci_ft}</div>
             </div>
         </div>
     """, unsafe_allow_html=True)
@@ -181,7 +450,7 @@ def render_cost_estimator(df):
     pie1, pie2 = st.columns(2)
 
     with pie1:
-        if not derrick_df.empty:
+        if derrick_mask.any():
             derrick_fig = px.pie(
                 names=["Dilution", "Haul", "Screen", "Equipment", "Engineering", "Other"],
                 values=[derrick_cost[k] for k in ["Dilution", "Haul", "Screen", "Equipment", "Engineering", "Other"]],
@@ -194,7 +463,7 @@ def render_cost_estimator(df):
             st.info("No Derrick data to display cost breakdown.")
 
     with pie2:
-        if not nond_df.empty:
+        if nond_mask.any():
             nond_fig = px.pie(
                 names=["Dilution", "Haul", "Screen", "Equipment", "Engineering", "Other"],
                 values=[nond_cost[k] for k in ["Dilution", "Haul", "Screen", "Equipment", "Engineering", "Other"]],
@@ -237,4 +506,19 @@ def render_cost_estimator(df):
     with metric_col2:
         st.metric("Non-Derrick Avg LGS%", f"{nond_cost['Avg LGS%']:.2f}%")
         st.metric("Non-Derrick DSRE%", f"{nond_cost['DSRE%']:.2f}%")
+    if show_ci:
+        for col, label in BOOTSTRAP_METRICS.items():
+            if col not in df.columns:
+                continue
+            # Resampled means are fractions; the cards show percentages
+            ci = difference_ci((nond_totals[col] - derrick_totals[col]) * 100,
+                               derrick_boot[col] * 100, nond_boot[col] * 100)
+            st.caption(f"{label} difference (Non-Derrick − Derrick): {ci.estimate:+.2f} pts, "
+                       f"{ci_caption(ci, '{:+.2f}')}")
+
+    render_cohort_ranking(df, shared_mask, is_derrick, (version, state_key), derrick_config, nond_config)
+
+    render_scenario_sweep(derrick_totals, nond_totals, derrick_config, nond_config)
+
+    render_monte_carlo(derrick_totals, nond_totals, derrick_config, nond_config)
 
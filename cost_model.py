@@ -0,0 +1,227 @@
+# cost_model.py (Vectorized Flowline Shaker Cost Model)
+
+import numpy as np
+import pandas as pd
+
+# Cost configuration inputs: (key, label)
+COST_PARAMS = [
+    ("dil_rate", "Dilution Cost Rate ($/unit)"),
+    ("haul_rate", "Haul-Off Cost Rate ($/unit)"),
+    ("screen_price", "Screen Price"),
+    ("num_screens", "Screens used per rig"),
+    ("equip_cost", "Total Equipment Cost"),
+    ("num_shakers", "Number of Shakers Installed"),
+    ("shaker_life", "Shaker Life (Years)"),
+    ("eng_cost", "Engineering Day Rate"),
+    ("other_cost", "Other Cost"),
+]
+
+COST_COMPONENTS = ["Dilution", "Haul", "Screen", "Equipment", "Engineering", "Other"]
+
+
+def cost_components(totals, config):
+    """
+    Evaluates the cost model; every input may be a scalar or a NumPy array.
+
+    Arrays broadcast against each other, so one call can price many configurations
+    (or many cohorts) at once.
+
+    Args:
+        totals (dict): Cohort totals with 'Total_Dil', 'Haul_OFF' and 'IntLength' sums.
+        config (dict): Cost configuration keyed as in COST_PARAMS.
+
+    Returns:
+        dict: Arrays for each of COST_COMPONENTS plus 'Total Cost' and 'Cost/ft'.
+    """
+    shaker_life = np.asarray(config["shaker_life"], dtype="float64")
+    intlen = np.asarray(totals["IntLength"], dtype="float64")
+
+    dilution = config["dil_rate"] * np.asarray(totals["Total_Dil"], dtype="float64")
+    haul = config["haul_rate"] * np.asarray(totals["Haul_OFF"], dtype="float64")
+    screen = np.multiply(config["screen_price"], config["num_screens"], dtype="float64")
+    # A shaker life of zero (or less) contributes no equipment cost
+    equipment = np.divide(np.multiply(config["equip_cost"], config["num_shakers"], dtype="float64"), shaker_life,
+                          out=np.zeros(np.broadcast(shaker_life, config["equip_cost"], config["num_shakers"]).shape),
+                          where=shaker_life > 0)
+    engineering = np.asarray(config["eng_cost"], dtype="float64")
+    other = np.asarray(config["other_cost"], dtype="float64")
+
+    total = dilution + haul + screen + equipment + engineering + other
+    per_ft = np.divide(total, intlen, out=np.zeros(np.broadcast(total, intlen).shape), where=intlen != 0)
+    return {
+        "Dilution": dilution, "Haul": haul, "Screen": screen, "Equipment": equipment,
+        "Engineering": engineering, "Other": other, "Total Cost": total, "Cost/ft": per_ft,
+    }
+
+
+def sweep_configs(derrick_config, nond_config, values, side):
+    """Applies swept parameter arrays to the Derrick config, the Non-Derrick config or both."""
+    derrick = dict(derrick_config)
+    nond = dict(nond_config)
+    for param, param_values in values.items():
+        if side in ("Derrick", "Both"):
+            derrick[param] = param_values
+        if side in ("Non-Derrick", "Both"):
+            nond[param] = param_values
+    return derrick, nond
+
+
+def cost_per_ft_delta(derrick_totals, nond_totals, derrick_config, nond_config, values, side):
+    """
+    Returns the Non-Derrick minus Derrick cost per foot for arrays of parameter values.
+
+    Args:
+        derrick_totals (dict): Derrick cohort totals.
+        nond_totals (dict): Non-Derrick cohort totals.
+        derrick_config (dict): Base Derrick configuration.
+        nond_config (dict): Base Non-Derrick configuration.
+        values (dict): Parameter -> array of values (all arrays broadcast together).
+        side (str): Which configuration the values apply to: "Derrick", "Non-Derrick" or "Both".
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Derrick cost/ft, Non-Derrick cost/ft and their delta.
+    """
+    derrick, nond = sweep_configs(derrick_config, nond_config, values, side)
+    derrick_ft = cost_components(derrick_totals, derrick)["Cost/ft"]
+    nond_ft = cost_components(nond_totals, nond)["Cost/ft"]
+    derrick_ft, nond_ft = np.broadcast_arrays(derrick_ft, nond_ft)
+    return derrick_ft, nond_ft, nond_ft - derrick_ft
+
+
+def scenario_sweep(derrick_totals, nond_totals, derrick_config, nond_config, ranges, side="Derrick"):
+    """
+    Evaluates every combination of the swept parameter values in one batched computation.
+
+    Args:
+        derrick_totals (dict): Derrick cohort totals.
+        nond_totals (dict): Non-Derrick cohort totals.
+        derrick_config (dict): Base Derrick configuration.
+        nond_config (dict): Base Non-Derrick configuration.
+        ranges (dict): Parameter -> 1-D array of values to sweep.
+        side (str): "Derrick", "Non-Derrick" or "Both".
+
+    Returns:
+        pd.DataFrame: One row per combination with the swept values, both costs per
+        foot and 'Delta Cost/ft' (Non-Derrick minus Derrick; positive means Derrick is cheaper).
+    """
+    params = list(ranges)
+    grids = np.meshgrid(*[np.asarray(ranges[param], dtype="float64") for param in params], indexing="ij")
+    values = {param: grid.ravel() for param, grid in zip(params, grids)}
+    derrick_ft, nond_ft, delta = cost_per_ft_delta(derrick_totals, nond_totals, derrick_config, nond_config,
+                                                   values, side)
+    return pd.DataFrame({**values, "Derrick Cost/ft": derrick_ft, "Non-Derrick Cost/ft": nond_ft,
+                         "Delta Cost/ft": delta})
+
+
+def tornado_analysis(derrick_totals, nond_totals, derrick_config, nond_config, ranges, side="Derrick"):
+    """
+    One-at-a-time sensitivity of the cost/ft delta to each swept parameter.
+
+    Each parameter is moved to the low and high end of its range while every other
+    input keeps its own side's base value; all 2 x N cases are priced in one batch.
+    The last case moves nothing, so the base delta is the page's headline delta.
+
+    Returns:
+        tuple[pd.DataFrame, float]: Rows of 'Parameter', 'Low', 'High', 'Delta at Low',
+        'Delta at High' and 'Swing' sorted by swing, and the base-case delta.
+    """
+    params = list(ranges)
+    n_cases = 2 * len(params) + 1
+    derrick, nond = dict(derrick_config), dict(nond_config)
+    for i, param in enumerate(params):
+        for config, applies in ((derrick, side in ("Derrick", "Both")), (nond, side in ("Non-Derrick", "Both"))):
+            if applies:
+                column = np.full(n_cases, float(config[param]))
+                column[2 * i] = np.min(ranges[param])
+                column[2 * i + 1] = np.max(ranges[param])
+                config[param] = column
+    derrick_ft = cost_components(derrick_totals, derrick)["Cost/ft"]
+    nond_ft = cost_components(nond_totals, nond)["Cost/ft"]
+    delta = np.broadcast_to(nond_ft - derrick_ft, n_cases)
+
+    base_delta = float(delta[-1])
+    tornado = pd.DataFrame({
+        "Parameter": params,
+        "Low": [float(np.min(ranges[param])) for param in params],
+        "High": [float(np.max(ranges[param])) for param in params],
+        "Delta at Low": delta[0:-1:2],
+        "Delta at High": delta[1:-1:2],
+    })
+    tornado["Swing"] = (tornado["Delta at High"] - tornado["Delta at Low"]).abs()
+    return tornado.sort_values("Swing").reset_index(drop=True), base_delta
+
+
+def break_even_surface(derrick_totals, nond_totals, derrick_config, nond_config, x_param, x_values,
+                       y_param, y_values, side="Derrick"):
+    """
+    Cost/ft delta over a grid of two parameters, the others held at their base values.
+
+    Returns:
+        np.ndarray: Delta with shape (len(y_values), len(x_values)); its zero contour is the break-even line.
+    """
+    x_grid, y_grid = np.meshgrid(np.asarray(x_values, dtype="float64"), np.asarray(y_values, dtype="float64"))
+    _, _, delta = cost_per_ft_delta(derrick_totals, nond_totals, derrick_config, nond_config,
+                                    {x_param: x_grid, y_param: y_grid}, side)
+    return delta
+
+
+# Aggregations behind a cohort's costs: total column -> (source column, aggregation)
+COHORT_AGGREGATIONS = {
+    "Total_Dil": ("Total_Dil", "sum"),
+    "Haul_OFF": ("Haul_OFF", "sum"),
+    "IntLength": ("IntLength", "sum"),
+    "LGS": ("LGS", "mean"),
+    "DSRE": ("DSRE", "mean"),
+    "MD Depth": ("MD Depth", "max"),
+}
+
+
+def cohort_totals(df, by):
+    """
+    Aggregates the cost inputs of every cohort in one grouped pass.
+
+    Args:
+        df (pd.DataFrame): Well rows.
+        by (str | pd.Series): Column name or row-aligned labels to group by.
+
+    Returns:
+        pd.DataFrame: One row per cohort (index = cohort) with 'Wells' (distinct
+        well names) and the COHORT_AGGREGATIONS totals; missing source columns give 0.
+    """
+    present = {name: spec for name, spec in COHORT_AGGREGATIONS.items() if spec[0] in df.columns}
+    grouped = df.groupby(by, observed=True, sort=False)
+    totals = grouped.agg(**present) if present else pd.DataFrame(index=grouped.size().index)
+    # A well with several rows in a cohort counts once
+    totals.insert(0, "Wells", grouped["Well_Name"].nunique() if "Well_Name" in df.columns else 0)
+    for name in COHORT_AGGREGATIONS:
+        if name not in totals.columns:
+            totals[name] = 0.0
+    return totals
+
+
+def cohort_costs(totals, config):
+    """
+    Prices every cohort with one configuration as a single vectorized evaluation.
+
+    Args:
+        totals (pd.DataFrame): Output of cohort_totals.
+        config (dict): Cost configuration keyed as in COST_PARAMS.
+
+    Returns:
+        pd.DataFrame: 'Cohort', 'Wells', the cost components, 'Total Cost', 'Cost/ft',
+        'Avg LGS%', 'DSRE%' and 'Depth', ranked by cost per foot (cohorts without
+        footage last).
+    """
+    costs = cost_components({col: totals[col].to_numpy(dtype="float64") for col in totals.columns}, config)
+    n_cohorts = len(totals)
+    result = pd.DataFrame({
+        "Cohort": totals.index.astype(str),
+        "Wells": totals["Wells"].to_numpy(),
+        **{name: np.broadcast_to(costs[name], (n_cohorts,)) for name in COST_COMPONENTS + ["Total Cost", "Cost/ft"]},
+        "Avg LGS%": totals["LGS"].to_numpy(dtype="float64") * 100,
+        "DSRE%": totals["DSRE"].to_numpy(dtype="float64") * 100,
+        "Depth": totals["MD Depth"].to_numpy(dtype="float64"),
+        "_no_footage": totals["IntLength"].to_numpy(dtype="float64") == 0,
+    })
+    result = result.sort_values(["_no_footage", "Cost/ft"], kind="stable").drop(columns="_no_footage")
+    return result.reset_index(drop=True)
@@ -0,0 +1,356 @@
+# data_loader.py (Dataset Loading and Columnar Cache)
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import streamlit as st
+import pandas as pd
+
+from well_schema import WELL_SCHEMA, DATE_FORMATS, read_well_csv
+
+DATA_FILE = "Refine Sample.csv"
+CACHE_DIR = ".well_cache"
+MANIFEST_FILE = "manifest.json"
+INGEST_FILE = "ingest.json"
+
+# Rows accepted by ``ingest.py`` are appended to this file next to the source CSV; the
+# cached parts are derived from it, like the Parquet cache is from the source
+INGESTED_SUFFIX = ".ingested.csv"
+
+# Repeated text fields stored as categoricals in compact mode
+COMPACT_CATEGORY_COLUMNS = [
+    "Operator", "Contractor", "flowline_Shakers", "Basin", "DI Basin", "AAPG Geologic Province",
+]
+
+
+def source_fingerprint(path):
+    """Returns the cheap (mtime, size) fingerprint of the source file."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    """Hashes the source file contents in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _schema_fingerprint():
+    """Identifies the declared schema so caches written under an older one are rebuilt."""
+    return hashlib.sha256(repr((WELL_SCHEMA, DATE_FORMATS)).encode()).hexdigest()[:16]
+
+
+def _read_manifest(cache_dir, name=MANIFEST_FILE):
+    try:
+        with open(os.path.join(cache_dir, name)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(cache_dir, manifest, name=MANIFEST_FILE):
+    # Write to a temp file first so a concurrent reader never sees half a manifest
+    tmp_path = os.path.join(cache_dir, name + ".tmp")
+    with open(tmp_path, "w") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp_path, os.path.join(cache_dir, name))
+
+
+def cache_dir_for(path=DATA_FILE, cache_dir=None):
+    """Returns the cache directory of a source file (CACHE_DIR next to it unless given)."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    return cache_dir
+
+
+def ingested_path(path=DATA_FILE):
+    """Returns the path of the file holding the rows ingested into a source file."""
+    return os.path.splitext(path)[0] + INGESTED_SUFFIX
+
+
+def ingested_fingerprint(path=DATA_FILE):
+    """Returns the (mtime, size) fingerprint of the ingested rows file, or None if nothing was ingested."""
+    try:
+        return list(source_fingerprint(ingested_path(path)))
+    except OSError:
+        return None
+
+
+def read_ingest_log(cache_dir):
+    """Returns the log of rows appended by ``ingest.py`` (empty if nothing was ingested)."""
+    return _read_manifest(cache_dir, INGEST_FILE)
+
+
+def write_ingest_log(cache_dir, log):
+    """Atomically replaces the ingest log."""
+    _write_manifest(cache_dir, log, INGEST_FILE)
+
+
+def load_columnar_cache(path=DATA_FILE, cache_dir=None):
+    """
+    Loads the well dataset through an on-disk Parquet cache of the parsed CSV.
+
+    The cache is reused while the source file's mtime and size (and the declared
+    schema) are unchanged. When they change, the file is re-hashed and only
+    re-parsed if its contents differ. If Parquet support (pyarrow) is unavailable
+    the CSV is parsed directly.
+
+    Args:
+        path (str): Path to the source CSV file.
+        cache_dir (str, optional): Cache directory. Defaults to CACHE_DIR next to the CSV.
+
+    Returns:
+        tuple[pd.DataFrame, str, dict]: The parsed DataFrame, its content hash and the
+        per-column conversion error counts from the parse.
+    """
+    cache_dir = cache_dir_for(path, cache_dir)
+    mtime_ns, size = source_fingerprint(path)
+    manifest = _read_manifest(cache_dir)
+    cached_file = os.path.join(cache_dir, manifest.get("parquet", "")) if manifest.get("parquet") else None
+    cache_usable = cached_file is not None and os.path.exists(cached_file) and \
+        manifest.get("schema") == _schema_fingerprint()
+
+    # Fast path: the source file has not been touched since the cache was written
+    if cache_usable and manifest.get("source_mtime_ns") == mtime_ns and manifest.get("source_size") == size:
+        try:
+            return pd.read_parquet(cached_file), manifest["sha256"], manifest.get("parse_errors", {})
+        except Exception:
+            pass  # Corrupt or unreadable cache, rebuild below
+
+    sha256 = _file_sha256(path)
+
+    # The file was touched (e.g. re-copied on deploy) but its contents are identical
+    if cache_usable and manifest.get("sha256") == sha256:
+        try:
+            df = pd.read_parquet(cached_file)
+            manifest.update(source_mtime_ns=mtime_ns, source_size=size)
+            _write_manifest(cache_dir, manifest)
+            return df, sha256, manifest.get("parse_errors", {})
+        except Exception:
+            pass
+
+    df, parse_errors = read_well_csv(path)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        parquet_name = f"wells-{sha256[:16]}.parquet"
+        tmp_path = os.path.join(cache_dir, parquet_name + ".tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(cache_dir, parquet_name))
+        if cached_file and os.path.basename(cached_file) != parquet_name and os.path.exists(cached_file):
+            os.remove(cached_file)  # Drop the stale version
+        _write_manifest(cache_dir, {
+            "parquet": parquet_name,
+            "sha256": sha256,
+            "source_mtime_ns": mtime_ns,
+            "source_size": size,
+            "schema": _schema_fingerprint(),
+            "parse_errors": parse_errors,
+        })
+    except (ImportError, OSError):
+        pass  # No pyarrow or read-only filesystem: serve the parsed frame without a disk cache
+
+    return df, sha256, parse_errors
+
+
+def current_manifest(path=DATA_FILE, cache_dir=None):
+    """
+    Returns the columnar cache manifest of the source file, refreshing a stale cache first.
+
+    Args:
+        path (str): Path to the source CSV file.
+        cache_dir (str, optional): Cache directory. Defaults to CACHE_DIR next to the CSV.
+
+    Returns:
+        dict: The manifest ('parquet', 'sha256', source fingerprint, schema and parse
+        errors); empty if the cache could not be written (e.g. no pyarrow).
+    """
+    cache_dir = cache_dir_for(path, cache_dir)
+    mtime_ns, size = source_fingerprint(path)
+    manifest = _read_manifest(cache_dir)
+    if manifest.get("source_mtime_ns") != mtime_ns or manifest.get("source_size") != size or \
+            manifest.get("schema") != _schema_fingerprint():
+        load_columnar_cache(path, cache_dir)
+        manifest = _read_manifest(cache_dir)
+    return manifest
+
+
+def appended_parts(path=DATA_FILE, cache_dir=None):
+    """
+    Returns the Parquet parts appended to the source file by ``ingest.py``, oldest first.
+
+    The parts are a cache of the ingested rows file. When it, the source file or the
+    cache directory has changed since they were written, they are re-derived from
+    that file, keeping only the rows that are still new against the current source.
+    """
+    cache_dir = cache_dir_for(path, cache_dir)
+    log = read_ingest_log(cache_dir)
+    ingested = ingested_fingerprint(path)
+    if not log.get("parts") and ingested is None:
+        return ()
+    mtime_ns, size = source_fingerprint(path)
+    manifest = _read_manifest(cache_dir)
+    if manifest.get("source_mtime_ns") != mtime_ns or manifest.get("source_size") != size or \
+            manifest.get("sha256") != log.get("base_sha256") or "ingested" not in log or log["ingested"] != ingested:
+        from ingest import reconcile_ingested  # ingest.py builds on this module
+        log = reconcile_ingested(path, cache_dir)
+    return tuple(part["file"] for part in log["parts"])
+
+
+def compact_well_data(df):
+    """
+    Returns a memory-compact copy of the well table.
+
+    Repeated text fields become categoricals, integer columns are downcast to the
+    smallest type that holds their values and float64 metrics become float32 when
+    that keeps them to within float32 precision.
+
+    Args:
+        df (pd.DataFrame): The well dataset.
+
+    Returns:
+        pd.DataFrame: The compacted DataFrame.
+    """
+    compact = df.copy()
+    for col in COMPACT_CATEGORY_COLUMNS:
+        if col in compact.columns:
+            compact[col] = compact[col].astype("category")
+
+    for col in compact.select_dtypes(include="integer").columns:
+        compact[col] = pd.to_numeric(compact[col], downcast="integer")
+
+    for col in compact.select_dtypes(include="float64").columns:
+        values = compact[col].to_numpy()
+        as_float32 = values.astype("float32")
+        if np.allclose(as_float32, values, rtol=1e-6, atol=0, equal_nan=True):
+            compact[col] = as_float32
+
+    compact.attrs = dict(df.attrs)
+    return compact
+
+
+def memory_per_row(df):
+    """Returns the in-memory footprint of the DataFrame in bytes per row."""
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(deep=True, index=True).sum() / len(df)
+
+
+def append_part(parent, part_path, compact, keep=None):
+    """
+    Returns the parent dataset with an ingested part's rows appended, as a new version.
+
+    Args:
+        parent (pd.DataFrame): The previous version, as loaded.
+        part_path (str): Path of the Parquet part written by ``ingest.py``.
+        compact (bool): Whether the parent uses the memory-compact representation.
+        keep (callable, optional): Returns the mask of the part's rows to append
+            (e.g. those inside a partition scope). Defaults to every row.
+
+    Returns:
+        pd.DataFrame: The extended dataset.
+    """
+    delta = pd.read_parquet(part_path).reindex(columns=parent.columns)
+    if keep is not None:
+        delta = delta[keep(delta)].reset_index(drop=True)
+    if compact:
+        delta = compact_well_data(delta)
+    df = pd.concat([parent, delta], ignore_index=True)
+    for col in COMPACT_CATEGORY_COLUMNS:
+        # Categoricals with different categories concatenate as objects; re-unite them
+        if col in df.columns and isinstance(parent[col].dtype, pd.CategoricalDtype) and \
+                isinstance(delta[col].dtype, pd.CategoricalDtype):
+            df[col] = pd.api.types.union_categoricals([parent[col], delta[col]])
+
+    version = hashlib.sha256(f"{parent.attrs['dataset_version']}:{os.path.basename(part_path)}".encode()) \
+        .hexdigest()[:16]
+    df.attrs = dict(parent.attrs)
+    df.attrs["dataset_version"] = version
+    df.attrs["lineage"] = parent.attrs["lineage"] + [(version, len(parent))]
+    return df
+
+
+@st.cache_resource(show_spinner="Loading well data...", max_entries=2)
+def _load_well_data_resource(path, mtime_ns, size, compact, parts=()):
+    """
+    Process-wide cache of the loaded dataset, keyed by the source fingerprint and the
+    ingested parts. A dataset with parts is its predecessor (usually still cached)
+    plus the last part, so an ingest only reads the new rows.
+    """
+    if parts:
+        parent = _load_well_data_resource(path, mtime_ns, size, compact, parts[:-1])
+        return append_part(parent, os.path.join(cache_dir_for(path), parts[-1]), compact)
+    df, sha256, parse_errors = load_columnar_cache(path)
+    if compact:
+        df = compact_well_data(df)
+    df.attrs["dataset_version"] = sha256[:16]
+    df.attrs["parse_errors"] = parse_errors
+    # (version, first row) of the base and of every appended part, see split_appended
+    df.attrs["lineage"] = [(df.attrs["dataset_version"], 0)]
+    return df
+
+
+def load_well_data(path=DATA_FILE, compact=False):
+    """
+    Returns the well dataset, shared across reruns and sessions.
+
+    The returned DataFrame is shared by every session and must be treated as
+    read-only; pages should copy before mutating. Its ``attrs["dataset_version"]``
+    identifies the loaded contents and can be used as a cache key, and
+    ``attrs["parse_errors"]`` holds the per-column conversion error counts. Rows
+    appended with ``ingest.py`` are included after the source file's rows.
+
+    Args:
+        path (str): Path to the source CSV file.
+        compact (bool): Use the memory-compact representation (categoricals and
+            downcast numerics, see ``compact_well_data``).
+
+    Returns:
+        pd.DataFrame: The well dataset.
+
+    Raises:
+        FileNotFoundError: If the source CSV does not exist.
+    """
+    mtime_ns, size = source_fingerprint(path)
+    return _load_well_data_resource(path, mtime_ns, size, compact, appended_parts(path))
+
+
+def split_appended(df):
+    """
+    Splits a dataset extended by ingestion into its previous version and the new rows.
+
+    Per-version structures use this to extend the previous version's structure with
+    the appended rows instead of rebuilding it from every row.
+
+    Args:
+        df (pd.DataFrame): A DataFrame produced by ``load_well_data``.
+
+    Returns:
+        tuple | None: (previous rows, previous version, appended rows), or None if the
+        dataset has no appended rows.
+    """
+    lineage = df.attrs.get("lineage", [])
+    if len(lineage) < 2:
+        return None
+    start = lineage[-1][1]
+    parent = df.iloc[:start]
+    parent.attrs = {**df.attrs, "dataset_version": lineage[-2][0], "lineage": lineage[:-1]}
+    delta = df.iloc[start:].reset_index(drop=True)
+    return parent, lineage[-2][0], delta
+
+
+def dataset_version(df):
+    """
+    Returns the version identifier of a DataFrame produced by ``load_well_data``.
+
+    Frames that did not come from the loader fall back to a hash of their contents.
+    """
+    version = df.attrs.get("dataset_version")
+    if version is None:
+        version = format(int(pd.util.hash_pandas_object(df, index=True).sum()) & (2 ** 64 - 1), "016x")
+    return version
@@ -0,0 +1,117 @@
+# downsampling.py (Server-Side Point Reduction for Large Charts)
+
+import numpy as np
+import pandas as pd
+
+# Above this many points, scatter charts switch to WebGL traces
+WEBGL_THRESHOLD = 1_000
+
+# Most points (or bars) sent to the browser for one chart
+MAX_SCATTER_POINTS = 5_000
+MAX_BARS = 400
+
+# Share of each axis outside which points count as outliers and are always kept
+OUTLIER_QUANTILES = (0.005, 0.995)
+
+
+def render_mode(n_points):
+    """Returns the plotly express render mode for a scatter of n_points."""
+    return "webgl" if n_points > WEBGL_THRESHOLD else "auto"
+
+
+def points_label(shown, total, method="density-sampled, outliers kept", noun="points"):
+    """Returns the caption describing how many points a chart represents and how they were chosen."""
+    if shown == total:
+        return f"Showing all {total:,} {noun}"
+    return f"Showing {shown:,} of {total:,} {noun} ({method})"
+
+
+def downsample_scatter(df, x, y, color=None, max_points=MAX_SCATTER_POINTS, bins=120, seed=0):
+    """
+    Reduces a scatter to at most ``max_points`` representative rows.
+
+    Points outside the OUTLIER_QUANTILES of either axis are kept (the most extreme ones,
+    up to half of ``max_points``). The rest are
+    binned on a bins x bins grid (per color group, so every group stays visible) and
+    one point is kept per occupied cell; if that is still too many, cells are sampled.
+    Rows with a missing x or y are dropped, as plotly would not draw them anyway.
+
+    Args:
+        df (pd.DataFrame): Rows to plot.
+        x (str): X column.
+        y (str): Y column.
+        color (str, optional): Column the chart colors by.
+        max_points (int): Maximum rows returned.
+        bins (int): Grid cells per axis.
+        seed (int): Seed for choosing representatives, so reruns draw the same chart.
+
+    Returns:
+        tuple[pd.DataFrame, int]: The rows to plot (original order) and the number of plottable rows.
+    """
+    x_values = pd.to_numeric(df[x], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    y_values = pd.to_numeric(df[y], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    plottable = np.flatnonzero(~np.isnan(x_values) & ~np.isnan(y_values))
+    if len(plottable) <= max_points:
+        return df.iloc[plottable], len(plottable)
+
+    x_values, y_values = x_values[plottable], y_values[plottable]
+    x_low, x_high = np.quantile(x_values, OUTLIER_QUANTILES)
+    y_low, y_high = np.quantile(y_values, OUTLIER_QUANTILES)
+    # How far each point lies outside the central range, relative to that range's width
+    x_excess = np.maximum(x_low - x_values, x_values - x_high) / ((x_high - x_low) or 1)
+    y_excess = np.maximum(y_low - y_values, y_values - y_high) / ((y_high - y_low) or 1)
+    excess = np.maximum(x_excess, y_excess)
+    outlier = excess > 0
+    # Outliers may use at most half the budget; the most extreme ones win
+    max_outliers = max_points // 2
+    if outlier.sum() > max_outliers:
+        outlier = np.zeros(len(excess), dtype=bool)
+        outlier[np.argsort(-excess, kind="stable")[:max_outliers]] = True
+
+    # Grid cell of every inlier, offset by its color group so groups never share a cell
+    x_cell = np.clip(((x_values - x_low) / ((x_high - x_low) or 1) * bins).astype(np.int64), 0, bins - 1)
+    y_cell = np.clip(((y_values - y_low) / ((y_high - y_low) or 1) * bins).astype(np.int64), 0, bins - 1)
+    cell = x_cell * bins + y_cell
+    if color is not None and color in df.columns:
+        group_codes = pd.factorize(df[color].iloc[plottable])[0].astype(np.int64) + 1
+        cell = cell + group_codes * bins * bins
+
+    # One representative per occupied cell: the first inlier after a seeded shuffle
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(np.flatnonzero(~outlier))
+    _, first = np.unique(cell[order], return_index=True)
+    representatives = order[first]
+
+    budget = max(max_points - int(outlier.sum()), 0)
+    if len(representatives) > budget:
+        representatives = rng.choice(representatives, size=budget, replace=False)
+    keep = np.sort(np.concatenate([np.flatnonzero(outlier), representatives]))
+    return df.iloc[plottable[keep]], len(plottable)
+
+
+def downsample_ranked(df, value_col, max_points=MAX_BARS):
+    """
+    Reduces a bar chart to at most ``max_points`` rows ranked by ``value_col``.
+
+    The highest and lowest values are always kept and the remaining budget is spread
+    over evenly spaced ranks, so the chart keeps the shape of the distribution.
+
+    Args:
+        df (pd.DataFrame): Rows to plot.
+        value_col (str): Column the bars show.
+        max_points (int): Maximum rows returned.
+
+    Returns:
+        tuple[pd.DataFrame, int]: The rows to plot, sorted by descending value (and
+        without missing values) when reduced, original order otherwise; and the
+        number of rows they represent.
+    """
+    if len(df) <= max_points:
+        return df, len(df)
+    ranked = df.dropna(subset=[value_col]).sort_values(value_col, ascending=False, kind="stable")
+    if len(ranked) <= max_points:
+        return ranked, len(df)
+    n_extremes = max_points // 10
+    middle = np.linspace(n_extremes, len(ranked) - n_extremes - 1, max_points - 2 * n_extremes).round().astype(np.int64)
+    keep = np.unique(np.concatenate([np.arange(n_extremes), middle, np.arange(len(ranked) - n_extremes, len(ranked))]))
+    return ranked.iloc[keep], len(df)
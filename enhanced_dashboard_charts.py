@@ -1,30 +1,74 @@
 # enhanced_dashboard_charts.py (Contains all Plotly chart functions)
 
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-def radar_chart_multi_kpi(filtered_df):
+from downsampling import downsample_scatter, render_mode, points_label, WEBGL_THRESHOLD
+from quantiles import box_stats
+from figure_cache import cached_figure
+from analog_wells import DEFAULT_ANALOGS
+from utils import chart_fragment
+
+def _set_radar_wells(wells):
+    """Button callback loading wells into the radar chart's selection before it renders."""
+    st.session_state["radar_wells_select"] = wells
+
+
+def _analog_finder(analog_index, well_df, well_names):
+    """Lists the analogs of a chosen well and offers to compare them in the radar chart."""
+    with st.expander("🔎 Find Analog Wells"):
+        col1, col2 = st.columns([3, 1])
+        well = col1.selectbox("Find analogs for", well_names, key="analog_well")
+        k = col2.number_input("Analogs", min_value=1, max_value=20, value=DEFAULT_ANALOGS, key="analog_k")
+        analogs = analog_index.analogs(well, int(k), candidates=well_names)
+        if analogs.empty:
+            st.info("No analog wells available with current filters.")
+            return
+        features = [col for col in analog_index.features if col in well_df.columns]
+        st.dataframe(analogs.merge(well_df[["Well_Name"] + features], on="Well_Name", how="left"),
+                     use_container_width=True, hide_index=True)
+        st.caption("Nearest wells by distance over standardized " + ", ".join(analog_index.features) +
+                   " (in standard deviations)")
+        st.button("Compare in Radar", key="analog_to_radar", on_click=_set_radar_wells,
+                  args=([well] + analogs["Well_Name"].tolist(),))
+
+
+@chart_fragment
+def radar_chart_multi_kpi(well_df, analog_index=None):
     """
     Generates a multi-KPI radar chart for selected wells.
 
     Args:
-        filtered_df (pd.DataFrame): The DataFrame filtered by shared criteria.
+        well_df (pd.DataFrame): Per-well averages with a 'Well_Name' column (see well_summary).
+        analog_index (AnalogIndex, optional): Adds an analog-well finder whose results can
+            be loaded into the chart (see analog_wells).
     """
     st.subheader("🕸️ Multi-KPI Radar Comparison")
     radar_metrics = ["ROP", "Dilution_Ratio", "Discard Ratio", "AMW", "Haul_OFF"]
-    
-    # Filter out wells with NaN in radar_metrics before grouping
-    radar_df = filtered_df.dropna(subset=radar_metrics).groupby("Well_Name")[radar_metrics].mean().reset_index()
+
+    # Filter out wells with NaN in radar_metrics
+    radar_df = well_df.dropna(subset=radar_metrics)[["Well_Name"] + radar_metrics]
     
     if radar_df.empty:
         st.info("No data available for the radar chart with current filters.")
         return
 
+    well_names = radar_df["Well_Name"].unique()
+    if analog_index is not None:
+        _analog_finder(analog_index, well_df, well_names)
+
     # Default to selecting up to 3 wells if available
-    default_wells = radar_df["Well_Name"].unique()[:3].tolist()
-    selected_wells = st.multiselect("Select Wells for Radar Chart", radar_df["Well_Name"].unique(), default=default_wells, key="radar_wells_select")
+    default_wells = well_names[:3].tolist()
+    if "radar_wells_select" in st.session_state:
+        # Keep only the picks (e.g. loaded analogs) the current filters still offer
+        offered = set(well_names)
+        st.session_state["radar_wells_select"] = [well for well in st.session_state["radar_wells_select"]
+                                                  if well in offered]
+        default_wells = None
+    selected_wells = st.multiselect("Select Wells for Radar Chart", well_names, default=default_wells, key="radar_wells_select")
     
     if not selected_wells:
         st.info("Please select at least one well to display the radar chart.")
@@ -36,23 +80,26 @@ def radar_chart_multi_kpi(filtered_df):
         st.info("Selected wells have no data for the radar chart metrics.")
         return
 
-    fig = go.Figure()
-    for _, row in radar_data.iterrows():
-        # Ensure data is numeric and handle potential NaNs in individual rows for radar
-        r_values = [row[metric] if pd.notna(row[metric]) else 0 for metric in radar_metrics]
-        fig.add_trace(go.Scatterpolar(r=r_values, theta=radar_metrics, fill='toself', name=row["Well_Name"]))
-    
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, radar_data[radar_metrics].max().max() * 1.1] if not radar_data.empty else [0,100] # Dynamically set range
-            )
-        ),
-        showlegend=True,
-        title="Multi-KPI Performance by Well"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    def build():
+        fig = go.Figure()
+        for _, row in radar_data.iterrows():
+            # Ensure data is numeric and handle potential NaNs in individual rows for radar
+            r_values = [row[metric] if pd.notna(row[metric]) else 0 for metric in radar_metrics]
+            fig.add_trace(go.Scatterpolar(r=r_values, theta=radar_metrics, fill='toself', name=row["Well_Name"]))
+
+        fig.update_layout(
+            polar=dict(
+                radialaxis=dict(
+                    visible=True,
+                    range=[0, radar_data[radar_metrics].max().max() * 1.1] if not radar_data.empty else [0,100] # Dynamically set range
+                )
+            ),
+            showlegend=True,
+            title="Multi-KPI Performance by Well"
+        )
+        return fig
+
+    st.plotly_chart(cached_figure("radar_chart_multi_kpi", radar_data, build), use_container_width=True)
 
 
 def rop_vs_depth_scatter(filtered_df):
@@ -61,10 +108,20 @@ def rop_vs_depth_scatter(filtered_df):
     """
     st.subheader("📈 ROP vs. MD Depth")
     if "ROP" in filtered_df.columns and "MD Depth" in filtered_df.columns and not filtered_df.empty:
-        fig = px.scatter(filtered_df, x="MD Depth", y="ROP", color="Operator",
-                         hover_name="Well_Name", title="Rate of Penetration vs. Measured Depth",
-                         labels={"MD Depth": "Measured Depth (ft)", "ROP": "ROP (ft/hr)"})
+        def build():
+            # Large selections are reduced server-side and drawn with WebGL
+            plot_df, total_points = downsample_scatter(filtered_df, "MD Depth", "ROP", color="Operator")
+            fig = px.scatter(plot_df, x="MD Depth", y="ROP", color="Operator",
+                             hover_name="Well_Name", title="Rate of Penetration vs. Measured Depth",
+                             labels={"MD Depth": "Measured Depth (ft)", "ROP": "ROP (ft/hr)"},
+                             render_mode=render_mode(len(plot_df)))
+            fig.update_layout(meta={"caption": points_label(len(plot_df), total_points)})
+            return fig
+
+        fig = cached_figure("rop_vs_depth_scatter", filtered_df, build,
+                            columns=["MD Depth", "ROP", "Operator", "Well_Name"])
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(fig.layout.meta["caption"])
     else:
         st.info("ROP or MD Depth columns are missing or empty for scatter plot.")
 
@@ -80,38 +137,38 @@ def cumulative_wells_chart(volume_df):
         st.info("No data available to show cumulative wells.")
         return
 
-    volume_df['Cumulative Well Count'] = volume_df['Well Count'].cumsum()
-    fig_cumulative = px.line(volume_df, x="Month", y="Cumulative Well Count", 
-                             title="Cumulative Wells Completed Over Time",
-                             markers=True) # Add markers for clarity
-    fig_cumulative.update_layout(xaxis_title="Month", yaxis_title="Cumulative Well Count")
-    st.plotly_chart(fig_cumulative, use_container_width=True)
+    def build():
+        volume_df['Cumulative Well Count'] = volume_df['Well Count'].cumsum()
+        fig_cumulative = px.line(volume_df, x="Month", y="Cumulative Well Count",
+                                 title="Cumulative Wells Completed Over Time",
+                                 markers=True) # Add markers for clarity
+        fig_cumulative.update_layout(xaxis_title="Month", yaxis_title="Cumulative Well Count")
+        return fig_cumulative
 
+    st.plotly_chart(cached_figure("cumulative_wells_chart", volume_df, build, columns=["Month", "Well Count"]),
+                    use_container_width=True)
 
-def avg_rop_over_time_chart(filtered_df):
+
+def avg_rop_over_time_chart(avg_rop_monthly):
     """
     Generates a line chart showing average ROP over time.
+
+    Args:
+        avg_rop_monthly (pd.DataFrame): DataFrame with 'Month' and average 'ROP'
+            (e.g. rolled up from the OLAP cube).
     """
     st.subheader("📊 Average ROP Over Time")
-    if "TD_Date" in filtered_df.columns and "ROP" in filtered_df.columns and not filtered_df.empty:
-        # Ensure TD_Date is datetime and ROP is numeric
-        df_plot = filtered_df.copy()
-        df_plot["TD_Date"] = pd.to_datetime(df_plot["TD_Date"], errors='coerce')
-        df_plot.dropna(subset=["TD_Date", "ROP"], inplace=True)
-        
-        if df_plot.empty:
-            st.info("No valid TD Date or ROP data for average ROP over time chart.")
-            return
+    if avg_rop_monthly.empty or "Month" not in avg_rop_monthly.columns or "ROP" not in avg_rop_monthly.columns:
+        st.info("No valid TD Date or ROP data for average ROP over time chart.")
+        return
 
-        df_plot['Month'] = df_plot['TD_Date'].dt.to_period("M").astype(str)
-        avg_rop_monthly = df_plot.groupby('Month')['ROP'].mean().reset_index()
-        
-        fig = px.line(avg_rop_monthly, x='Month', y='ROP', 
+    def build():
+        fig = px.line(avg_rop_monthly, x='Month', y='ROP',
                       title='Average ROP per Month', markers=True)
         fig.update_layout(xaxis_title="Month", yaxis_title="Average ROP (ft/hr)")
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("TD_Date or ROP columns are missing or empty for average ROP over time chart.")
+        return fig
+
+    st.plotly_chart(cached_figure("avg_rop_over_time_chart", avg_rop_monthly, build), use_container_width=True)
 
 
 def fluid_pie_chart_by_operator(fluid_df):
@@ -126,13 +183,15 @@ def fluid_pie_chart_by_operator(fluid_df):
         st.info("No fluid consumption data available for pie chart with current filters.")
         return
 
-    # Ensure 'Volume' is numeric and handle potential NaNs
-    fluid_df['Volume'] = pd.to_numeric(fluid_df['Volume'], errors='coerce').fillna(0)
-    
-    # Aggregate total volume per operator
-    total_fluid_per_operator = fluid_df.groupby('Operator')['Volume'].sum().reset_index()
-    
-    if not total_fluid_per_operator.empty and total_fluid_per_operator['Volume'].sum() > 0:
+    def build():
+        # Ensure 'Volume' is numeric and handle potential NaNs
+        volumes = pd.to_numeric(fluid_df['Volume'], errors='coerce').fillna(0)
+
+        # Aggregate total volume per operator
+        total_fluid_per_operator = volumes.groupby(fluid_df['Operator'], observed=True).sum().reset_index()
+
+        if total_fluid_per_operator.empty or total_fluid_per_operator['Volume'].sum() <= 0:
+            return None
         fig_pie = px.pie(
             total_fluid_per_operator,
             values="Volume",
@@ -141,6 +200,10 @@ def fluid_pie_chart_by_operator(fluid_df):
             hole=0.3 # Add a hole for a donut chart effect
         )
         fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+        return fig_pie
+
+    fig_pie = cached_figure("fluid_pie_chart_by_operator", fluid_df, build, columns=["Operator", "Volume"])
+    if fig_pie is not None:
         st.plotly_chart(fig_pie, use_container_width=True)
     else:
         st.info("No meaningful fluid consumption data available for pie chart.")
@@ -161,20 +224,24 @@ def kpi_heatmap(metric_df):
         st.info("Not enough numeric KPIs to display a correlation heatmap.")
         return
 
-    # Calculate correlation matrix, handling potential NaNs
-    corr_matrix = numeric_metric_df.corr()
-    
-    fig_heatmap = px.imshow(
-        corr_matrix, 
-        text_auto=True, 
-        aspect="auto",
-        color_continuous_scale=px.colors.sequential.Plasma, # Choose a nice color scale
-        title="Correlation Heatmap of KPIs"
-    )
-    fig_heatmap.update_layout(xaxis_showgrid=False, yaxis_showgrid=False) # Remove grid for cleaner look
-    st.plotly_chart(fig_heatmap, use_container_width=True)
+    def build():
+        # Calculate correlation matrix, handling potential NaNs
+        corr_matrix = numeric_metric_df.corr()
+
+        fig_heatmap = px.imshow(
+            corr_matrix,
+            text_auto=True,
+            aspect="auto",
+            color_continuous_scale=px.colors.sequential.Plasma, # Choose a nice color scale
+            title="Correlation Heatmap of KPIs"
+        )
+        fig_heatmap.update_layout(xaxis_showgrid=False, yaxis_showgrid=False) # Remove grid for cleaner look
+        return fig_heatmap
 
+    st.plotly_chart(cached_figure("kpi_heatmap", numeric_metric_df, build), use_container_width=True)
 
+
+@chart_fragment
 def kpi_boxplot(metric_df):
     """
     Generates box plots to show KPI distribution by operator.
@@ -198,12 +265,37 @@ def kpi_boxplot(metric_df):
     selected_kpi_boxplot = st.selectbox("Select KPI for Box Plot", kpi_cols_for_boxplot, key="kpi_boxplot_select")
     
     if selected_kpi_boxplot:
-        fig_boxplot = px.box(metric_df, x="Operator", y=selected_kpi_boxplot,
-                             title=f"Distribution of {selected_kpi_boxplot} by Operator",
-                             points="all") # Show all points for better insight
-        fig_boxplot.update_layout(xaxis_title="Operator", yaxis_title=selected_kpi_boxplot)
+        def build():
+            # Quartiles and whiskers are computed here; only the summaries and the outliers are sent
+            stats, outliers = box_stats(metric_df, "Operator", selected_kpi_boxplot)
+            if stats.empty:
+                return None
+            operators = stats.index.astype(str).tolist()
+            fig_boxplot = go.Figure()
+            fig_boxplot.add_trace(go.Box(x=operators, q1=stats["q1"], median=stats["median"], q3=stats["q3"],
+                                         lowerfence=stats["lowerfence"], upperfence=stats["upperfence"],
+                                         mean=stats["mean"], name=selected_kpi_boxplot, boxpoints=False,
+                                         marker_color="#1f77b4"))
+            scatter = go.Scattergl if len(outliers) > WEBGL_THRESHOLD else go.Scatter
+            fig_boxplot.add_trace(scatter(x=outliers["Operator"].astype(str), y=outliers[selected_kpi_boxplot],
+                                          mode="markers", name="Outliers", marker=dict(color="#d62728", size=5),
+                                          text=outliers["Well_Name"] if "Well_Name" in outliers.columns else None,
+                                          hovertemplate="%{text}<br>%{y}<extra>Outlier</extra>"))
+            fig_boxplot.update_layout(title=f"Distribution of {selected_kpi_boxplot} by Operator",
+                                      xaxis_title="Operator", yaxis_title=selected_kpi_boxplot,
+                                      meta={"caption": f"{int(stats['count'].sum()):,} values summarized; "
+                                                       f"{len(outliers):,} outliers drawn"})
+            return fig_boxplot
+
+        fig_boxplot = cached_figure("kpi_boxplot", metric_df, build, selected_kpi_boxplot,
+                                    columns=["Operator", "Well_Name", selected_kpi_boxplot])
+        if fig_boxplot is None:
+            st.info(f"No {selected_kpi_boxplot} values to summarize.")
+            return
         st.plotly_chart(fig_boxplot, use_container_width=True)
+        st.caption(fig_boxplot.layout.meta["caption"])
 
+@chart_fragment
 def kpi_comparison_scatter(metric_df):
     """
     Generates a scatter plot to compare two selected KPIs.
@@ -228,10 +320,19 @@ def kpi_comparison_scatter(metric_df):
         y_kpi = st.selectbox("Select Y-axis KPI", kpi_options, index=default_y_index, key="scatter_y_kpi")
 
     if x_kpi and y_kpi:
-        fig = px.scatter(metric_df, x=x_kpi, y=y_kpi, color="Operator", hover_name="Well_Name",
-                         title=f"{x_kpi} vs. {y_kpi}",
-                         labels={x_kpi: x_kpi, y_kpi: y_kpi})
+        def build():
+            plot_df, total_points = downsample_scatter(metric_df, x_kpi, y_kpi, color="Operator")
+            fig = px.scatter(plot_df, x=x_kpi, y=y_kpi, color="Operator", hover_name="Well_Name",
+                             title=f"{x_kpi} vs. {y_kpi}",
+                             labels={x_kpi: x_kpi, y_kpi: y_kpi},
+                             render_mode=render_mode(len(plot_df)))
+            fig.update_layout(meta={"caption": points_label(len(plot_df), total_points)})
+            return fig
+
+        fig = cached_figure("kpi_comparison_scatter", metric_df, build, x_kpi, y_kpi,
+                            columns=["Operator", "Well_Name", x_kpi, y_kpi])
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(fig.layout.meta["caption"])
 
 def stacked_cost_chart(summary_df):
     """
@@ -246,31 +347,161 @@ def stacked_cost_chart(summary_df):
         return
 
     cost_components = ["Dilution", "Haul", "Screen", "Equipment", "Engineering", "Other"]
-    
-    # Ensure all cost components are present and numeric, fill NaN with 0
-    for comp in cost_components:
-        if comp not in summary_df.columns:
-            summary_df[comp] = 0.0
-        summary_df[comp] = pd.to_numeric(summary_df[comp], errors='coerce').fillna(0)
-
-    fig_stacked = px.bar(summary_df, x="Label", y=cost_components, 
-                         title="Cost Breakdown by Component (Stacked)",
-                         barmode="stack",
-                         color_discrete_sequence=px.colors.qualitative.Pastel) # Use a nice color palette
-    fig_stacked.update_layout(xaxis_title="Shaker Type", yaxis_title="Cost")
-    st.plotly_chart(fig_stacked, use_container_width=True)
-
-def rop_by_operator_bar_chart(filtered_df):
+
+    def build():
+        # Ensure all cost components are present and numeric, fill NaN with 0
+        for comp in cost_components:
+            if comp not in summary_df.columns:
+                summary_df[comp] = 0.0
+            summary_df[comp] = pd.to_numeric(summary_df[comp], errors='coerce').fillna(0)
+
+        fig_stacked = px.bar(summary_df, x="Label", y=cost_components,
+                             title="Cost Breakdown by Component (Stacked)",
+                             barmode="stack",
+                             color_discrete_sequence=px.colors.qualitative.Pastel) # Use a nice color palette
+        fig_stacked.update_layout(xaxis_title="Shaker Type", yaxis_title="Cost")
+        return fig_stacked
+
+    st.plotly_chart(cached_figure("stacked_cost_chart", summary_df, build, columns=["Label"] + cost_components),
+                    use_container_width=True)
+
+def rop_by_operator_bar_chart(avg_rop_operator):
     """
     Generates a bar chart showing average ROP by Operator.
+
+    Args:
+        avg_rop_operator (pd.DataFrame): DataFrame with 'Operator' and average 'ROP'
+            (e.g. rolled up from the OLAP cube).
     """
     st.subheader("Average ROP by Operator")
-    if "Operator" in filtered_df.columns and "ROP" in filtered_df.columns and not filtered_df.empty:
-        avg_rop_operator = filtered_df.groupby("Operator")["ROP"].mean().reset_index()
-        fig = px.bar(avg_rop_operator, x="Operator", y="ROP", color="Operator",
-                     title="Average Rate of Penetration by Operator")
-        fig.update_layout(xaxis_title="Operator", yaxis_title="Average ROP (ft/hr)")
-        st.plotly_chart(fig, use_container_width=True)
+    if not avg_rop_operator.empty and "Operator" in avg_rop_operator.columns and "ROP" in avg_rop_operator.columns:
+        def build():
+            fig = px.bar(avg_rop_operator, x="Operator", y="ROP", color="Operator",
+                         title="Average Rate of Penetration by Operator")
+            fig.update_layout(xaxis_title="Operator", yaxis_title="Average ROP (ft/hr)")
+            return fig
+
+        st.plotly_chart(cached_figure("rop_by_operator_bar_chart", avg_rop_operator, build), use_container_width=True)
     else:
         st.info("Operator or ROP data missing for this chart.")
 
+
+
+def tornado_chart(tornado_df, base_delta):
+    """
+    Generates a tornado chart of the cost-per-foot delta's sensitivity to each input.
+
+    Args:
+        tornado_df (pd.DataFrame): Output of cost_model.tornado_analysis.
+        base_delta (float): Cost/ft delta with every input at its base value.
+    """
+    st.subheader("🌪️ Cost/ft Delta Sensitivity (Tornado)")
+    if tornado_df.empty:
+        st.info("Select at least one input to sweep for the tornado chart.")
+        return
+
+    def build():
+        fig = go.Figure()
+        fig.add_trace(go.Bar(y=tornado_df["Parameter"], x=tornado_df["Delta at Low"] - base_delta, base=base_delta,
+                             orientation="h", name="Input at range min", marker_color="#90caf9",
+                             customdata=tornado_df["Low"], hovertemplate="%{y} = %{customdata:,.2f}<br>Delta: %{x:,.2f}<extra></extra>"))
+        fig.add_trace(go.Bar(y=tornado_df["Parameter"], x=tornado_df["Delta at High"] - base_delta, base=base_delta,
+                             orientation="h", name="Input at range max", marker_color="#1565c0",
+                             customdata=tornado_df["High"], hovertemplate="%{y} = %{customdata:,.2f}<br>Delta: %{x:,.2f}<extra></extra>"))
+        fig.add_vline(x=base_delta, line_dash="dash", line_color="black")
+        fig.add_vline(x=0, line_color="red") # Break-even
+        fig.update_layout(barmode="overlay", title="Non-Derrick minus Derrick Cost/ft by Input Range",
+                          xaxis_title="Cost/ft Delta ($/ft, positive = Derrick cheaper)", yaxis_title="Input")
+        return fig
+
+    st.plotly_chart(cached_figure("tornado_chart", tornado_df, build, base_delta), use_container_width=True)
+
+
+def break_even_surface_chart(x_values, y_values, delta, x_label, y_label):
+    """
+    Generates a contour chart of the cost-per-foot delta over two inputs, highlighting break-even.
+
+    Args:
+        x_values (array-like): Values of the x-axis input.
+        y_values (array-like): Values of the y-axis input.
+        delta (np.ndarray): Cost/ft delta with shape (len(y_values), len(x_values)).
+        x_label (str): X-axis input label.
+        y_label (str): Y-axis input label.
+    """
+    st.subheader("🧭 Break-Even Surface")
+    if delta.size == 0:
+        st.info("No scenarios to display for the break-even surface.")
+        return
+
+    def build():
+        fig = go.Figure()
+        fig.add_trace(go.Contour(z=delta, x=x_values, y=y_values, colorscale="RdYlGn",
+                                 colorbar=dict(title="Δ $/ft"), name="Cost/ft Delta"))
+        # The zero contour is where both shaker types cost the same per foot
+        fig.add_trace(go.Contour(z=delta, x=x_values, y=y_values, showscale=False, hoverinfo="skip",
+                                 contours=dict(start=0, end=0, size=1, coloring="lines"),
+                                 line=dict(width=3, color="black"), name="Break-even"))
+        fig.update_layout(title="Non-Derrick minus Derrick Cost/ft (black line = break-even)",
+                          xaxis_title=x_label, yaxis_title=y_label)
+        return fig
+
+    st.plotly_chart(cached_figure("break_even_surface_chart", delta, build, x_values, y_values, x_label, y_label),
+                    use_container_width=True)
+
+
+def cohort_cost_ranking_chart(cohort_df, group_label, top_n=30):
+    """
+    Generates a horizontal bar chart ranking cohorts by cost per foot.
+
+    Args:
+        cohort_df (pd.DataFrame): Output of cost_model.cohort_costs (already ranked).
+        group_label (str): What the cohorts are (e.g. "Flowline Shaker").
+        top_n (int): Number of lowest cost/ft cohorts to show.
+    """
+    st.subheader(f"🏁 Cost per Foot by {group_label}")
+    ranked = cohort_df[cohort_df["Cost/ft"] > 0].head(top_n)
+    if ranked.empty:
+        st.info("No cohorts with drilled footage to rank.")
+        return
+
+    def build():
+        fig = px.bar(ranked.iloc[::-1], x="Cost/ft", y="Cohort", orientation="h",
+                     hover_data=["Wells", "Total Cost", "Avg LGS%", "DSRE%", "Depth"],
+                     color="Cost/ft", color_continuous_scale="RdYlGn_r",
+                     title=f"Lowest Cost per Foot: Top {len(ranked)} of {len(cohort_df)} by {group_label}")
+        fig.update_layout(xaxis_title="Cost per Foot ($/ft)", yaxis_title=group_label,
+                          height=max(400, 22 * len(ranked)))
+        return fig
+
+    st.plotly_chart(cached_figure("cohort_cost_ranking_chart", ranked, build, len(cohort_df), group_label),
+                    use_container_width=True)
+
+
+def cost_distribution_chart(histogram, percentiles):
+    """
+    Generates an overlaid histogram of simulated cost per foot for both shaker types.
+
+    Args:
+        histogram (dict): 'edges' plus 'Derrick' and 'Non-Derrick' bin counts (from simulation.run_simulation).
+        percentiles (dict): Cohort -> {"P10", "P50", "P90", ...}, used to mark each P50.
+    """
+    st.subheader("🎲 Simulated Cost/ft Distribution")
+    edges = np.asarray(histogram["edges"])
+    if edges.size < 2:
+        st.info("No simulated costs to display.")
+        return
+
+    def build():
+        centers = (edges[:-1] + edges[1:]) / 2
+        fig = go.Figure()
+        for cohort, color in [("Derrick", "#1565c0"), ("Non-Derrick", "#ef6c00")]:
+            fig.add_trace(go.Bar(x=centers, y=histogram[cohort], width=np.diff(edges), name=cohort,
+                                 marker_color=color, opacity=0.6,
+                                 hovertemplate="$%{x:,.2f}/ft<br>Samples: %{y:,}<extra>" + cohort + "</extra>"))
+            fig.add_vline(x=percentiles[cohort]["P50"], line_dash="dash", line_color=color)
+        fig.update_layout(barmode="overlay", title="Cost/ft Across Sampled Inputs (dashed = P50)",
+                          xaxis_title="Cost/ft ($)", yaxis_title="Samples")
+        return fig
+
+    st.plotly_chart(cached_figure("cost_distribution_chart", histogram, build, percentiles),
+                    use_container_width=True)
@@ -1,11 +1,22 @@
 # executive_summary.py (Executive Summary Page)
 
+import numpy as np
 import streamlit as st
-import pandas as pd
 
 # Import shared utility functions and chart functions
-from utils import apply_shared_filters
+from utils import shared_filter_selection
+from data_loader import dataset_version
+from well_summary import get_well_summary
+from olap_cube import get_olap_cube
 from enhanced_dashboard_charts import rop_by_operator_bar_chart
+from bootstrap import mean_ci
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def rop_confidence_interval(rop_values):
+    """Returns the 95% bootstrap confidence interval of the average ROP (cached per selection)."""
+    return mean_ci(rop_values)
+
 
 def render_executive_summary(df):
     """
@@ -15,15 +26,22 @@ def render_executive_summary(df):
         df (pd.DataFrame): The raw input DataFrame.
     """
     st.title("📄 Executive Summary")
-    filtered_df = apply_shared_filters(df) # Apply shared filters
+    selection = shared_filter_selection(df) # Apply shared filters
+    filtered_df = df.iloc[selection.positions]
 
     if filtered_df.empty:
         st.info("No data available for Executive Summary with current filters.")
         return
 
+    # Per-well aggregates of the selected rows
+    well_df = get_well_summary(df, dataset_version(df)).summarize(selection.positions).reset_index()
+
     # Calculate summary statistics, handling potential empty data or NaN values
-    total_wells = filtered_df["Well_Name"].nunique() if "Well_Name" in filtered_df.columns else 0
+    total_wells = len(well_df)
     avg_rop = filtered_df["ROP"].mean() if "ROP" in filtered_df.columns and not filtered_df["ROP"].empty else 0.0
+    rop_ci = rop_confidence_interval(filtered_df["ROP"].to_numpy(dtype="float64", na_value=np.nan)) \
+        if "ROP" in filtered_df.columns else None
+    rop_ci_text = f" (95% CI {rop_ci.low:.1f}–{rop_ci.high:.1f})" if rop_ci is not None and not np.isnan(rop_ci.low) else ""
     avg_amw = filtered_df["AMW"].mean() if "AMW" in filtered_df.columns and not filtered_df["AMW"].empty else 0.0
     avg_dil = filtered_df["Dilution_Ratio"].mean() if "Dilution_Ratio" in filtered_df.columns and not filtered_df["Dilution_Ratio"].empty else 0.0
     avg_discard = filtered_df["Discard Ratio"].mean() if "Discard Ratio" in filtered_df.columns and not filtered_df["Discard Ratio"].empty else 0.0
@@ -31,9 +49,9 @@ def render_executive_summary(df):
     top_well = {'Well_Name': 'N/A', 'ROP': 0.0}
     low_well = {'Well_Name': 'N/A', 'ROP': 0.0}
 
-    if "ROP" in filtered_df.columns and not filtered_df["ROP"].empty:
-        # Filter out NaN ROP values before finding min/max
-        rop_data = filtered_df.dropna(subset=["ROP"])
+    if "ROP" in well_df.columns:
+        # Extremes of each well's average ROP, skipping wells without ROP
+        rop_data = well_df.dropna(subset=["ROP"])
         if not rop_data.empty:
             top_well = rop_data.loc[rop_data["ROP"].idxmax()]
             low_well = rop_data.loc[rop_data["ROP"].idxmin()]
@@ -41,7 +59,7 @@ def render_executive_summary(df):
     st.markdown(f"""
 ### 🛠️ Drilling Performance Overview
 - Total Wells: **{total_wells}**
-- Average ROP: **{avg_rop:.1f} ft/hr**
+- Average ROP: **{avg_rop:.1f} ft/hr**{rop_ci_text}
 - Average Mud Weight: **{avg_amw:.2f} ppg**
 - Avg Dilution Ratio: **{avg_dil:.2f}**
 - Avg Discard Ratio: **{avg_discard:.2f}**
@@ -51,11 +69,12 @@ def render_executive_summary(df):
 - **Slowest Well**: `{low_well['Well_Name']}` @ **{low_well['ROP']:.1f} ft/hr**
 """)
 
-    rop_by_operator_bar_chart(filtered_df) # New chart added
+    cells, cell_mask = get_olap_cube(df, dataset_version(df)).select(selection)
+    rop_by_operator_bar_chart(cells.means("Operator", "ROP", cell_mask)) # New chart added
 
     summary_text = (
         f"Executive Summary for {total_wells} wells\n"
-        f"Average ROP: {avg_rop:.1f} ft/hr\n"
+        f"Average ROP: {avg_rop:.1f} ft/hr{rop_ci_text}\n"
         f"Average Mud Weight: {avg_amw:.2f} ppg\n"
         f"Average Dilution Ratio: {avg_dil:.2f}\n"
         f"Average Discard Ratio: {avg_discard:.2f}\n"
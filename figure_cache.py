@@ -0,0 +1,90 @@
+# figure_cache.py (Figure Cache Keyed by Data Fingerprint and Chart Arguments)
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+from caching import BoundedLRUCache
+
+# Bounds of the shared figure cache (serialized JSON, so bytes ~ characters)
+MAX_FIGURES = 256
+MAX_FIGURE_BYTES = 96 * 1024 * 1024
+
+
+def _update_fingerprint(digest, data):
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        columns = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        dtypes = list(data.dtypes.astype(str)) if isinstance(data, pd.DataFrame) else [str(data.dtype)]
+        digest.update(repr((type(data).__name__, data.shape, columns, dtypes)).encode())
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    elif isinstance(data, np.ndarray):
+        digest.update(repr((data.shape, data.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(data).tobytes())
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            digest.update(repr(key).encode())
+            _update_fingerprint(digest, value)
+    elif isinstance(data, (list, tuple)):
+        digest.update(f"{type(data).__name__}[{len(data)}]".encode())
+        for value in data:
+            _update_fingerprint(digest, value)
+    else:
+        digest.update(repr(data).encode())
+
+
+def data_fingerprint(data):
+    """
+    Returns a short content hash of chart inputs.
+
+    DataFrames and Series are hashed by value (with their index, columns and dtypes)
+    using pandas' vectorized row hashing; arrays by their bytes; containers recursively.
+
+    Args:
+        data: A DataFrame, Series, array, scalar or a dict/list/tuple of them.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _update_fingerprint(digest, data)
+    return digest.hexdigest()
+
+
+@st.cache_resource
+def get_figure_cache():
+    """Returns the figure cache shared by every session, bounded by count and memory."""
+    return BoundedLRUCache(max_entries=MAX_FIGURES, max_bytes=MAX_FIGURE_BYTES, sizeof=len)
+
+
+def cached_figure(chart, data, build, *args, columns=None):
+    """
+    Returns a chart's figure, rebuilding it only when its data or arguments change.
+
+    Figures are stored as JSON and rebuilt from it on a hit, so a cached figure is
+    never shared (or mutated) between reruns.
+
+    Args:
+        chart (str): Chart name, part of the key.
+        data (pd.DataFrame | object): The chart's input data.
+        build (callable): Builds the figure; may return None (nothing to draw, not cached).
+        *args: Chart arguments that change the figure (e.g. selected KPIs).
+        columns (list, optional): Only these columns of a DataFrame are fingerprinted
+            (missing ones are ignored), for charts that read a few columns of a wide frame.
+
+    Returns:
+        go.Figure | None: The figure.
+    """
+    if columns is not None and isinstance(data, pd.DataFrame):
+        data = data[[col for col in columns if col in data.columns]]
+    key = (chart, data_fingerprint(data), data_fingerprint(args))
+    cache = get_figure_cache()
+    fig_json = cache.get(key)
+    if fig_json is not None:
+        return pio.from_json(fig_json)
+    fig = build()
+    if fig is not None:
+        cache.put(key, fig.to_json())
+    return fig
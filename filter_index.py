@@ -0,0 +1,229 @@
+# filter_index.py (Precomputed Masks for the Shared Sidebar Filters)
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import split_appended
+
+# Columns filtered with a selectbox, compared as strings
+SELECT_FILTER_COLUMNS = ["Operator", "Contractor", "flowline_Shakers", "Hole_Size"]
+
+# Columns with value counts available for dropdowns (the cost estimator also filters by well)
+FACET_COLUMNS = SELECT_FILTER_COLUMNS + ["Well_Name"]
+
+DEPTH_BINS = {
+    "<5000 ft": (0, 5000), "5000–10000 ft": (5000, 10000),
+    "10000–15000 ft": (10000, 15000), "15000–20000 ft": (15000, 20000),
+    "20000–25000 ft": (20000, 25000), ">25000 ft": (25000, float("inf"))
+}
+
+MW_BINS = {
+    "<3": (0, 3), "3–6": (3, 6), "6–9": (6, 9),
+    "9–11": (9, 11), "11–14": (11, 14), "14–30": (14, 30)
+}
+
+
+def _bin_masks(values, bins):
+    """Builds one boolean mask per [low, high) bin; missing values match no bin."""
+    return {label: (values >= low) & (values < high) for label, (low, high) in bins.items()}
+
+
+def _factorize(df, col):
+    """Returns the sorted-value codes (-1 if missing) and the distinct values of a column, as strings."""
+    series = df[col]
+    codes, uniques = pd.factorize(series.astype(str).where(series.notna()), sort=True)
+    return codes, [str(value) for value in uniques]
+
+
+def _td_years(df):
+    """Returns the TD year of every row as floats (NaN if undated), or None without TD_Date."""
+    if "TD_Date" not in df.columns:
+        return None
+    return df["TD_Date"].dt.year.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _distinct_years(years):
+    return [int(year) for year in np.unique(years[~np.isnan(years)])]
+
+
+def _remap(old_values, new_values):
+    """Maps codes into ``old_values`` to codes into ``new_values``; index -1 (missing) stays -1."""
+    position = {value: code for code, value in enumerate(new_values)}
+    return np.array([position[value] for value in old_values] + [-1], dtype=np.int64)
+
+
+class FilterIndex:
+    """
+    Boolean row masks for every shared filter value, built once per dataset version.
+
+    Any filter combination is answered by AND-ing masks, so the sidebar never has to
+    copy the frame or re-run string comparisons. The factorized codes of every facet
+    column also drive ``facet_counts``, which returns the values and well counts of
+    several dropdowns from one pass over a mask.
+
+    Attributes:
+        n_rows (int): Number of rows in the indexed DataFrame.
+        values (dict): Column -> sorted list of its distinct (string) values.
+        codes (dict): Column -> int array of positions into ``values`` (-1 if missing).
+        value_masks (dict): Column -> {value: boolean row mask} (selectbox filter columns only).
+        year_masks (dict): TD year -> boolean row mask.
+        depth_masks (dict): DEPTH_BINS label -> boolean row mask.
+        amw_masks (dict): MW_BINS label -> boolean row mask.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.values, self.codes, self.value_masks = {}, {}, {}
+        for col in FACET_COLUMNS:
+            if col in df.columns:
+                self._index_column(df, col, with_masks=col in SELECT_FILTER_COLUMNS)
+        self._stack_facet_codes()
+
+        self.year_masks = {}
+        years = _td_years(df)
+        if years is not None:
+            for year in _distinct_years(years):
+                self.year_masks[year] = years == year
+
+        self.depth_masks = _bin_masks(df["MD Depth"].to_numpy(dtype="float64", na_value=np.nan), DEPTH_BINS) \
+            if "MD Depth" in df.columns else {}
+        self.amw_masks = _bin_masks(df["AMW"].to_numpy(dtype="float64", na_value=np.nan), MW_BINS) \
+            if "AMW" in df.columns else {}
+
+    def _stack_facet_codes(self):
+        # All facet codes side by side, shifted so each column owns a disjoint range of
+        # bins (bin 0 of each range counts missing values) for a single bincount
+        self._facet_columns = list(self.values)
+        sizes = [len(self.values[col]) + 1 for col in self._facet_columns]
+        self._facet_offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self._facet_codes = np.column_stack(
+            [self.codes[col] + 1 + self._facet_offsets[i] for i, col in enumerate(self._facet_columns)]
+        ) if self._facet_columns else np.empty((self.n_rows, 0), dtype=np.int64)
+
+    def _index_column(self, df, col, with_masks):
+        codes, self.values[col] = _factorize(df, col)
+        self.codes[col] = codes
+        if with_masks:
+            self.value_masks[col] = {value: codes == i for i, value in enumerate(self.values[col])}
+
+    def extend(self, delta):
+        """
+        Returns the index of this dataset with the rows of ``delta`` appended.
+
+        Only the appended rows are factorized and compared. Existing codes are remapped
+        where new values sort between old ones, and existing masks are extended with
+        the new rows' part.
+
+        Args:
+            delta (pd.DataFrame): The appended rows (same columns as the indexed rows).
+
+        Returns:
+            FilterIndex: A new index; this one is left unchanged.
+        """
+        n_old = self.n_rows
+        extended = FilterIndex.__new__(FilterIndex)
+        extended.n_rows = n_old + len(delta)
+        extended.values, extended.codes, extended.value_masks = {}, {}, {}
+        for col in self.values:
+            delta_codes, delta_values = _factorize(delta, col)
+            values = sorted(set(self.values[col]).union(delta_values))
+            new_codes = _remap(delta_values, values)[delta_codes]
+            extended.values[col] = values
+            extended.codes[col] = np.concatenate([_remap(self.values[col], values)[self.codes[col]], new_codes])
+            if col in self.value_masks:
+                none = np.zeros(n_old, dtype=bool)
+                extended.value_masks[col] = {
+                    value: np.concatenate([self.value_masks[col].get(value, none), new_codes == code])
+                    for code, value in enumerate(values)
+                }
+        extended._stack_facet_codes()
+
+        extended.year_masks = {}
+        years = _td_years(delta)
+        if years is not None:
+            none = np.zeros(n_old, dtype=bool)
+            for year in sorted(set(self.year_masks).union(_distinct_years(years))):
+                extended.year_masks[year] = np.concatenate([self.year_masks.get(year, none), years == year])
+
+        extended.depth_masks, extended.amw_masks = {}, {}
+        for masks, extended_masks, col, bins in [(self.depth_masks, extended.depth_masks, "MD Depth", DEPTH_BINS),
+                                                 (self.amw_masks, extended.amw_masks, "AMW", MW_BINS)]:
+            if masks:
+                delta_masks = _bin_masks(delta[col].to_numpy(dtype="float64", na_value=np.nan), bins)
+                extended_masks.update({label: np.concatenate([masks[label], delta_masks[label]]) for label in bins})
+        return extended
+
+    def all_rows(self):
+        """Returns a mask selecting every row."""
+        return np.ones(self.n_rows, dtype=bool)
+
+    def facet_counts(self, mask, columns=None):
+        """
+        Returns the values present in the masked rows and their well counts.
+
+        A well is counted once per value however many of its rows carry it. Without a
+        'Well_Name' column every row counts as a well.
+
+        Args:
+            mask (np.ndarray): Boolean row mask.
+            columns (list, optional): Facet columns to count. Defaults to all of them.
+
+        Returns:
+            dict: Column -> {value: well count}, values in sorted order, missing values excluded.
+        """
+        columns = self._facet_columns if columns is None else columns
+        positions = [self._facet_columns.index(col) for col in columns]
+        facet_codes = self._facet_codes[mask][:, positions]
+        n_bins = int(self._facet_offsets[-1])
+        present = np.bincount(facet_codes.ravel(), minlength=n_bins)
+        if "Well_Name" in self.codes:
+            # Count distinct (value, well) pairs rather than rows; unnamed rows count no well
+            wells = self.codes["Well_Name"][mask]
+            n_wells = len(self.values["Well_Name"])
+            pairs = np.unique((facet_codes[wells >= 0] * n_wells + wells[wells >= 0, None]).ravel())
+            counts = np.bincount(pairs // n_wells, minlength=n_bins) if n_wells else np.zeros(n_bins, dtype=np.int64)
+        else:
+            counts = present
+        facets = {}
+        for col, i in zip(columns, positions):
+            start, end = self._facet_offsets[i] + 1, self._facet_offsets[i + 1]
+            col_counts = counts[start:end]
+            facets[col] = {self.values[col][code]: int(col_counts[code]) for code in np.flatnonzero(present[start:end])}
+        return facets
+
+    def value_mask(self, col, value):
+        """Returns the mask of rows whose column equals the (string) value."""
+        if col in self.value_masks:
+            return self.value_masks[col].get(value, np.zeros(self.n_rows, dtype=bool))
+        values = self.values[col]
+        code = values.index(value) if value in values else -2
+        return self.codes[col] == code
+
+    def contains_mask(self, col, substring):
+        """Returns the mask of rows whose column contains the substring (missing values never match)."""
+        matching = [code for code, value in enumerate(self.values[col]) if substring in value]
+        return np.isin(self.codes[col], matching)
+
+    def year_bounds(self, mask):
+        """Returns the (min, max) TD year among the masked rows, or None if there are no dates."""
+        years = [year for year, year_mask in self.year_masks.items() if (year_mask & mask).any()]
+        return (min(years), max(years)) if years else None
+
+    def year_range_mask(self, start, end):
+        """Returns the mask of rows with a TD year in [start, end]; undated rows never match."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for year, year_mask in self.year_masks.items():
+            if start <= year <= end:
+                mask |= year_mask
+        return mask
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_filter_index(_df, version):
+    """Returns the filter index for a dataset version, shared across sessions."""
+    appended = split_appended(_df)
+    if appended is not None:
+        parent, parent_version, delta = appended
+        return get_filter_index(parent, parent_version).extend(delta)
+    return FilterIndex(_df)
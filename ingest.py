@@ -0,0 +1,339 @@
+# ingest.py (Incremental Ingestion of New Well Records)
+
+import argparse
+import hashlib
+import io
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (DATA_FILE, cache_dir_for, current_manifest, ingested_fingerprint, ingested_path,
+                         read_ingest_log, write_ingest_log)
+from well_schema import DATE_FORMATS, read_well_csv
+
+# Columns whose highest value marks the rows already ingested: 'No' first, then
+# 'Well_Job_ID' for rows without a 'No'
+WATERMARK_COLUMNS = ["No", "Well_Job_ID"]
+
+# Appended parts are merged into one past this count, bounding the steps of a cold load
+MAX_PARTS = 32
+
+# Known API numbers are stored next to the parquet they came from, one key file each
+KEYS_SUFFIX = ".keys.parquet"
+
+# Outcome of one ingest: rows appended, rows at or below the watermark, rows whose API
+# number was already known, and the per-column conversion error counts of the drop
+IngestResult = namedtuple("IngestResult", ["added", "below_watermark", "duplicates", "parse_errors"])
+
+# Serializes ingests within the server process (the log is read, extended and rewritten)
+_INGEST_LOCK = threading.Lock()
+
+# Cache directory -> (key files read, API numbers in them); an ingest only reads the
+# key files written since the previous one in this process
+_KNOWN_KEYS = {}
+
+
+def api_number_keys(values):
+    """
+    Returns the normalized API number of each row, or missing where it cannot identify a well.
+
+    API numbers are 10 to 14 digits; dashes and spaces are dropped. Blanks, placeholders
+    such as "No Data" and numbers a spreadsheet has rounded into scientific notation
+    (e.g. "4.23E+13", shared by many wells) are treated as unknown.
+
+    Args:
+        values (pd.Series): Raw 'API Number' values.
+
+    Returns:
+        pd.Series: Digit strings, or missing.
+    """
+    text = values.astype(str).str.replace(r"[\s-]", "", regex=True).str.replace(r"\.0+$", "", regex=True)
+    return text.where(values.notna() & text.str.fullmatch(r"\d{10,14}"))
+
+
+def _column(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _watermark(df, previous=None):
+    """Returns the highest value of each WATERMARK_COLUMNS column, never below ``previous``."""
+    watermark = dict(previous or {})
+    for col in WATERMARK_COLUMNS:
+        values = _column(df, col)
+        if (~np.isnan(values)).any():
+            highest = int(np.nanmax(values))
+            watermark[col] = highest if watermark.get(col) is None else max(watermark[col], highest)
+    return watermark
+
+
+def above_watermark(df, watermark):
+    """
+    Returns the mask of rows newer than the watermark.
+
+    A row is new if its 'No' is above the highest ingested 'No'; rows without a 'No'
+    fall back to 'Well_Job_ID'. Rows with neither cannot be placed and count as new
+    (they are still de-duplicated on API number).
+    """
+    new = np.ones(len(df), dtype=bool)
+    undecided = np.ones(len(df), dtype=bool)
+    for col in WATERMARK_COLUMNS:
+        values = _column(df, col)
+        known = undecided & ~np.isnan(values)
+        if watermark.get(col) is not None:
+            new[known] = values[known] > watermark[col]
+        undecided &= ~known
+    return new
+
+
+def _part_name(sha256):
+    return f"wells-part-{sha256[:16]}.parquet"
+
+
+def _write_keys(cache_dir, name, keys):
+    """Writes the distinct API numbers of a base file or part to its key file and returns the file name."""
+    tmp_path = os.path.join(cache_dir, "keys.parquet.tmp")
+    pd.DataFrame({"API Number": pd.Series(sorted(set(keys)), dtype="object")}).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(cache_dir, name))
+    return name
+
+
+def _row_keys(rows):
+    return api_number_keys(rows["API Number"]).dropna() if "API Number" in rows.columns else []
+
+
+def _write_part(cache_dir, rows):
+    """Writes appended rows as a Parquet part, plus the key file of their API numbers, and returns its log entry."""
+    tmp_path = os.path.join(cache_dir, "part.parquet.tmp")
+    rows.to_parquet(tmp_path, index=False)
+    with open(tmp_path, "rb") as fh:
+        sha256 = hashlib.sha256(fh.read()).hexdigest()
+    name = _part_name(sha256)
+    keys = _write_keys(cache_dir, name[:-len(".parquet")] + KEYS_SUFFIX, _row_keys(rows))
+    os.replace(tmp_path, os.path.join(cache_dir, name))
+    return {"file": name, "sha256": sha256, "rows": len(rows), "keys": keys}
+
+
+def _remove_files(cache_dir, names):
+    for name in filter(None, names):
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass
+
+
+def _part_files(parts):
+    return [name for part in parts for name in (part["file"], part.get("keys")) if name]
+
+
+def _base_keys_name(manifest):
+    return f"wells-base-{manifest['sha256'][:16]}{KEYS_SUFFIX}"
+
+
+def _key_files(log):
+    return [log["base_keys"]] + [part["keys"] for part in log["parts"] if part.get("keys")]
+
+
+def _start_log(cache_dir, manifest):
+    """Starts the ingest log of a base file from its cached watermark and API numbers."""
+    base = pd.read_parquet(os.path.join(cache_dir, manifest["parquet"]),
+                           columns=WATERMARK_COLUMNS + ["API Number"])
+    return {
+        "base_sha256": manifest["sha256"],
+        "watermark": _watermark(base),
+        "base_keys": _write_keys(cache_dir, _base_keys_name(manifest), _row_keys(base)),
+        "parts": [],
+        "ingested": None,
+    }
+
+
+def _read_drop(source):
+    """Returns a CSV drop parsed with the schema, its raw text cells and its parse errors."""
+    if hasattr(source, "read"):
+        data = source.read()
+    else:
+        with open(source, "rb") as fh:
+            data = fh.read()
+    drop, parse_errors = read_well_csv(io.BytesIO(data))
+    text = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False)
+    return drop, text, parse_errors
+
+
+def _append_ingested(path, rows):
+    """
+    Appends rows to the ingested rows file, in the source file's columns, and returns
+    the file's new fingerprint. The rows are on disk before this returns.
+    """
+    target = ingested_path(path)
+    exists = os.path.exists(target) and os.path.getsize(target) > 0
+    columns = pd.read_csv(target if exists else path, nrows=0).columns
+    with open(target, "a", newline="") as fh:
+        rows.reindex(columns=columns, fill_value="").to_csv(fh, header=not exists, index=False,
+                                                            date_format=DATE_FORMATS["TD_Date"][0])
+        fh.flush()
+        os.fsync(fh.fileno())
+    return ingested_fingerprint(path)
+
+
+def _known_api_numbers(cache_dir, log):
+    """
+    Returns the set of API numbers already ingested, reading only the key files this
+    process has not read yet.
+    """
+    files = tuple(_key_files(log))
+    read, known = _KNOWN_KEYS.get(cache_dir, ((), set()))
+    if files[:len(read)] != read:
+        # Parts were merged or replaced by another process: start over
+        read, known = (), set()
+    for name in files[len(read):]:
+        known.update(pd.read_parquet(os.path.join(cache_dir, name))["API Number"].tolist())
+    _KNOWN_KEYS[cache_dir] = (files, known)
+    return known
+
+
+def _new_rows(drop, watermark, known_keys):
+    """
+    Returns the masks of a drop's rows above the watermark and of those among them whose
+    API number is already known (or repeated earlier in the drop), and the rows' keys.
+    """
+    new = above_watermark(drop, watermark)
+    keys = api_number_keys(drop["API Number"]) if "API Number" in drop.columns else \
+        pd.Series(pd.NA, index=drop.index, dtype="object")
+    known = np.array([key in known_keys for key in keys], dtype=bool) | keys.where(new).duplicated().to_numpy()
+    return new, new & keys.notna().to_numpy() & known, keys
+
+
+def _rebuild_log(path, cache_dir, manifest, stale):
+    """
+    Re-derives the ingest log and its part from the ingested rows file, keeping the rows
+    that are still new against the current base, and removes the files of the stale log.
+    """
+    log = _start_log(cache_dir, manifest)
+    log["ingested"] = ingested_fingerprint(path)
+    if log["ingested"] is not None:
+        rows, _ = read_well_csv(ingested_path(path))
+        new, duplicate, _ = _new_rows(rows, log["watermark"], _known_api_numbers(cache_dir, log))
+        rows = rows[new & ~duplicate].reset_index(drop=True)
+        if not rows.empty:
+            log.update(watermark=_watermark(rows, log["watermark"]), parts=[_write_part(cache_dir, rows)])
+    write_ingest_log(cache_dir, log)
+    current = set(_part_files(log["parts"]) + [log["base_keys"]])
+    _remove_files(cache_dir, [name for name in _part_files(stale.get("parts", [])) + [stale.get("base_keys")]
+                              if name not in current])
+    return log
+
+
+def _current_log(path, cache_dir, manifest):
+    """Returns the ingest log, rebuilt if the base, the ingested rows file or the cache changed."""
+    log = read_ingest_log(cache_dir)
+    if "ingested" not in log and log.get("parts"):
+        # Parts written before ingested rows were kept next to the source: move their rows there
+        frames = [pd.read_parquet(os.path.join(cache_dir, part["file"])) for part in log["parts"]
+                  if os.path.exists(os.path.join(cache_dir, part["file"]))]
+        if frames:
+            _append_ingested(path, pd.concat(frames, ignore_index=True))
+    if "ingested" in log and log.get("base_sha256") == manifest["sha256"] and \
+            log["ingested"] == ingested_fingerprint(path):
+        return log
+    return _rebuild_log(path, cache_dir, manifest, log)
+
+
+def reconcile_ingested(path=DATA_FILE, cache_dir=None):
+    """
+    Returns the ingest log of a source file, re-deriving its parts first if they are stale.
+
+    Ingested rows are never dropped here: after the source file is replaced or the
+    cache is cleared, every row of the ingested rows file is checked again against
+    the current source, as if it were ingested now.
+
+    Args:
+        path (str): Path to the source CSV file.
+        cache_dir (str, optional): Cache directory. Defaults to CACHE_DIR next to the CSV.
+
+    Returns:
+        dict: The ingest log (no parts without the Parquet cache).
+    """
+    cache_dir = cache_dir_for(path, cache_dir)
+    with _INGEST_LOCK:
+        manifest = current_manifest(path, cache_dir)
+        if not manifest.get("parquet"):
+            return {"parts": []}
+        return _current_log(path, cache_dir, manifest)
+
+
+def ingest_csv(source, path=DATA_FILE, cache_dir=None):
+    """
+    Appends the new rows of a CSV drop to the dataset without reparsing its history.
+
+    Only the drop is parsed. Rows at or below the 'No' / 'Well_Job_ID' watermark and
+    rows whose API number is already known (or repeated within the drop) are skipped;
+    the rest are appended to the ingested rows file next to the source (see
+    ``data_loader.ingested_path``) and written as a Parquet part that
+    ``load_well_data`` appends to the previously loaded version. Per-version indexes and aggregates are then extended
+    with the new rows rather than rebuilt (see ``data_loader.split_appended``).
+
+    Each part's API numbers go to a key file written once next to it, so the log
+    stays small and an ingest reads and writes in proportion to its drop. Past
+    MAX_PARTS parts the appended rows are merged into one part; that occasional
+    merge re-reads the appended rows (never the base file). The parts are only a
+    cache: if they are lost or the source is replaced, they are re-derived from the
+    ingested rows file (see ``reconcile_ingested``).
+
+    Args:
+        source (str | file-like): The CSV drop, in the 'Refine Sample.csv' format.
+        path (str): Path to the source CSV file the rows are appended to.
+        cache_dir (str, optional): Cache directory. Defaults to CACHE_DIR next to the CSV.
+
+    Returns:
+        IngestResult: Counts of added and skipped rows and the drop's parse errors.
+
+    Raises:
+        RuntimeError: If the Parquet cache is unavailable (pyarrow not installed).
+    """
+    cache_dir = cache_dir_for(path, cache_dir)
+    drop, text, parse_errors = _read_drop(source)
+
+    with _INGEST_LOCK:
+        manifest = current_manifest(path, cache_dir)
+        if not manifest.get("parquet"):
+            raise RuntimeError("Incremental ingestion needs the Parquet cache; install pyarrow.")
+        log = _current_log(path, cache_dir, manifest)
+
+        known_keys = _known_api_numbers(cache_dir, log)
+        new, duplicate, keys = _new_rows(drop, log["watermark"], known_keys)
+        kept = new & ~duplicate
+        rows = drop[kept].reset_index(drop=True)
+        result = IngestResult(len(rows), int((~new).sum()), int(duplicate.sum()), parse_errors)
+        if rows.empty:
+            return result
+
+        # The ingested rows file is the durable record; the part and the log only cache it
+        ingested = _append_ingested(path, text[kept])
+        parts = log["parts"] + [_write_part(cache_dir, rows)]
+        if len(parts) > MAX_PARTS:
+            merged = pd.concat([pd.read_parquet(os.path.join(cache_dir, part["file"])) for part in parts],
+                               ignore_index=True)
+            stale, parts = parts, [_write_part(cache_dir, merged)]
+        else:
+            stale = []
+        log.update(watermark=_watermark(rows, log["watermark"]), parts=parts, ingested=ingested)
+        write_ingest_log(cache_dir, log)
+        _remove_files(cache_dir, _part_files(stale))
+        known_keys.update(keys[kept].dropna())
+        _KNOWN_KEYS[cache_dir] = (tuple(_key_files(log)), known_keys)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append the new rows of well CSV drops to the dashboard dataset.")
+    parser.add_argument("drops", nargs="+", help="CSV files in the 'Refine Sample.csv' format")
+    parser.add_argument("--data", default=DATA_FILE, help="Source CSV the rows are appended to")
+    args = parser.parse_args()
+    for drop_path in args.drops:
+        outcome = ingest_csv(drop_path, args.data)
+        print(f"{drop_path}: {outcome.added} rows added, {outcome.below_watermark} below the watermark, "
+              f"{outcome.duplicates} duplicate API numbers")
@@ -0,0 +1,143 @@
+# kpi_engine.py (Vectorized KPI Calculations for Advanced Analysis)
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import dataset_version, split_appended
+from metric_registry import MetricRegistry, DerivedColumnCache
+
+# KPI columns produced by cached_kpis, in display order
+KPI_COLUMNS = [
+    "Shaker Throughput Efficiency",
+    "Cuttings Volume Ratio",
+    "Screen Loading Index",
+    "Fluid Retention on Cuttings (%)",
+    "Drilling Intensity Index",
+    "Fluid Loading Index",
+    "Chemical Demand Rate",
+    "Mud Retention Efficiency (%)",
+    "Downstream Solids Loss",
+]
+
+
+def safe_divide(numerator, denominator):
+    """
+    Element-wise division that returns 0 wherever either side is NaN or the denominator is 0.
+
+    Args:
+        numerator (array-like | float): Numerator values.
+        denominator (array-like | float): Denominator values (broadcast against the numerator).
+
+    Returns:
+        np.ndarray: The quotients.
+    """
+    numerator = np.asarray(numerator, dtype="float64")
+    denominator = np.asarray(denominator, dtype="float64")
+    numerator, denominator = np.broadcast_arrays(numerator, denominator)
+    valid = ~np.isnan(numerator) & ~np.isnan(denominator) & (denominator != 0)
+    result = np.zeros(numerator.shape, dtype="float64")
+    np.divide(numerator, denominator, out=result, where=valid)
+    return result
+
+
+# KPI formulas and their shared intermediates; missing input columns count as 0 (hole size as 1)
+KPI_REGISTRY = MetricRegistry(column_defaults={"Hole_Size": 1})
+
+
+@KPI_REGISTRY.register("SCE %", ["Total_SCE"])
+def _sce_pct(sce):
+    # Every SCE-based ratio is SCE / SCE, i.e. 100% whenever SCE is positive
+    return np.where(sce > 0, 100.0, 0.0)
+
+
+@KPI_REGISTRY.register("Total Fluids", ["Base_Oil", "Water", "Chemicals"])
+def _total_fluids(base_oil, water, chemicals):
+    return base_oil + water + chemicals
+
+
+@KPI_REGISTRY.register("Shaker Throughput Efficiency", ["SCE %"])
+@KPI_REGISTRY.register("Fluid Retention on Cuttings (%)", ["SCE %"])
+def _sce_ratio(sce_pct):
+    return sce_pct
+
+
+@KPI_REGISTRY.register("Mud Retention Efficiency (%)", ["SCE %"])
+@KPI_REGISTRY.register("Downstream Solids Loss", ["SCE %"])
+def _sce_complement(sce_pct):
+    return 100.0 - sce_pct
+
+
+@KPI_REGISTRY.register("Cuttings Volume Ratio", ["Haul_OFF", "IntLength"])
+@KPI_REGISTRY.register("Drilling Intensity Index", ["ROP", "Hole_Size"])
+@KPI_REGISTRY.register("Fluid Loading Index", ["Total Fluids", "IntLength"])
+@KPI_REGISTRY.register("Chemical Demand Rate", ["Chemicals", "IntLength"])
+def _ratio(numerator, denominator):
+    return safe_divide(numerator, denominator)
+
+
+@KPI_REGISTRY.register("Screen Loading Index", [], params=["total_flow_rate", "number_of_screens", "screen_area"])
+def _screen_loading(total_flow_rate, number_of_screens, screen_area):
+    return safe_divide(total_flow_rate, number_of_screens * screen_area)
+
+
+def _metric_frame(df, kpi_values):
+    return pd.DataFrame({
+        "Well_Name": df["Well_Name"].to_numpy() if "Well_Name" in df.columns else "N/A",
+        "Operator": df["Operator"].to_numpy() if "Operator" in df.columns else "N/A",
+        **kpi_values,
+    }, index=pd.RangeIndex(len(df)))
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_kpi_columns(_df, version):
+    """Returns the cached derived KPI columns of a dataset version, shared across sessions."""
+    appended = split_appended(_df)
+    if appended is not None:
+        parent, parent_version, delta = appended
+        return get_kpi_columns(parent, parent_version).extend(_df, delta)
+    return DerivedColumnCache(_df, KPI_REGISTRY)
+
+
+def cached_kpis(df, positions, total_flow_rate, number_of_screens, screen_area):
+    """
+    Returns the KPIs of selected rows, reusing columns cached per dataset version.
+
+    KPIs are computed once over the full dataset; only the metrics whose manual
+    parameters changed (e.g. the Screen Loading Index when the number of screens
+    changes) are recomputed.
+
+    Args:
+        df (pd.DataFrame): The full dataset, as returned by ``load_well_data``.
+        positions (np.ndarray): Row positions to return (e.g. from the shared filters).
+        total_flow_rate (float): Total flow rate (GPM).
+        number_of_screens (int): Number of screens installed.
+        screen_area (float): Area per screen (sq ft).
+
+    Returns:
+        pd.DataFrame: 'Well_Name', 'Operator' and one column per KPI in KPI_COLUMNS for the
+        selected rows (missing input columns are treated as 0, hole size as 1), ready for
+        kpi_heatmap, kpi_boxplot and kpi_comparison_scatter.
+    """
+    params = dict(total_flow_rate=total_flow_rate, number_of_screens=number_of_screens, screen_area=screen_area)
+    kpi_values = get_kpi_columns(df, dataset_version(df)).frame(KPI_COLUMNS, params, positions)
+    return _metric_frame(df.iloc[positions], kpi_values)
+
+
+def normalize_kpis(metric_df, divisor):
+    """
+    Divides every KPI column by the divisor (no-op if the divisor is 0 or None).
+
+    Args:
+        metric_df (pd.DataFrame): Output of cached_kpis.
+        divisor (float | None): Normalization divisor (e.g. total feet or hours).
+
+    Returns:
+        pd.DataFrame: The normalized KPI frame.
+    """
+    if not divisor:
+        return metric_df
+    normalized = metric_df.copy()
+    kpi_cols = [col for col in KPI_COLUMNS if col in normalized.columns]
+    normalized[kpi_cols] = safe_divide(normalized[kpi_cols].to_numpy(dtype="float64"), divisor)
+    return normalized
@@ -0,0 +1,113 @@
+# metric_registry.py (Declarative Registry of Derived Metrics)
+
+from collections import namedtuple
+
+import numpy as np
+
+from caching import BoundedLRUCache
+
+# A named derived column: its dataset/derived inputs, the manual parameters it reads and
+# the function computing it (called with the input arrays, then the parameters by keyword)
+DerivedMetric = namedtuple("DerivedMetric", ["name", "inputs", "params", "func"])
+
+
+class MetricRegistry:
+    """
+    Registry of derived metrics and their declared dependencies.
+
+    Inputs may be dataset columns or other registered metrics, so shared
+    intermediates (e.g. total fluid volume) are declared once and reused.
+
+    Args:
+        column_defaults (dict, optional): Value used for a dataset column that is missing
+            from the DataFrame. Columns not listed default to 0.
+    """
+
+    def __init__(self, column_defaults=None):
+        self.metrics = {}
+        self.column_defaults = column_defaults or {}
+
+    def register(self, name, inputs, params=()):
+        """Decorator registering ``func(*input_arrays, **params)`` as the metric ``name``."""
+        def decorator(func):
+            self.metrics[name] = DerivedMetric(name, tuple(inputs), tuple(params), func)
+            return func
+        return decorator
+
+    def param_names(self, name):
+        """Returns every manual parameter a metric depends on, directly or through its inputs."""
+        metric = self.metrics[name]
+        names = set(metric.params)
+        for dependency in metric.inputs:
+            if dependency in self.metrics:
+                names.update(self.param_names(dependency))
+        return tuple(sorted(names))
+
+
+class DerivedColumnCache:
+    """
+    Derived columns of one dataset version, computed on demand and cached.
+
+    Each computed column is stored under its metric name plus the values of the
+    parameters it depends on, so changing one parameter only recomputes the metrics
+    that read it; everything else (including shared intermediates) is reused.
+
+    Args:
+        df (pd.DataFrame): The full dataset the columns are computed over.
+        registry (MetricRegistry): The metric definitions.
+        max_entries (int): Maximum number of cached columns (across parameter values).
+    """
+
+    def __init__(self, df, registry, max_entries=256):
+        self.df = df
+        self.registry = registry
+        self.columns = BoundedLRUCache(max_entries=max_entries, sizeof=lambda values: values.nbytes)
+
+    def _input(self, name, params):
+        if name in self.registry.metrics:
+            return self.get(name, params)
+        if name in self.df.columns:
+            return self.df[name].to_numpy(dtype="float64", na_value=np.nan)
+        return np.full(len(self.df), self.registry.column_defaults.get(name, 0), dtype="float64")
+
+    def get(self, name, params=None):
+        """
+        Returns the values of a derived metric for every row of the dataset.
+
+        Args:
+            name (str): Registered metric name.
+            params (dict, optional): Manual parameter values.
+
+        Returns:
+            np.ndarray: The metric values (treat as read-only, they are shared).
+        """
+        params = params or {}
+        metric = self.registry.metrics[name]
+        key = (name, tuple((param, params[param]) for param in self.registry.param_names(name)))
+
+        def compute():
+            inputs = [self._input(dependency, params) for dependency in metric.inputs]
+            values = np.asarray(metric.func(*inputs, **{param: params[param] for param in metric.params}),
+                                dtype="float64")
+            return np.broadcast_to(values, (len(self.df),))
+
+        return self.columns.get_or_compute(key, compute)
+
+    def extend(self, df, delta):
+        """
+        Returns the cache for ``df``, this dataset with the rows of ``delta`` appended.
+
+        Every cached column is carried over by computing it for the appended rows only.
+        """
+        extended = DerivedColumnCache(df, self.registry, self.columns.max_entries)
+        delta_columns = DerivedColumnCache(delta, self.registry, self.columns.max_entries)
+        for (name, params), values in self.columns.items():
+            extended.columns.put((name, params), np.concatenate([values, delta_columns.get(name, dict(params))]))
+        return extended
+
+    def frame(self, names, params=None, positions=None):
+        """Returns a dict of metric name -> values, optionally restricted to row positions."""
+        values = {name: self.get(name, params) for name in names}
+        if positions is not None:
+            values = {name: column[positions] for name, column in values.items()}
+        return values
@@ -1,13 +1,160 @@
 # multi_well.py (Multi-Well Comparison Page)
 
+import numpy as np
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
 
 # Import shared utility functions and chart functions
-from utils import apply_shared_filters
+from utils import chart_fragment, shared_filter_selection
+from data_loader import dataset_version
+from well_summary import get_well_summary
 from enhanced_dashboard_charts import radar_chart_multi_kpi, rop_vs_depth_scatter
+from downsampling import downsample_ranked, points_label
+from spatial_index import LAT_COLUMN, LON_COLUMN, cluster_cell_degrees, get_spatial_index, zoom_for_extent
+from offset_wells import offset_comparison, offset_wells
+from analog_wells import get_analog_index
+
+# Wells drawn individually up to this many in view; beyond it the map shows clusters
+MAX_MAP_WELLS = 3_000
+
+
+@chart_fragment
+def render_well_map(df, positions):
+    """
+    Renders the well map from the dataset's spatial index.
+
+    Each well is placed at its first filtered row with coordinates. Only the wells
+    inside the chosen latitude / longitude view are sent to the browser, and when
+    there are more than MAX_MAP_WELLS of them they are drawn as grid clusters sized
+    by well count.
+
+    Args:
+        df (pd.DataFrame): The full dataset.
+        positions (np.ndarray): Row positions selected by the shared filters.
+    """
+    st.subheader("🗺️ Well Map")
+    version = dataset_version(df)
+    index = get_spatial_index(df, version)
+    # One point per well, not per row: multi-row wells would otherwise stack and be counted repeatedly
+    wells = get_well_summary(df, version).first_rows(index.located(positions))
+    extent = index.extent(wells)
+    if extent is None:
+        st.info("No valid geographical coordinates available for the well map with current filters.")
+        return
+
+    # Slider bounds on a 0.01 degree grid; the widgets are keyed by the extent so a
+    # new filter selection starts from its full extent
+    south, north = float(np.floor(extent[0] * 100) / 100), float(np.ceil(extent[1] * 100) / 100)
+    west, east = float(np.floor(extent[2] * 100) / 100), float(np.ceil(extent[3] * 100) / 100)
+    extent_key = f"{south}_{north}_{west}_{east}"
+    col1, col2 = st.columns(2)
+    lat_range = col1.slider("Latitude", south, north, (south, north), step=0.01, key=f"map_lat_{extent_key}") \
+        if north > south else (south, north)
+    lon_range = col2.slider("Longitude", west, east, (west, east), step=0.01, key=f"map_lon_{extent_key}") \
+        if east > west else (west, east)
+
+    in_view = index.query(lat_range[0], lat_range[1], lon_range[0], lon_range[1], wells)
+    if len(in_view) == 0:
+        st.info("No wells inside the selected map view.")
+        return
+    zoom = zoom_for_extent(lat_range[0], lat_range[1], lon_range[0], lon_range[1])
+    center = {"lat": (lat_range[0] + lat_range[1]) / 2, "lon": (lon_range[0] + lon_range[1]) / 2}
+
+    if len(in_view) > MAX_MAP_WELLS:
+        clusters = index.clusters(in_view, cluster_cell_degrees(zoom))
+        fig_map = px.scatter_mapbox(clusters, lat=LAT_COLUMN, lon=LON_COLUMN, size="Wells", hover_data={"Wells": ":,"},
+                                    size_max=40, zoom=zoom, center=center, height=500,
+                                    title="Well Locations (clustered)")
+        caption = f"{len(in_view):,} wells in view, grouped into {len(clusters):,} clusters"
+    else:
+        fig_map = px.scatter_mapbox(
+            df.iloc[in_view], lat=LAT_COLUMN, lon=LON_COLUMN, hover_name="Well_Name",
+            color="Operator" if "Operator" in df.columns else None, # Color points by operator
+            zoom=zoom, center=center, height=500,
+            title="Well Locations"
+        )
+        caption = f"{len(in_view):,} wells in view"
+    fig_map.update_layout(mapbox_style="open-street-map")
+    st.plotly_chart(fig_map, use_container_width=True)
+    st.caption(f"{caption} · {len(wells):,} filtered wells with coordinates")
+
+
+@chart_fragment
+def render_offset_wells(df, well_df, positions):
+    """
+    Renders the offset-well search: the wells within a radius of a selected well,
+    their shaker type and KPIs, compared with the selected well.
+
+    Args:
+        df (pd.DataFrame): The full dataset.
+        well_df (pd.DataFrame): Per-well summary of the filtered rows (wells to pick from).
+        positions (np.ndarray): Row positions selected by the shared filters.
+    """
+    st.subheader("📍 Offset Wells")
+    located = well_df.dropna(subset=[LAT_COLUMN, LON_COLUMN]) if LAT_COLUMN in well_df.columns else well_df.iloc[:0]
+    if located.empty:
+        st.info("No wells with coordinates available for an offset search with current filters.")
+        return
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    well_name = col1.selectbox("Well", located["Well_Name"], key="offset_well")
+    radius = col2.number_input("Radius (miles)", min_value=0.5, max_value=250.0, value=10.0, step=0.5,
+                               key="offset_radius")
+    filtered_only = col3.checkbox("Filtered wells only", value=False, key="offset_filtered_only",
+                                  help="Only return offsets that match the shared filters")
+
+    result = offset_wells(df, well_name, radius, positions if filtered_only else None)
+    if result is None:
+        st.info(f"'{well_name}' has no usable coordinates.")
+        return
+    offsets = result.offsets
+    derrick_count = int((offsets["Shaker Type"] == "Derrick").sum())
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Offset Wells", f"{len(offsets):,}")
+    col2.metric("Derrick", f"{derrick_count:,}")
+    col3.metric("Non-Derrick", f"{len(offsets) - derrick_count:,}")
+    if offsets.empty:
+        st.info(f"No offset wells within {radius:g} miles of {well_name}.")
+        return
+
+    st.dataframe(offset_comparison(result).style.format("{:,.2f}"), use_container_width=True)
+    st.dataframe(offsets.reset_index(), use_container_width=True, hide_index=True)
+    st.download_button("Download Offset Wells", offsets.reset_index().to_csv(index=False).encode('utf-8'),
+                       file_name=f"offset_wells_{well_name}.csv", mime="text/csv", key="offset_download")
+
+
+@chart_fragment
+def render_metric_comparison(well_df):
+    """
+    Renders a bar chart comparing one selected metric across wells.
+
+    Args:
+        well_df (pd.DataFrame): Per-well summary of the filtered rows.
+    """
+    st.subheader("📊 Compare Metrics")
+    numeric_cols = well_df.select_dtypes(include='number').columns.tolist()
+    # Exclude columns that are IDs or not relevant for direct comparison as primary metric
+    exclude = ['Rows', 'No', 'Well_Job_ID', 'Well_Coord_Lon', 'Well_Coord_Lat', 'Hole_Size', 'IsReviewed', 'State Code', 'County Code', 'Total_SCE', 'Base_Oil', 'Water', 'Chemicals', 'Drilling_Hours', 'Total_Dil', 'LGS', 'DSRE']
+    metric_options = [col for col in numeric_cols if col not in exclude]
+    
+    if not metric_options:
+        st.info("No comparable numeric metrics available with current filters.")
+        return
+
+    selected_metric = st.selectbox("Select Metric", metric_options, key="multi_well_metric_select")
+
+    if selected_metric:
+        # Too many bars to draw: keep the extremes and evenly spaced ranks, in rank order
+        bar_df, total_bars = downsample_ranked(well_df, selected_metric)
+        aggregate = "total" if selected_metric.endswith(" Sum") else "average"
+        fig = px.bar(bar_df, x="Well_Name", y=selected_metric, color="Operator",
+                     title=f"{selected_metric} across Wells (per-well {aggregate})")
+        fig.update_layout(xaxis_tickangle=45)
+        if len(bar_df) < total_bars:
+            fig.update_xaxes(categoryorder="array", categoryarray=bar_df["Well_Name"].unique())
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(points_label(len(bar_df), total_bars, "highest, lowest and evenly spaced ranks", "wells"))
+
 
 def render_multi_well(df):
     """
@@ -17,12 +164,16 @@ def render_multi_well(df):
         df (pd.DataFrame): The raw input DataFrame.
     """
     st.title("🚀 Prodigy IQ Multi-Well Dashboard")
-    filtered_df = apply_shared_filters(df) # Apply shared filters
+    selection = shared_filter_selection(df) # Apply shared filters
+    filtered_df = df.iloc[selection.positions]
 
     if filtered_df.empty:
         st.info("No data available for Multi-Well Comparison with current filters.")
         return
 
+    # One row per well from the table materialized for this dataset version
+    well_df = get_well_summary(df, dataset_version(df)).summarize(selection.positions).reset_index()
+
     st.subheader("Summary Metrics")
     col1, col2, col3, col4, col5, col6 = st.columns(6)
     
@@ -34,39 +185,14 @@ def render_multi_well(df):
     col5.metric("🚛 Haul OFF", f"{filtered_df['Haul_OFF'].mean():.1f}" if 'Haul_OFF' in filtered_df.columns and not filtered_df['Haul_OFF'].empty else "N/A")
     col6.metric("🌡️ AMW", f"{filtered_df['AMW'].mean():.2f}" if 'AMW' in filtered_df.columns and not filtered_df['AMW'].empty else "N/A")
 
-    st.subheader("📊 Compare Metrics")
-    numeric_cols = filtered_df.select_dtypes(include='number').columns.tolist()
-    # Exclude columns that are IDs or not relevant for direct comparison as primary metric
-    exclude = ['No', 'Well_Job_ID', 'Well_Coord_Lon', 'Well_Coord_Lat', 'Hole_Size', 'IsReviewed', 'State Code', 'County Code', 'Total_SCE', 'Base_Oil', 'Water', 'Chemicals', 'Drilling_Hours', 'Total_Dil', 'LGS', 'DSRE']
-    metric_options = [col for col in numeric_cols if col not in exclude]
-    
-    if not metric_options:
-        st.info("No comparable numeric metrics available with current filters.")
-    else:
-        selected_metric = st.selectbox("Select Metric", metric_options, key="multi_well_metric_select")
-
-        if selected_metric:
-            fig = px.bar(filtered_df, x="Well_Name", y=selected_metric, color="Operator",
-                         title=f"{selected_metric} across Wells")
-            fig.update_layout(xaxis_tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+    render_metric_comparison(well_df)
 
-    radar_chart_multi_kpi(filtered_df) # Call the radar chart function
+    # The radar chart with an analog finder over every well of this dataset version
+    radar_chart_multi_kpi(well_df, get_analog_index(df, dataset_version(df)))
 
     rop_vs_depth_scatter(filtered_df) # New chart added
 
-    st.subheader("🗺️ Well Map")
-    # Ensure latitude and longitude columns exist and have non-null values
-    if "Well_Coord_Lon" in filtered_df.columns and "Well_Coord_Lat" in filtered_df.columns and not filtered_df.dropna(subset=["Well_Coord_Lon", "Well_Coord_Lat"]).empty:
-        fig_map = px.scatter_mapbox(
-            filtered_df.dropna(subset=["Well_Coord_Lon", "Well_Coord_Lat"]),
-            lat="Well_Coord_Lat", lon="Well_Coord_Lon", hover_name="Well_Name",
-            color="Operator", # Color points by operator
-            zoom=4, height=500,
-            title="Well Locations"
-        )
-        fig_map.update_layout(mapbox_style="open-street-map")
-        st.plotly_chart(fig_map, use_container_width=True)
-    else:
-        st.info("No valid geographical coordinates available for the well map with current filters.")
+    render_well_map(df, selection.positions)
+
+    render_offset_wells(df, well_df, selection.positions)
 
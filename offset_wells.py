@@ -0,0 +1,97 @@
+# offset_wells.py (Offset-Well Radius Search)
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_loader import dataset_version
+from filter_index import get_filter_index
+from spatial_index import LAT_COLUMN, LON_COLUMN, get_spatial_index
+from well_summary import get_well_summary
+
+# Per-well KPIs compared between a well and its offsets (those present in the data)
+OFFSET_KPIS = ["ROP", "Dilution_Ratio", "Discard Ratio", "DSRE", "AMW", "Haul_OFF Sum", "IntLength Sum"]
+
+# A well's own summary row and its offset wells (one row per well, nearest first)
+OffsetResult = namedtuple("OffsetResult", ["well", "offsets"])
+
+
+def well_location(df, well_name):
+    """Returns the (lat, lon) of a well from the per-well summary, or None if it has no coordinates."""
+    table = get_well_summary(df, dataset_version(df)).table
+    if well_name not in table.index or LAT_COLUMN not in table.columns:
+        return None
+    lat, lon = table.at[well_name, LAT_COLUMN], table.at[well_name, LON_COLUMN]
+    if np.isnan(lat) or np.isnan(lon):
+        return None
+    return float(lat), float(lon)
+
+
+def offset_wells(df, well_name, radius_miles, positions=None):
+    """
+    Finds the wells within a radius of a well and summarizes their KPIs.
+
+    Candidate rows come from the dataset's spatial index, so only the rows around
+    the well are measured; they are then rolled up per well.
+
+    Args:
+        df (pd.DataFrame): The full dataset, as returned by ``load_well_data``.
+        well_name (str): The well to search around.
+        radius_miles (float): Search radius in miles.
+        positions (np.ndarray, optional): Only consider these rows (e.g. the shared filters).
+
+    Returns:
+        OffsetResult | None: The well's summary row and its offset wells with 'Distance (mi)',
+        'Operator', 'Shaker Type' ('Derrick' if any of the well's rows used Derrick shakers),
+        'Rows' and the OFFSET_KPIS; None if the well has no coordinates.
+    """
+    location = well_location(df, well_name)
+    if location is None:
+        return None
+    version = dataset_version(df)
+    summary = get_well_summary(df, version)
+    rows, distances = get_spatial_index(df, version).within_radius(location[0], location[1], radius_miles, positions)
+    named = summary.codes[rows] >= 0
+    rows, distances = rows[named], distances[named]
+
+    wells = summary.summarize(rows)
+    codes = summary.codes[rows]
+    well_codes = summary.wells.get_indexer(wells.index)
+    # Each well's distance is that of its nearest row
+    nearest = np.full(len(summary.wells), np.inf)
+    np.minimum.at(nearest, codes, distances)
+    index = get_filter_index(df, version)
+    derrick_rows = np.zeros(len(summary.wells))
+    if "flowline_Shakers" in index.codes:
+        derrick_codes = [code for code, value in enumerate(index.values["flowline_Shakers"]) if "Derrick" in value]
+        derrick_rows = np.bincount(codes, weights=np.isin(index.codes["flowline_Shakers"][rows], derrick_codes),
+                                   minlength=len(summary.wells))
+    wells = wells.assign(**{
+        "Distance (mi)": nearest[well_codes],
+        "Shaker Type": np.where(derrick_rows[well_codes] > 0, "Derrick", "Non-Derrick"),
+    })
+    columns = ["Distance (mi)", "Operator", "Shaker Type", "Rows"] + OFFSET_KPIS
+    wells = wells[[col for col in columns if col in wells.columns]].sort_values("Distance (mi)", kind="stable")
+
+    well = summary.table.loc[[well_name]]
+    return OffsetResult(well, wells.drop(index=well_name, errors="ignore"))
+
+
+def offset_comparison(result):
+    """
+    Compares a well's KPIs with the mean of its Derrick and Non-Derrick offsets.
+
+    Args:
+        result (OffsetResult): Output of ``offset_wells``.
+
+    Returns:
+        pd.DataFrame: One row per KPI with the well's value and the offset cohorts' means.
+    """
+    kpis = [col for col in OFFSET_KPIS if col in result.offsets.columns]
+    comparison = pd.DataFrame({"This Well": result.well[kpis].iloc[0]})
+    for shaker_type in ["Derrick", "Non-Derrick"]:
+        cohort = result.offsets[result.offsets["Shaker Type"] == shaker_type]
+        comparison[f"{shaker_type} Offsets (n={len(cohort)})"] = cohort[kpis].mean()
+    comparison.index.name = "KPI"
+    return comparison
@@ -0,0 +1,292 @@
+# olap_cube.py (Pre-Aggregated Cube over the Shared Filter Dimensions)
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import split_appended
+from filter_index import SELECT_FILTER_COLUMNS, DEPTH_BINS, MW_BINS, get_filter_index
+
+# Cube dimensions: the selectbox filter columns, TD month and the depth / mud weight bins
+CUBE_DIMENSIONS = SELECT_FILTER_COLUMNS + ["Month", "Depth Bin", "AMW Bin"]
+
+# Columns aggregated in every cell
+CUBE_MEASURES = ["ROP", "Discard Ratio", "Dilution_Ratio", "AMW", "DSRE", "IntLength", "Total_Dil", "Haul_OFF",
+                 "Base_Oil", "Water", "Chemicals"]
+
+# Binned dimensions: (dimension, source column, bins)
+BIN_DIMENSIONS = [("Depth Bin", "MD Depth", DEPTH_BINS), ("AMW Bin", "AMW", MW_BINS)]
+
+
+def _bin_codes(values, bins):
+    """Returns the position of each value's [low, high) bin in ``bins``, or -1 if it falls in none."""
+    codes = np.full(len(values), -1)
+    for code, (low, high) in enumerate(bins.values()):
+        codes[(values >= low) & (values < high)] = code
+    return codes
+
+
+def _month_codes(df):
+    """Returns the sorted TD month codes of the rows (-1 if undated) and the month labels."""
+    months = df["TD_Date"].dt.to_period("M").astype(str).where(df["TD_Date"].notna())
+    codes, uniques = pd.factorize(months, sort=True)
+    return codes, list(uniques)
+
+
+def _remap(old_labels, new_labels):
+    """Maps codes into ``old_labels`` to codes into ``new_labels``; index -1 (missing) stays -1."""
+    return np.append(pd.Index(new_labels).get_indexer(old_labels), -1)
+
+
+def _row_stats(df, measures):
+    """Returns each measure's per-row (non-missing flag, value, squared value), missing values as 0."""
+    values = {col: df[col].to_numpy(dtype="float64", na_value=np.nan) for col in measures}
+    return {col: ((~np.isnan(v)).astype("float64"), np.nan_to_num(v), np.nan_to_num(v) ** 2)
+            for col, v in values.items()}
+
+
+def _group_cells(dims, labels, count, stats):
+    """Aggregates rows (or finer cells) into one cell per distinct combination of dimension codes."""
+    n_rows = len(count)
+    if dims:
+        combos, cell_of_row = np.unique(np.column_stack(list(dims.values())), axis=0, return_inverse=True)
+        cell_of_row = cell_of_row.ravel()
+    else:
+        combos, cell_of_row = np.zeros((min(n_rows, 1), 0), dtype=np.int64), np.zeros(n_rows, dtype=np.int64)
+    n_cells = len(combos)
+    return CubeCells({dim: combos[:, i] for i, dim in enumerate(dims)}, labels,
+                     np.bincount(cell_of_row, weights=count, minlength=n_cells),
+                     {col: tuple(np.bincount(cell_of_row, weights=arr, minlength=n_cells) for arr in arrays)
+                      for col, arrays in stats.items()})
+
+
+class CubeCells:
+    """
+    Additive aggregates per cell: a row count and, for each measure, the count of
+    non-missing values, their sum and their sum of squares.
+
+    Attributes:
+        dims (dict): Dimension -> int array of label codes per cell (-1 if missing).
+        labels (dict): Dimension -> list of labels (indexed by code).
+        count (np.ndarray): Rows per cell.
+        stats (dict): Measure -> (non-missing count, sum, sum of squares) arrays per cell.
+    """
+
+    def __init__(self, dims, labels, count, stats):
+        self.dims = dims
+        self.labels = labels
+        self.count = count
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.count)
+
+    def rollup(self, by, measures=(), mask=None):
+        """
+        Rolls the cells up to one dimension.
+
+        Args:
+            by (str): Dimension to group by (cells where it is missing are skipped).
+            measures (list): Measures to aggregate.
+            mask (np.ndarray, optional): Boolean cell mask to roll up (default: every cell).
+
+        Returns:
+            pd.DataFrame: Indexed by the dimension's labels (only those present), with
+            'Rows' and '<measure> Count', '<measure> Sum', '<measure> Mean' and
+            '<measure> Std' for every measure (mean and std are NaN without values).
+        """
+        codes = self.dims[by]
+        selected = codes >= 0 if mask is None else mask & (codes >= 0)
+        codes = codes[selected]
+        n_labels = len(self.labels[by])
+        rows = np.bincount(codes, weights=self.count[selected], minlength=n_labels)
+        result = {"Rows": rows.astype(np.int64)}
+        for measure in measures:
+            n, total, total_sq = (np.bincount(codes, weights=values[selected], minlength=n_labels)
+                                  for values in self.stats[measure])
+            mean = np.divide(total, n, out=np.full(n_labels, np.nan), where=n > 0)
+            variance = np.divide(total_sq - n * mean ** 2, n - 1, out=np.full(n_labels, np.nan), where=n > 1)
+            result[f"{measure} Count"] = n.astype(np.int64)
+            result[f"{measure} Sum"] = total
+            result[f"{measure} Mean"] = mean
+            result[f"{measure} Std"] = np.sqrt(np.maximum(variance, 0))
+        rolled = pd.DataFrame(result, index=pd.Index(self.labels[by], name=by))
+        return rolled[rows > 0]
+
+    def means(self, by, measure, mask=None):
+        """
+        Returns the mean of a measure per label of ``by``, as chart-ready columns.
+
+        Returns:
+            pd.DataFrame: Columns ``by`` and ``measure`` (labels without values skipped);
+            empty if the cube lacks the dimension or measure.
+        """
+        if by not in self.dims or measure not in self.stats:
+            return pd.DataFrame(columns=[by, measure])
+        rolled = self.rollup(by, [measure], mask)
+        return rolled.loc[rolled[f"{measure} Count"] > 0, f"{measure} Mean"].rename(measure).reset_index()
+
+    def sums(self, by, measures, mask=None):
+        """
+        Returns the sums of measures per label of ``by``, as chart-ready columns.
+
+        Returns:
+            pd.DataFrame: Columns ``by`` and one per measure; empty if the cube lacks any of them.
+        """
+        if by not in self.dims or any(measure not in self.stats for measure in measures):
+            return pd.DataFrame(columns=[by] + list(measures))
+        rolled = self.rollup(by, measures, mask)
+        return rolled[[f"{measure} Sum" for measure in measures]].set_axis(list(measures), axis=1).reset_index()
+
+
+class OlapCube:
+    """
+    Cube of additive aggregates over the shared filter dimensions plus TD month.
+
+    Built once per dataset version. Any combination of the selectbox, TD year, depth
+    and mud weight filters selects a set of cells, and charts roll those cells up, so
+    the cost depends on the number of occupied cells rather than rows. The free-text
+    search cannot be expressed in cells; ``rows`` gives the same interface over
+    individual rows for that case. Because cells are additive, appended rows are
+    grouped on their own and merged into the existing cells (see ``extend``).
+
+    Args:
+        df (pd.DataFrame): The full dataset.
+        index (FilterIndex): The dataset's filter index.
+    """
+
+    def __init__(self, df, index):
+        n_rows = len(df)
+        dims, labels = {}, {}
+        # The selectbox dimensions reuse the filter index's factorized codes
+        for col in SELECT_FILTER_COLUMNS:
+            if col in index.codes:
+                dims[col], labels[col] = index.codes[col], index.values[col]
+        if "TD_Date" in df.columns:
+            dims["Month"], labels["Month"] = _month_codes(df)
+        for dim, col, bins in BIN_DIMENSIONS:
+            if col in df.columns:
+                dims[dim] = _bin_codes(df[col].to_numpy(dtype="float64", na_value=np.nan), bins)
+                labels[dim] = list(bins)
+
+        row_stats = _row_stats(df, [col for col in CUBE_MEASURES if col in df.columns])
+        # Individual rows, used when a selection cannot be answered from cells
+        self._rows = CubeCells(dims, labels, np.ones(n_rows), row_stats)
+        # Occupied cells: one per distinct combination of dimension codes
+        self._set_cells(_group_cells(dims, labels, self._rows.count, row_stats))
+
+    def _set_cells(self, cells):
+        self.cells = cells
+        month_years = np.array([int(month[:4]) for month in cells.labels.get("Month", [])] + [-1])
+        self._cell_years = month_years[cells.dims["Month"]] if "Month" in cells.dims else None
+
+    def extend(self, delta, index):
+        """
+        Returns the cube of this dataset with the rows of ``delta`` appended.
+
+        The appended rows are grouped into cells on their own and merged with the
+        existing cells, so the cost depends on the delta and the number of occupied
+        cells rather than on the rows already aggregated.
+
+        Args:
+            delta (pd.DataFrame): The appended rows (same columns as the aggregated rows).
+            index (FilterIndex): The filter index of the extended dataset.
+
+        Returns:
+            OlapCube: A new cube; this one is left unchanged.
+        """
+        rows, cells = self._rows, self.cells
+        n_old = len(rows)
+        dims, labels, remaps = {}, {}, {}
+        for col in SELECT_FILTER_COLUMNS:
+            if col in rows.dims:
+                dims[col], labels[col] = index.codes[col], index.values[col]
+                remaps[col] = _remap(rows.labels[col], labels[col])
+        if "Month" in rows.dims:
+            delta_codes, delta_months = _month_codes(delta)
+            labels["Month"] = sorted(set(rows.labels["Month"]).union(delta_months))
+            remaps["Month"] = _remap(rows.labels["Month"], labels["Month"])
+            dims["Month"] = np.concatenate([remaps["Month"][rows.dims["Month"]],
+                                            _remap(delta_months, labels["Month"])[delta_codes]])
+        for dim, col, bins in BIN_DIMENSIONS:
+            if dim in rows.dims:
+                labels[dim] = rows.labels[dim]
+                dims[dim] = np.concatenate([rows.dims[dim],
+                                            _bin_codes(delta[col].to_numpy(dtype="float64", na_value=np.nan), bins)])
+
+        delta_stats = _row_stats(delta, list(rows.stats))
+        extended = OlapCube.__new__(OlapCube)
+        extended._rows = CubeCells(dims, labels, np.ones(n_old + len(delta)), {
+            col: tuple(np.concatenate(pair) for pair in zip(arrays, delta_stats[col]))
+            for col, arrays in rows.stats.items()
+        })
+        # Existing cells under the new label codes, followed by the appended rows as single-row cells
+        merged_dims = {dim: np.concatenate([remaps[dim][cells.dims[dim]] if dim in remaps else cells.dims[dim],
+                                            codes[n_old:]])
+                       for dim, codes in dims.items()}
+        merged_stats = {col: tuple(np.concatenate(pair) for pair in zip(arrays, delta_stats[col]))
+                        for col, arrays in cells.stats.items()}
+        extended._set_cells(_group_cells(merged_dims, labels, np.concatenate([cells.count, np.ones(len(delta))]),
+                                         merged_stats))
+        return extended
+
+    @staticmethod
+    def answerable(state):
+        """Returns True if a shared filter state can be answered from cells (no search term)."""
+        return not state.get("search", ("", False))[0]
+
+    def cell_mask(self, state):
+        """
+        Returns the mask of cells selected by a shared filter state (see ``answerable``).
+
+        Mirrors the row filters: a TD year range excludes undated rows, and a bin
+        filter excludes rows without a value.
+        """
+        cells = self.cells
+        mask = np.ones(len(cells), dtype=bool)
+        for col in SELECT_FILTER_COLUMNS:
+            value = state.get(f"filter_{col}", "All")
+            if value != "All" and col in cells.dims:
+                code = cells.labels[col].index(value) if value in cells.labels[col] else -2
+                mask &= cells.dims[col] == code
+        year_range = state.get("filter_td_date")
+        if year_range is not None and self._cell_years is not None:
+            mask &= (self._cell_years >= year_range[0]) & (self._cell_years <= year_range[1]) & \
+                (cells.dims["Month"] >= 0)
+        for key, dim, bins in [("filter_depth", "Depth Bin", DEPTH_BINS), ("filter_amw", "AMW Bin", MW_BINS)]:
+            value = state.get(key, "All")
+            if value != "All" and dim in cells.dims:
+                mask &= cells.dims[dim] == list(bins).index(value)
+        return mask
+
+    def rows(self, positions):
+        """Returns the given rows as single-row cells, for selections the cube cannot answer."""
+        rows = self._rows
+        return CubeCells({dim: codes[positions] for dim, codes in rows.dims.items()}, rows.labels,
+                         rows.count[positions],
+                         {col: tuple(arr[positions] for arr in arrays) for col, arrays in rows.stats.items()})
+
+    def select(self, selection):
+        """
+        Returns the cells for a shared filter selection, and their mask.
+
+        Args:
+            selection (SharedFilterSelection): Output of ``shared_filter_selection``.
+
+        Returns:
+            tuple[CubeCells, np.ndarray | None]: Cube cells with a cell mask, or the
+            selected rows (mask None) when a search term is active.
+        """
+        if self.answerable(selection.state):
+            return self.cells, self.cell_mask(selection.state)
+        return self.rows(selection.positions), None
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_olap_cube(_df, version):
+    """Returns the cube of a dataset version, shared across sessions."""
+    appended = split_appended(_df)
+    if appended is not None:
+        parent, parent_version, delta = appended
+        return get_olap_cube(parent, parent_version).extend(delta, get_filter_index(_df, version))
+    return OlapCube(_df, get_filter_index(_df, version))
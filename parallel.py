@@ -0,0 +1,52 @@
+# parallel.py (Shared Process Pool for Batched NumPy Work)
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import streamlit as st
+
+# Cap on worker processes, so one dyno's sessions cannot fork an unbounded pool
+MAX_WORKERS = 8
+
+
+def default_workers():
+    """Returns the number of worker processes to use by default (one per CPU, capped)."""
+    return max(1, min(os.cpu_count() or 1, MAX_WORKERS))
+
+
+@st.cache_resource
+def get_process_pool(max_workers):
+    """
+    Returns a process pool shared by every session, started once per server.
+
+    Workers are spawned rather than forked: the server is multi-threaded, and a
+    forked child can inherit a lock held by another thread and deadlock.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def map_chunks(func, tasks, n_jobs=None):
+    """
+    Runs ``func(*task)`` for every task, spread over the shared process pool.
+
+    ``func`` must be a module-level function so it can be sent to the workers. Falls
+    back to running in-process for a single job or task, or if the pool is unavailable.
+
+    Args:
+        func (callable): Function to call for each task.
+        tasks (list[tuple]): Positional arguments of each call.
+        n_jobs (int, optional): Worker processes to use. Defaults to default_workers().
+
+    Returns:
+        list: The results, in task order.
+    """
+    n_jobs = default_workers() if n_jobs is None else n_jobs
+    if n_jobs <= 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+    try:
+        return list(get_process_pool(n_jobs).map(func, *zip(*tasks)))
+    except (BrokenProcessPool, OSError):
+        get_process_pool.clear() # Drop the broken pool so the next call starts a fresh one
+        return [func(*task) for task in tasks]
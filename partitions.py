@@ -0,0 +1,237 @@
+# partitions.py (Partitioned Dataset Layout with Partition Pruning)
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import (DATA_FILE, append_part, appended_parts, cache_dir_for, compact_well_data,
+                         current_manifest, load_well_data, source_fingerprint)
+
+# Keys the well records are partitioned by ('TD Year' is derived from TD_Date)
+PARTITION_COLUMNS = ["Basin", "DI Basin", "State Code", "TD Year"]
+
+# Partitions picked with a selectbox; 'TD Year' is picked as a range
+SCOPE_SELECT_COLUMNS = ["Basin", "DI Basin", "State Code"]
+
+PARTITIONS_FILE = "partitions.json"
+PARTITION_DIR_PREFIX = "partitions-"
+
+
+def _partition_keys(df):
+    """Returns the partition key of every row; missing values are None."""
+    keys = pd.DataFrame(index=df.index)
+    for col in PARTITION_COLUMNS:
+        if col == "TD Year":
+            values = df["TD_Date"].dt.year if "TD_Date" in df.columns else pd.Series(np.nan, index=df.index)
+        else:
+            values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        if pd.api.types.is_numeric_dtype(values):
+            # Codes and years are whole numbers, stored as ints rather than e.g. 42.0
+            values = values.astype("Int64")
+        keys[col] = values.astype(object).where(values.notna(), None)
+    return keys
+
+
+def _json_value(value):
+    """Returns a partition key value as a JSON scalar; whole-number floats become ints."""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return None
+    value = value.item() if isinstance(value, np.generic) else value
+    # groupby hands back integer keys as floats when the column also has missing values
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def write_partitions(df, directory):
+    """
+    Writes the well records as one Parquet file per partition key, plus a catalog.
+
+    Each file keeps the rows' positions in ``df`` as its index, so any set of
+    partitions can be read back in the original row order.
+
+    Args:
+        df (pd.DataFrame): The well dataset (with a default RangeIndex).
+        directory (str): Directory to write; it is replaced atomically.
+    """
+    keys = _partition_keys(df)
+    groups = keys.groupby(PARTITION_COLUMNS, dropna=False, sort=False).indices
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    entries = []
+    for i, (key, positions) in enumerate(groups.items()):
+        name = f"part-{i:05d}.parquet"
+        df.iloc[positions].to_parquet(os.path.join(tmp_dir, name), index=True)
+        entries.append({"file": name, "rows": len(positions),
+                        "keys": {col: _json_value(value) for col, value in zip(PARTITION_COLUMNS, key)}})
+    with open(os.path.join(tmp_dir, PARTITIONS_FILE), "w") as fh:
+        json.dump({"columns": PARTITION_COLUMNS, "partitions": entries}, fh)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+
+
+def _key_matches(keys, scope):
+    """Returns True if a partition (or row) key falls inside the scope."""
+    for col in SCOPE_SELECT_COLUMNS:
+        value = scope.get(col, "All")
+        if value != "All" and keys[col] != value:
+            return False
+    year_range = scope.get("TD Year")
+    if year_range is not None and (keys["TD Year"] is None or not year_range[0] <= keys["TD Year"] <= year_range[1]):
+        return False
+    return True
+
+
+class PartitionCatalog:
+    """
+    The partitions of one dataset version and their keys, read without loading any rows.
+
+    A scope is a dict with a value (or "All") for each of SCOPE_SELECT_COLUMNS and a
+    (start, end) 'TD Year' range, or None for every year including undated rows.
+
+    Args:
+        directory (str): The partitioned dataset's directory.
+        entries (list): Catalog entries: {'file', 'rows', 'keys'}.
+        version (str): Version of the partitioned dataset.
+    """
+
+    def __init__(self, directory, entries, version):
+        self.directory = directory
+        self.entries = entries
+        self.version = version
+
+    def __len__(self):
+        return len(self.entries)
+
+    def select(self, scope=None):
+        """Returns the entries of the partitions inside the scope (every partition by default)."""
+        if not scope:
+            return list(self.entries)
+        return [entry for entry in self.entries if _key_matches(entry["keys"], scope)]
+
+    def rows(self, scope=None):
+        """Returns the number of rows inside the scope."""
+        return sum(entry["rows"] for entry in self.select(scope))
+
+    def value_counts(self, col, scope=None):
+        """Returns {value: row count} of a partition column within the scope, sorted, missing values excluded."""
+        counts = {}
+        for entry in self.select(scope):
+            value = entry["keys"][col]
+            if value is not None:
+                counts[value] = counts.get(value, 0) + entry["rows"]
+        return dict(sorted(counts.items()))
+
+
+@st.cache_resource(max_entries=2)
+def _partition_catalog_resource(path, cache_dir, mtime_ns, size):
+    """Process-wide cache of the catalog, keyed by the source fingerprint like the dataset."""
+    manifest = current_manifest(path, cache_dir)
+    if not manifest.get("parquet"):
+        return None
+    version = manifest["sha256"][:16]
+    directory = os.path.join(cache_dir, PARTITION_DIR_PREFIX + version)
+    catalog_file = os.path.join(directory, PARTITIONS_FILE)
+    if not os.path.exists(catalog_file):
+        write_partitions(pd.read_parquet(os.path.join(cache_dir, manifest["parquet"])), directory)
+        for name in os.listdir(cache_dir):
+            if name.startswith(PARTITION_DIR_PREFIX) and name != os.path.basename(directory):
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)  # Drop stale layouts
+    with open(catalog_file) as fh:
+        entries = json.load(fh)["partitions"]
+    for entry in entries:
+        # Catalogs written by earlier versions may hold whole-number keys as floats
+        entry["keys"] = {col: _json_value(value) for col, value in entry["keys"].items()}
+    return PartitionCatalog(directory, entries, version)
+
+
+def partition_catalog(path=DATA_FILE, cache_dir=None):
+    """
+    Returns the catalog of the partitioned copy of the source file, writing it on first use.
+
+    The partitions are derived from the columnar cache and rewritten only when the
+    source file's contents change; older layouts are removed. The catalog is read
+    once per source version and shared by every session, so a rerun only stats the
+    source file.
+
+    Args:
+        path (str): Path to the source CSV file.
+        cache_dir (str, optional): Cache directory. Defaults to CACHE_DIR next to the CSV.
+
+    Returns:
+        PartitionCatalog | None: The catalog, or None without a Parquet cache (no pyarrow).
+    """
+    mtime_ns, size = source_fingerprint(path)
+    return _partition_catalog_resource(path, cache_dir_for(path, cache_dir), mtime_ns, size)
+
+
+def scope_mask(df, scope):
+    """Returns the mask of rows inside the scope, e.g. to prune appended rows like partitions."""
+    keys = _partition_keys(df)
+    return np.array([_key_matches(row, scope) for row in keys.to_dict("records")], dtype=bool)
+
+
+def is_full_scope(scope):
+    """Returns True if the scope selects the whole dataset."""
+    return not scope or (all(scope.get(col, "All") == "All" for col in SCOPE_SELECT_COLUMNS)
+                         and scope.get("TD Year") is None)
+
+
+@st.cache_resource(show_spinner="Loading well data...", max_entries=4)
+def _load_scoped_resource(path, mtime_ns, size, compact, scope_key, _catalog, parts=()):
+    """Process-wide cache of scoped datasets, keyed like the full dataset plus the scope."""
+    scope = dict(scope_key)
+    if parts:
+        parent = _load_scoped_resource(path, mtime_ns, size, compact, scope_key, _catalog, parts[:-1])
+        return append_part(parent, os.path.join(cache_dir_for(path), parts[-1]), compact,
+                           keep=lambda delta: scope_mask(delta, scope))
+
+    catalog = _catalog  # Not hashed: it is determined by the source fingerprint
+    entries = catalog.select(scope)
+    # With nothing in scope, read one partition for its columns and keep no rows
+    frames = [pd.read_parquet(os.path.join(catalog.directory, entry["file"]))
+              for entry in entries or catalog.entries[:1]]
+    df = pd.concat(frames).sort_index().reset_index(drop=True)
+    if not entries:
+        df = df.iloc[:0]
+    if compact:
+        df = compact_well_data(df)
+    manifest = current_manifest(path)
+    df.attrs["dataset_version"] = hashlib.sha256(f"{catalog.version}:{scope_key}".encode()).hexdigest()[:16]
+    df.attrs["parse_errors"] = manifest.get("parse_errors", {})
+    df.attrs["lineage"] = [(df.attrs["dataset_version"], 0)]
+    df.attrs["scope"] = scope
+    return df
+
+
+def load_scoped_data(path=DATA_FILE, scope=None, compact=False, catalog=None):
+    """
+    Returns the well records inside a scope, reading only the partitions it selects.
+
+    A full scope loads the dataset with ``load_well_data``; otherwise only the
+    matching partition files are read (rows appended by ``ingest.py`` are pruned the
+    same way). The result is shared and read-only, like ``load_well_data``'s, and
+    carries its own ``attrs["dataset_version"]``.
+
+    Args:
+        path (str): Path to the source CSV file.
+        scope (dict, optional): Partition scope (see ``PartitionCatalog``).
+        compact (bool): Use the memory-compact representation.
+        catalog (PartitionCatalog, optional): The source's catalog, if the caller already has it.
+
+    Returns:
+        pd.DataFrame: The well records inside the scope, in source order.
+    """
+    if is_full_scope(scope):
+        return load_well_data(path, compact=compact)
+    catalog = partition_catalog(path) if catalog is None else catalog
+    if catalog is None:
+        return load_well_data(path, compact=compact)
+    mtime_ns, size = source_fingerprint(path)
+    scope_key = tuple(sorted((col, tuple(value) if isinstance(value, list) else value)
+                             for col, value in scope.items()))
+    return _load_scoped_resource(path, mtime_ns, size, compact, scope_key, catalog, appended_parts(path))
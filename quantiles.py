@@ -0,0 +1,50 @@
+# quantiles.py (Server-Side Box Statistics)
+
+import pandas as pd
+
+# Box statistics columns returned by box_stats
+BOX_COLUMNS = ["count", "q1", "median", "q3", "lowerfence", "upperfence", "mean"]
+
+
+def _quartiles(values, groups):
+    """Exact quartiles per group, from one grouped pass."""
+    quartiles = values.groupby(groups, observed=True, sort=True).quantile([0.25, 0.5, 0.75]).unstack()
+    quartiles.columns = ["q1", "median", "q3"]
+    return quartiles
+
+
+def box_stats(df, group_col, value_col):
+    """
+    Computes box plot statistics per group, plus the rows that fall outside the whiskers.
+
+    Whiskers follow the Tukey convention plotly uses: they end at the most extreme
+    values within 1.5 IQR of the quartiles, and anything beyond is an outlier.
+
+    Args:
+        df (pd.DataFrame): Rows to summarize.
+        group_col (str): Column defining the boxes (e.g. 'Operator').
+        value_col (str): Numeric column to summarize.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Statistics indexed by group with BOX_COLUMNS,
+        and the outlier rows of ``df`` (rows with a missing group or value are ignored).
+    """
+    values = pd.to_numeric(df[value_col], errors="coerce")
+    valid = values.notna() & df[group_col].notna()
+    values, groups = values[valid], df[group_col][valid]
+    if values.empty:
+        return pd.DataFrame(columns=BOX_COLUMNS), df.iloc[0:0]
+
+    stats = _quartiles(values, groups)
+    iqr = stats["q3"] - stats["q1"]
+    low_bound = (stats["q1"] - 1.5 * iqr).reindex(groups.to_numpy()).to_numpy()
+    high_bound = (stats["q3"] + 1.5 * iqr).reindex(groups.to_numpy()).to_numpy()
+    inside = (values.to_numpy() >= low_bound) & (values.to_numpy() <= high_bound)
+
+    grouped_inside = values[inside].groupby(groups[inside], observed=True)
+    grouped = values.groupby(groups, observed=True)
+    stats["lowerfence"] = grouped_inside.min()
+    stats["upperfence"] = grouped_inside.max()
+    stats["count"] = grouped.size()
+    stats["mean"] = grouped.mean()
+    return stats[BOX_COLUMNS], df[valid][~inside]
@@ -5,7 +5,9 @@ import pandas as pd
 import plotly.express as px
 
 # Import shared utility functions and chart functions
-from utils import apply_shared_filters
+from utils import shared_filter_selection
+from data_loader import dataset_version
+from olap_cube import get_olap_cube
 from enhanced_dashboard_charts import cumulative_wells_chart, fluid_pie_chart_by_operator, avg_rop_over_time_chart
 
 def render_sales_analysis(df):
@@ -16,19 +18,19 @@ def render_sales_analysis(df):
         df (pd.DataFrame): The raw input DataFrame.
     """
     st.title("📈 Prodigy IQ Sales Intelligence")
-    filtered_df = apply_shared_filters(df) # Apply shared filters
+    selection = shared_filter_selection(df) # Apply shared filters
 
-    if filtered_df.empty:
+    if len(selection.positions) == 0:
         st.info("No data available for Sales Analysis with current filters.")
         return
 
+    # Charts roll up pre-aggregated cube cells; a search term falls back to the matching rows
+    cells, cell_mask = get_olap_cube(df, dataset_version(df)).select(selection)
+
     st.subheader("🧭 Wells Over Time")
-    month_df = filtered_df.copy()
-    
-    if "TD_Date" in month_df.columns and not month_df["TD_Date"].empty:
-        month_df["Month"] = month_df["TD_Date"].dt.to_period("M").astype(str)
-        volume = month_df.groupby("Month").size().reset_index(name="Well Count")
-        
+    if "Month" in cells.dims:
+        volume = cells.rollup("Month", mask=cell_mask)["Rows"].rename("Well Count").reset_index()
+
         if not volume.empty:
             fig_monthly = px.bar(volume, x="Month", y="Well Count", title="Wells Completed per Month")
             st.plotly_chart(fig_monthly, use_container_width=True)
@@ -38,11 +40,11 @@ def render_sales_analysis(df):
     else:
         st.info("TD_Date column is missing or empty, cannot show wells over time.")
 
-    avg_rop_over_time_chart(filtered_df) # New chart added
+    avg_rop_over_time_chart(cells.means("Month", "ROP", cell_mask)) # New chart added
 
     st.subheader("🧮 Avg Discard Ratio vs Contractor")
-    if "Contractor" in filtered_df.columns and "Discard Ratio" in filtered_df.columns and not filtered_df.empty:
-        avg_discard = filtered_df.groupby("Contractor")["Discard Ratio"].mean().reset_index()
+    if "Contractor" in cells.dims and "Discard Ratio" in cells.stats:
+        avg_discard = cells.means("Contractor", "Discard Ratio", cell_mask)
         if not avg_discard.empty:
             fig_discard = px.bar(avg_discard, x="Contractor", y="Discard Ratio", color="Contractor",
                                  title="Average Discard Ratio by Contractor")
@@ -55,8 +57,8 @@ def render_sales_analysis(df):
 
     st.subheader("🧃 Fluid Consumption by Operator")
     fluid_cols = ["Base_Oil", "Water", "Chemicals"]
-    if all(col in filtered_df.columns for col in fluid_cols) and "Operator" in filtered_df.columns and not filtered_df.empty:
-        fluid_df_grouped = filtered_df.groupby("Operator")[fluid_cols].sum().reset_index()
+    if all(col in cells.stats for col in fluid_cols) and "Operator" in cells.dims:
+        fluid_df_grouped = cells.sums("Operator", fluid_cols, cell_mask)
         
         if not fluid_df_grouped.empty:
             fluid_df_melted = pd.melt(fluid_df_grouped, id_vars="Operator", var_name="Fluid", value_name="Volume")
@@ -0,0 +1,80 @@
+# search_index.py (Precomputed Full-Text Search for "Search Anything")
+
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import split_appended
+
+# Separates cell values in the row text so a match never spans two cells
+CELL_SEPARATOR = "\x1f"
+
+
+class SearchIndex:
+    """
+    Lowercased text of every row, built once per dataset version.
+
+    Each row's cells are joined with CELL_SEPARATOR so a search resolves to a single
+    vectorized substring scan instead of converting every cell on every keystroke.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def __len__(self):
+        return len(self.text)
+
+    def search(self, term, prefix=False):
+        """
+        Returns a boolean row mask for rows with a cell containing the term.
+
+        Args:
+            term (str): Search term (case-insensitive).
+            prefix (bool): Only match the term at the start of a word.
+
+        Returns:
+            np.ndarray: Boolean mask aligned with the indexed DataFrame's rows.
+        """
+        term = term.strip().lower()
+        if not term:
+            return np.ones(len(self.text), dtype=bool)
+        if prefix:
+            matches = self.text.str.contains(r"(?:^|[^0-9a-z])" + re.escape(term), regex=True)
+        else:
+            matches = self.text.str.contains(term, regex=False)
+        return matches.fillna(False).to_numpy(dtype=bool)
+
+    def extend(self, delta):
+        """Returns the index with the rows of ``delta`` appended; only the new rows are converted."""
+        return SearchIndex(pd.concat([self.text, build_search_index(delta).text], ignore_index=True))
+
+
+def build_search_index(df):
+    """
+    Builds the search index over every column of the DataFrame.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to index.
+
+    Returns:
+        SearchIndex: The index, positionally aligned with ``df``.
+    """
+    parts = [df[col].astype(str).where(df[col].notna(), "") for col in df.columns]
+    text = parts[0].str.cat(parts[1:], sep=CELL_SEPARATOR).str.lower()
+    try:
+        text = text.astype("string[pyarrow]")  # Arrow-backed strings scan much faster
+    except (ImportError, TypeError):
+        pass
+    return SearchIndex(text.reset_index(drop=True))
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_search_index(_df, version):
+    """Returns the search index for a dataset version, shared across sessions."""
+    appended = split_appended(_df)
+    if appended is not None:
+        parent, parent_version, delta = appended
+        return get_search_index(parent, parent_version).extend(delta)
+    return build_search_index(_df)
@@ -0,0 +1,110 @@
+# simulation.py (Monte Carlo Cost Uncertainty Simulation)
+
+import numpy as np
+
+from cost_model import cost_components, sweep_configs
+from parallel import map_chunks
+
+# Supported input distributions and the parameters each one takes
+DISTRIBUTIONS = {
+    "Triangular": ["low", "mode", "high"],
+    "Uniform": ["low", "high"],
+    "Normal": ["mean", "std"],
+}
+
+# Samples drawn per task; chunks are seeded independently, so results do not
+# depend on how many workers process them
+CHUNK_SIZE = 25_000
+
+
+def sample_distribution(rng, spec, size):
+    """
+    Draws samples for one uncertain input.
+
+    Args:
+        rng (np.random.Generator): Random generator.
+        spec (dict): {"kind": one of DISTRIBUTIONS, plus that distribution's parameters}.
+        size (int): Number of samples.
+
+    Returns:
+        np.ndarray: Samples, clipped at 0 since costs, rates and counts cannot be negative.
+    """
+    kind = spec["kind"]
+    if kind == "Triangular":
+        low, mode, high = sorted([spec["low"], spec["mode"], spec["high"]])
+        samples = rng.triangular(low, mode, high, size) if high > low else np.full(size, float(mode))
+    elif kind == "Uniform":
+        low, high = sorted([spec["low"], spec["high"]])
+        samples = rng.uniform(low, high, size)
+    elif kind == "Normal":
+        samples = rng.normal(spec["mean"], abs(spec["std"]), size)
+    else:
+        raise ValueError(f"Unknown distribution: {kind}")
+    return np.maximum(samples, 0.0)
+
+
+def _simulate_chunk(seed, n_samples, derrick_totals, nond_totals, derrick_config, nond_config, specs, side):
+    """Prices one batch of sampled configurations for both cohorts (runs in a worker)."""
+    rng = np.random.default_rng(seed)
+    values = {param: sample_distribution(rng, spec, n_samples) for param, spec in specs.items()}
+    derrick, nond = sweep_configs(derrick_config, nond_config, values, side)
+    derrick_ft = np.broadcast_to(cost_components(derrick_totals, derrick)["Cost/ft"], (n_samples,))
+    nond_ft = np.broadcast_to(cost_components(nond_totals, nond)["Cost/ft"], (n_samples,))
+    return derrick_ft, nond_ft
+
+
+def run_simulation(derrick_totals, nond_totals, derrick_config, nond_config, specs, side="Both",
+                   n_samples=100_000, seed=42, n_jobs=None, bins=60):
+    """
+    Monte Carlo simulation of cost per foot for the Derrick and Non-Derrick cohorts.
+
+    Uncertain inputs are sampled in NumPy batches of CHUNK_SIZE, spread over the shared
+    process pool. Each batch has its own child seed of ``seed``, so a given seed always
+    gives the same result.
+
+    Args:
+        derrick_totals (dict): Derrick cohort totals.
+        nond_totals (dict): Non-Derrick cohort totals.
+        derrick_config (dict): Base Derrick configuration (used for inputs without a distribution).
+        nond_config (dict): Base Non-Derrick configuration.
+        specs (dict): Input -> distribution spec (see sample_distribution).
+        side (str): Which configuration the sampled values apply to: "Derrick",
+            "Non-Derrick" or "Both" (the same draw for both, e.g. a market-wide rate).
+        n_samples (int): Number of samples.
+        seed (int): Random seed.
+        n_jobs (int, optional): Worker processes (defaults to one per CPU).
+        bins (int): Histogram bins returned for plotting.
+
+    Returns:
+        dict: 'percentiles' ({cohort: {"P10", "P50", "P90", "Mean"}} for "Derrick",
+        "Non-Derrick" and "Delta"), 'prob_derrick_cheaper' and 'histogram'
+        ({"edges", "Derrick", "Non-Derrick"} bin counts over shared edges).
+    """
+    chunk_sizes = [CHUNK_SIZE] * (n_samples // CHUNK_SIZE)
+    if n_samples % CHUNK_SIZE:
+        chunk_sizes.append(n_samples % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(chunk_seed, size, derrick_totals, nond_totals, derrick_config, nond_config, specs, side)
+             for chunk_seed, size in zip(seeds, chunk_sizes)]
+    results = map_chunks(_simulate_chunk, tasks, n_jobs)
+
+    derrick_ft = np.concatenate([derrick for derrick, _ in results])
+    nond_ft = np.concatenate([nond for _, nond in results])
+    samples = {"Derrick": derrick_ft, "Non-Derrick": nond_ft, "Delta": nond_ft - derrick_ft}
+
+    percentiles = {}
+    for cohort, values in samples.items():
+        p10, p50, p90 = np.percentile(values, [10, 50, 90])
+        percentiles[cohort] = {"P10": p10, "P50": p50, "P90": p90, "Mean": values.mean()}
+
+    # Only binned counts leave this function, not the raw samples
+    edges = np.histogram_bin_edges(np.concatenate([derrick_ft, nond_ft]), bins=bins)
+    histogram = {"edges": edges,
+                 "Derrick": np.histogram(derrick_ft, bins=edges)[0],
+                 "Non-Derrick": np.histogram(nond_ft, bins=edges)[0]}
+
+    return {
+        "percentiles": percentiles,
+        "prob_derrick_cheaper": float((derrick_ft < nond_ft).mean()),
+        "histogram": histogram,
+    }
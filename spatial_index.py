@@ -0,0 +1,204 @@
+# spatial_index.py (Grid Spatial Index over Well Coordinates)
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import split_appended
+
+LAT_COLUMN = "Well_Coord_Lat"
+LON_COLUMN = "Well_Coord_Lon"
+
+# Side of the index's grid cells, in degrees (~11 km of latitude)
+GRID_CELL_DEGREES = 0.1
+
+# Mean Earth radius, and the length of one degree of latitude, in miles
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * np.pi / 180.0
+
+# Cluster cells per map tile width at a zoom level (a tile spans 360 / 2 ** zoom degrees)
+CLUSTERS_PER_TILE = 16
+
+
+def cluster_cell_degrees(zoom):
+    """Returns the cluster cell size (degrees) used at a map zoom level."""
+    return 360.0 / 2 ** zoom / CLUSTERS_PER_TILE
+
+
+def zoom_for_extent(south, north, west, east):
+    """Returns the map zoom level (1-15) at which a bounding box roughly fills the map."""
+    span = max(north - south, east - west, 1e-3)
+    return int(np.clip(np.floor(np.log2(360.0 / span)), 1, 15))
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance in miles between points given in degrees (arrays broadcast)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype="float64")) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def valid_coordinates(df):
+    """Returns latitude and longitude arrays, NaN where missing, out of range or a (0, 0) placeholder."""
+    if LAT_COLUMN not in df.columns or LON_COLUMN not in df.columns:
+        return np.full(len(df), np.nan), np.full(len(df), np.nan)
+    lat = df[LAT_COLUMN].to_numpy(dtype="float64", na_value=np.nan)
+    lon = df[LON_COLUMN].to_numpy(dtype="float64", na_value=np.nan)
+    invalid = ~((np.abs(lat) <= 90) & (np.abs(lon) <= 180)) | ((lat == 0) & (lon == 0))
+    lat, lon = lat.copy(), lon.copy()
+    lat[invalid] = np.nan
+    lon[invalid] = np.nan
+    return lat, lon
+
+
+class SpatialGridIndex:
+    """
+    Uniform lat/lon grid over the rows with coordinates, built once per dataset version.
+
+    Row positions are stored sorted by grid cell, so a bounding-box query only looks
+    at the runs of cells the box overlaps, and clustering at any coarser cell size is
+    a single bincount over the selected rows.
+
+    Args:
+        df (pd.DataFrame): The dataset to index.
+        cell_degrees (float): Grid cell size in degrees.
+    """
+
+    def __init__(self, df, cell_degrees=GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.n_cols = int(np.ceil(360.0 / cell_degrees)) + 1
+        self.n_rows = len(df)
+        self.lat, self.lon = valid_coordinates(df)
+        positions = np.flatnonzero(~np.isnan(self.lat))
+        cells = self._cell_ids(self.lat[positions], self.lon[positions])
+        order = np.argsort(cells, kind="stable")
+        self.positions, self.cells = positions[order], cells[order]
+
+    def _cell_ids(self, lat, lon):
+        row = np.floor((lat + 90.0) / self.cell_degrees).astype(np.int64)
+        col = np.floor((lon + 180.0) / self.cell_degrees).astype(np.int64)
+        return row * self.n_cols + col
+
+    def extend(self, delta):
+        """
+        Returns the index of this dataset with the rows of ``delta`` appended.
+
+        The new rows' cells are computed and merged into the sorted cell order; the
+        existing rows are not re-gridded.
+        """
+        extended = SpatialGridIndex.__new__(SpatialGridIndex)
+        extended.cell_degrees, extended.n_cols = self.cell_degrees, self.n_cols
+        extended.n_rows = self.n_rows + len(delta)
+        lat, lon = valid_coordinates(delta)
+        extended.lat, extended.lon = np.concatenate([self.lat, lat]), np.concatenate([self.lon, lon])
+        positions = np.flatnonzero(~np.isnan(lat))
+        cells = self._cell_ids(lat[positions], lon[positions])
+        order = np.argsort(cells, kind="stable")
+        cells, positions = cells[order], positions[order] + self.n_rows
+        # New rows go after existing rows of the same cell, as if they had been indexed in order
+        at = np.searchsorted(self.cells, cells, side="right")
+        extended.cells = np.insert(self.cells, at, cells)
+        extended.positions = np.insert(self.positions, at, positions)
+        return extended
+
+    def located(self, positions):
+        """Returns the given row positions that have coordinates."""
+        positions = np.asarray(positions)
+        return positions[~np.isnan(self.lat[positions])]
+
+    def extent(self, positions):
+        """Returns the (south, north, west, east) bounds of the rows, or None if none have coordinates."""
+        positions = self.located(positions)
+        if len(positions) == 0:
+            return None
+        lat, lon = self.lat[positions], self.lon[positions]
+        return float(lat.min()), float(lat.max()), float(lon.min()), float(lon.max())
+
+    def query(self, south, north, west, east, positions=None):
+        """
+        Returns the rows inside a bounding box (edges included).
+
+        Args:
+            south, north (float): Latitude bounds.
+            west, east (float): Longitude bounds (west <= east; the box does not wrap).
+            positions (np.ndarray, optional): Only return these rows (e.g. the filtered rows).
+
+        Returns:
+            np.ndarray: Sorted row positions.
+        """
+        lat_cells = np.floor((np.clip([south, north], -90, 90) + 90.0) / self.cell_degrees).astype(np.int64)
+        lon_cells = np.floor((np.clip([west, east], -180, 180) + 180.0) / self.cell_degrees).astype(np.int64)
+        grid_rows = np.arange(lat_cells[0], lat_cells[1] + 1) * self.n_cols
+        starts = np.searchsorted(self.cells, grid_rows + lon_cells[0], side="left")
+        ends = np.searchsorted(self.cells, grid_rows + lon_cells[1], side="right")
+        candidates = np.concatenate([self.positions[start:end] for start, end in zip(starts, ends)]) \
+            if len(starts) else np.empty(0, dtype=np.int64)
+
+        # Cells on the box's edges also hold rows just outside it
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        inside = candidates[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+        if positions is not None:
+            selected = np.zeros(self.n_rows, dtype=bool)
+            selected[positions] = True
+            inside = inside[selected[inside]]
+        return np.sort(inside)
+
+    def within_radius(self, lat, lon, radius_miles, positions=None):
+        """
+        Returns the rows within a great-circle radius of a point, nearest first.
+
+        The grid narrows the search to the cells of the radius' bounding box; only
+        those candidates get an exact haversine distance.
+
+        Args:
+            lat, lon (float): Centre point in degrees.
+            radius_miles (float): Search radius in miles.
+            positions (np.ndarray, optional): Only return these rows.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Row positions and their distances in miles.
+        """
+        lat_delta = radius_miles / MILES_PER_DEGREE
+        lon_delta = min(radius_miles / (MILES_PER_DEGREE * max(np.cos(np.radians(lat)), 1e-6)), 180.0)
+        candidates = self.query(lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta, positions)
+        distances = haversine_miles(lat, lon, self.lat[candidates], self.lon[candidates])
+        inside = distances <= radius_miles
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def clusters(self, positions, cell_degrees):
+        """
+        Aggregates rows into clusters of a coarser grid.
+
+        Args:
+            positions (np.ndarray): Rows to cluster, one per well (rows without coordinates
+                are skipped).
+            cell_degrees (float): Cluster cell size in degrees (see ``cluster_cell_degrees``).
+
+        Returns:
+            pd.DataFrame: One row per occupied cluster with the centroid 'Well_Coord_Lat'
+            and 'Well_Coord_Lon' and the number of 'Wells' in it.
+        """
+        positions = self.located(positions)
+        lat, lon = self.lat[positions], self.lon[positions]
+        row = np.floor((lat + 90.0) / cell_degrees).astype(np.int64)
+        col = np.floor((lon + 180.0) / cell_degrees).astype(np.int64)
+        _, cluster = np.unique(row * (int(np.ceil(360.0 / cell_degrees)) + 1) + col, return_inverse=True)
+        cluster = cluster.ravel()
+        count = np.bincount(cluster)
+        return pd.DataFrame({
+            LAT_COLUMN: np.bincount(cluster, weights=lat) / count,
+            LON_COLUMN: np.bincount(cluster, weights=lon) / count,
+            "Wells": count,
+        })
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_spatial_index(_df, version):
+    """Returns the spatial index of a dataset version, shared across sessions."""
+    appended = split_appended(_df)
+    if appended is not None:
+        parent, parent_version, delta = appended
+        return get_spatial_index(parent, parent_version).extend(delta)
+    return SpatialGridIndex(_df)
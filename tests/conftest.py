@@ -0,0 +1,54 @@
+# conftest.py (Shared Fixtures: a Scratch Copy of the Dataset)
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+
+import ingest
+from data_loader import DATA_FILE
+
+SOURCE_CSV = os.path.join(os.path.dirname(__file__), os.pardir, DATA_FILE)
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    """Copies the dataset into a scratch directory and starts from empty process caches."""
+    path = tmp_path / DATA_FILE
+    shutil.copy(SOURCE_CSV, path)
+    st.cache_resource.clear()
+    ingest._KNOWN_KEYS.clear()
+    yield str(path)
+    st.cache_resource.clear()
+    ingest._KNOWN_KEYS.clear()
+
+
+def sample_drop(source, n_rows, first_no, tag, seed=0):
+    """
+    Returns a CSV drop of rows resampled from the dataset, made new to the ingest.
+
+    Rows get 'No' values from ``first_no`` and fresh API numbers; some get a new well
+    name, operator and TD year so the extended structures see new values too.
+    """
+    drop = source.sample(n_rows, replace=n_rows > len(source), random_state=seed).reset_index(drop=True)
+    drop["No"] = np.arange(first_no, first_no + n_rows)
+    drop["API Number"] = [f"42{first_no + i:012d}" for i in range(n_rows)]
+    drop.loc[: n_rows // 2 - 1, "Well_Name"] = [f"{tag} Well {i}" for i in range(n_rows // 2)]
+    drop.loc[: n_rows // 3 - 1, "Operator"] = f"{tag} Operator"
+    drop.loc[: n_rows // 4 - 1, "TD_Date"] = "01-05-2031"
+    return drop
+
+
+def write_drop(directory, name, drop):
+    """Writes a drop next to the dataset and returns its path."""
+    path = os.path.join(directory, name)
+    drop.to_csv(path, index=False)
+    return path
+
+
+def first_new_no(path):
+    """Returns the first 'No' above every row of the source file."""
+    return int(pd.to_numeric(pd.read_csv(path)["No"], errors="coerce").max()) + 1
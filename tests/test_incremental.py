@@ -0,0 +1,111 @@
+# test_incremental.py (Ingested Rows Extend Every Per-Version Structure Like a Rebuild)
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import first_new_no, sample_drop, write_drop
+from data_loader import dataset_version, load_well_data, split_appended
+from filter_index import FilterIndex, get_filter_index
+from ingest import ingest_csv
+from kpi_engine import KPI_COLUMNS, KPI_REGISTRY, get_kpi_columns
+from metric_registry import DerivedColumnCache
+from olap_cube import OlapCube, get_olap_cube
+from search_index import build_search_index, get_search_index
+from spatial_index import SpatialGridIndex, get_spatial_index
+from well_summary import WellSummary, get_well_summary
+
+# Manual KPI parameters the derived columns are computed (and extended) with
+KPI_PARAMS = {"total_flow_rate": 800, "number_of_screens": 4, "screen_area": 6}
+
+ROWS_PER_DROP = 200
+
+
+def assert_same(incremental, rebuilt, name):
+    """Asserts two structures hold the same values, recursing into dicts, sequences and arrays."""
+    if isinstance(incremental, dict):
+        assert list(incremental) == list(rebuilt), f"{name}: keys differ"
+        for key in incremental:
+            assert_same(incremental[key], rebuilt[key], f"{name}[{key!r}]")
+    elif isinstance(incremental, (list, tuple)):
+        assert len(incremental) == len(rebuilt), f"{name}: lengths differ"
+        for i, (a, b) in enumerate(zip(incremental, rebuilt)):
+            assert_same(a, b, f"{name}[{i}]")
+    elif isinstance(incremental, pd.DataFrame):
+        pd.testing.assert_frame_equal(incremental, rebuilt, check_dtype=False, obj=name)
+    else:
+        a, b = np.asarray(incremental), np.asarray(rebuilt)
+        same = a.shape == b.shape and (np.allclose(a, b, rtol=1e-9, equal_nan=True) if a.dtype.kind in "fc"
+                                       else np.array_equal(a, b))
+        assert same, f"{name}: values differ"
+
+
+@pytest.fixture(params=[False, True], ids=["standard", "compact"])
+def appended(request, data_path):
+    """
+    The dataset with two drops ingested, loaded after every structure was built for the
+    base version, so the structures of the appended versions go through ``extend``.
+    """
+    compact = request.param
+    base = load_well_data(data_path, compact=compact)
+    base_version = dataset_version(base)
+    for build in (get_filter_index, get_search_index, get_well_summary, get_olap_cube, get_spatial_index):
+        build(base, base_version)
+    get_kpi_columns(base, base_version).frame(KPI_COLUMNS, KPI_PARAMS)
+
+    source, first_no = pd.read_csv(data_path), first_new_no(data_path)
+    for i, tag in enumerate(["Check A", "Check B"]):
+        drop = sample_drop(source, ROWS_PER_DROP, first_no + i * ROWS_PER_DROP, tag, seed=i)
+        result = ingest_csv(write_drop(os.path.dirname(data_path), f"drop-{i}.csv", drop), data_path)
+        assert result.added == ROWS_PER_DROP
+
+    df = load_well_data(data_path, compact=compact)
+    assert split_appended(df) is not None
+    assert len(df) == len(base) + 2 * ROWS_PER_DROP
+    return df
+
+
+@pytest.fixture
+def positions(appended):
+    return np.flatnonzero(np.random.default_rng(0).random(len(appended)) < 0.4)
+
+
+def test_filter_index_extends_like_a_rebuild(appended):
+    index, rebuilt = get_filter_index(appended, dataset_version(appended)), FilterIndex(appended)
+    for attr in ["values", "codes", "value_masks", "year_masks", "depth_masks", "amw_masks"]:
+        assert_same(getattr(index, attr), getattr(rebuilt, attr), f"FilterIndex.{attr}")
+    assert_same(index.facet_counts(index.all_rows()), rebuilt.facet_counts(index.all_rows()),
+                "FilterIndex.facet_counts")
+
+
+def test_search_index_extends_like_a_rebuild(appended):
+    assert_same(get_search_index(appended, dataset_version(appended)).text.astype(str).tolist(),
+                build_search_index(appended).text.astype(str).tolist(), "SearchIndex.text")
+
+
+def test_well_summary_extends_like_a_rebuild(appended, positions):
+    summary, rebuilt = get_well_summary(appended, dataset_version(appended)), WellSummary(appended)
+    assert_same(summary.table, rebuilt.table, "WellSummary.table")
+    assert_same(summary.summarize(positions), rebuilt.summarize(positions), "WellSummary.summarize")
+
+
+def test_olap_cube_extends_like_a_rebuild(appended):
+    # Merged cells may be ordered differently; their roll-ups must match
+    cube, rebuilt = get_olap_cube(appended, dataset_version(appended)), OlapCube(appended, FilterIndex(appended))
+    for dim in cube.cells.dims:
+        assert_same(cube.cells.rollup(dim, ["ROP", "IntLength"]), rebuilt.cells.rollup(dim, ["ROP", "IntLength"]),
+                    f"OlapCube.rollup({dim!r})")
+
+
+def test_kpi_columns_extend_like_a_rebuild(appended):
+    kpis = get_kpi_columns(appended, dataset_version(appended))
+    assert_same(kpis.frame(KPI_COLUMNS, KPI_PARAMS),
+                DerivedColumnCache(appended, KPI_REGISTRY).frame(KPI_COLUMNS, KPI_PARAMS), "DerivedColumnCache.frame")
+
+
+def test_spatial_index_extends_like_a_rebuild(appended):
+    grid, rebuilt = get_spatial_index(appended, dataset_version(appended)), SpatialGridIndex(appended)
+    for attr in ["lat", "lon", "cells", "positions"]:
+        assert_same(getattr(grid, attr), getattr(rebuilt, attr), f"SpatialGridIndex.{attr}")
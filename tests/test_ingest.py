@@ -0,0 +1,86 @@
+# test_ingest.py (Incremental Ingestion and the Durability of Ingested Rows)
+
+import json
+import os
+import shutil
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+import ingest
+from conftest import first_new_no, sample_drop, write_drop
+from data_loader import cache_dir_for, ingested_path, load_well_data, split_appended
+from ingest import ingest_csv
+
+
+@pytest.fixture
+def ingested(data_path):
+    """Ingests a drop, plus a second drop mixing new rows, old rows and repeated API numbers."""
+    directory = os.path.dirname(data_path)
+    source, first_no = pd.read_csv(data_path), first_new_no(data_path)
+    drop = sample_drop(source, 100, first_no, "A")
+    assert ingest_csv(write_drop(directory, "drop-1.csv", pd.concat([drop, source.tail(20)])), data_path) == \
+        ingest.IngestResult(100, 20, 0, {})
+    repeated = drop.head(5).assign(No=range(first_no + 1000, first_no + 1005))
+    second = pd.concat([sample_drop(source, 50, first_no + 100, "B", seed=1), repeated])
+    assert ingest_csv(write_drop(directory, "drop-2.csv", second), data_path) == ingest.IngestResult(50, 0, 5, {})
+    return load_well_data(data_path)
+
+
+def reload(path):
+    st.cache_resource.clear()
+    ingest._KNOWN_KEYS.clear()
+    return load_well_data(path)
+
+
+def test_ingest_appends_only_new_rows(data_path, ingested):
+    base = pd.read_csv(data_path)
+    assert len(ingested) == len(base) + 150
+    assert split_appended(ingested) is not None
+    assert len(pd.read_csv(ingested_path(data_path))) == 150
+    # Re-ingesting a drop adds nothing
+    result = ingest_csv(os.path.join(os.path.dirname(data_path), "drop-1.csv"), data_path)
+    assert result.added == 0 and result.below_watermark == 120
+
+
+def test_ingested_rows_survive_a_cleared_cache(data_path, ingested):
+    shutil.rmtree(cache_dir_for(data_path))
+    pd.testing.assert_frame_equal(reload(data_path), ingested)
+
+
+def test_ingested_rows_are_revalidated_against_a_new_base(data_path, ingested):
+    with open(data_path, "rb") as fh:
+        original = fh.read()
+    with open(ingested_path(data_path), "rb") as fh:
+        rows_file = fh.read()
+
+    # A corrected base keeps every ingested row
+    with open(data_path, "wb") as fh:
+        fh.write(original.replace(b"PERMIAN", b"Permian", 1))
+    assert len(reload(data_path)) == len(ingested)
+
+    # A base that already holds the ingested rows does not get them twice
+    pd.concat([pd.read_csv(data_path), pd.read_csv(ingested_path(data_path))]).to_csv(data_path, index=False)
+    df = reload(data_path)
+    assert len(df) == len(ingested) and split_appended(df) is None
+    with open(ingested_path(data_path), "rb") as fh:
+        assert fh.read() == rows_file
+
+    # Going back to the original base brings them back
+    with open(data_path, "wb") as fh:
+        fh.write(original)
+    pd.testing.assert_frame_equal(reload(data_path), ingested)
+
+
+def test_parts_of_an_older_log_move_to_the_ingested_rows_file(data_path, ingested):
+    cache_dir = cache_dir_for(data_path)
+    with open(os.path.join(cache_dir, "ingest.json")) as fh:
+        log = json.load(fh)
+    log.pop("ingested")
+    with open(os.path.join(cache_dir, "ingest.json"), "w") as fh:
+        json.dump(log, fh)
+    os.remove(ingested_path(data_path))
+
+    pd.testing.assert_frame_equal(reload(data_path), ingested)
+    assert len(pd.read_csv(ingested_path(data_path))) == 150
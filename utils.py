@@ -1,79 +1,238 @@
 # utils.py (Shared Utility Functions)
 
+from collections import namedtuple
+
+import numpy as np
 import streamlit as st
-import pandas as pd
 
-def apply_shared_filters(df):
+from caching import BoundedLRUCache
+from data_loader import dataset_version
+from search_index import get_search_index
+from filter_index import SELECT_FILTER_COLUMNS, DEPTH_BINS, MW_BINS, get_filter_index
+from partitions import SCOPE_SELECT_COLUMNS
+
+# Row positions selected by a filter state, plus the options (and counts) each widget showed for it
+FilterResult = namedtuple("FilterResult", ["positions", "options"])
+
+# Rows selected by the shared filters and the normalized state that selected them
+SharedFilterSelection = namedtuple("SharedFilterSelection", ["positions", "state"])
+
+
+def _filter_result_size(result):
+    """Approximate memory held by a cached FilterResult, in bytes."""
+    option_count = sum(len(opts) for opts in result.options.values() if isinstance(opts, dict))
+    return result.positions.nbytes + 64 * option_count
+
+
+@st.cache_resource
+def get_filter_result_cache():
+    """Returns the LRU cache of shared-filter results, shared by every session."""
+    return BoundedLRUCache(max_entries=512, max_bytes=64 * 1024 * 1024, sizeof=_filter_result_size)
+
+
+def chart_fragment(func):
     """
-    Applies a set of common filters to the DataFrame based on sidebar selections.
+    Runs a chart section as a Streamlit fragment, so its own widgets rerun only that
+    section instead of the whole page (loading, shared filters and every other chart).
+
+    Uses ``st.fragment``, or ``st.experimental_fragment`` on older Streamlit; without
+    either the section is a plain function and reruns with the page as before.
+    Fragments must not write to the sidebar.
 
     Args:
-        df (pd.DataFrame): The input DataFrame to filter.
+        func (callable): The chart section.
 
     Returns:
-        pd.DataFrame: The filtered DataFrame.
+        callable: The section, rendered as a fragment when supported.
+    """
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return fragment(func) if fragment is not None else func
+
+
+def facet_label(counts, unit="wells"):
+    """Returns a selectbox format_func that shows each value's count, e.g. 'Chevron (12 wells)'."""
+    return lambda value: f"{value} ({counts[value]:,} {unit})" if value in counts else value
+
+
+def _normalize_search(term, prefix_only):
+    term = term.strip().lower()
+    return (term, bool(prefix_only) and bool(term))
+
+
+def _filter_state_from_session(index):
+    """
+    Reads the shared-filter selections from session state before the widgets render.
+
+    Streamlit stores each keyed widget's value before the rerun starts, so this is
+    the state the widgets are about to return unless their options have changed.
+    """
+    state = {"search": _normalize_search(str(st.session_state.get("search_filter", "")),
+                                         st.session_state.get("search_prefix", False))}
+    for col in SELECT_FILTER_COLUMNS:
+        if col in index.values:
+            state[f"filter_{col}"] = st.session_state.get(f"filter_{col}", "All")
+    year_range = st.session_state.get("filter_td_date")
+    state["filter_td_date"] = tuple(int(year) for year in year_range) if year_range else None
+    state["filter_depth"] = st.session_state.get("filter_depth", "All")
+    state["filter_amw"] = st.session_state.get("filter_amw", "All")
+    return state
+
+
+def filter_state_key(state):
+    """Returns a hashable, order-independent key for a shared filter state."""
+    return tuple(sorted(state.items()))
+
+
+def _selection_mask(df, version, index, key, value):
+    """Returns the row mask for one filter selection, or None if it selects everything."""
+    if key == "search":
+        term, prefix_only = value
+        return get_search_index(df, version).search(term, prefix=prefix_only) if term else None
+    if value is None or value == "All":
+        return None
+    if key == "filter_td_date":
+        return index.year_range_mask(value[0], value[1])
+    if key == "filter_depth":
+        return index.depth_masks[value]
+    if key == "filter_amw":
+        return index.amw_masks[value]
+    return index.value_mask(key[len("filter_"):], value)
+
+
+def shared_filter_selection(df):
+    """
+    Renders the shared sidebar filters and resolves them to row positions.
+
+    Results are memoized in a cache shared across pages and sessions, keyed by the
+    dataset version and the normalized filter state. On a hit the widgets are rendered
+    from the cached options and no masks are evaluated at all; if a widget returns a
+    value other than the one looked up, the remaining filters are computed from the
+    precomputed mask index and the result is cached under the actual state.
+
+    Args:
+        df (pd.DataFrame): The full dataset, as returned by ``load_well_data``.
+
+    Returns:
+        SharedFilterSelection: Positions of the selected rows in ``df`` and the filter state.
     """
     st.sidebar.header("📊 Shared Filters")
-    
+
+    version = dataset_version(df)
+    index = get_filter_index(df, version)
+    cache = get_filter_result_cache()
+    assumed = _filter_state_from_session(index)
+    cached = cache.get((version, filter_state_key(assumed)))
+
+    state, options = {}, {}
+    # mask stays None while every widget agrees with the cached state
+    mask = None if cached is not None else index.all_rows()
+
+    def narrow(key, value):
+        nonlocal mask
+        state[key] = value
+        if mask is None and value != assumed.get(key):
+            mask = index.all_rows()
+            for applied_key, applied_value in state.items():
+                applied = _selection_mask(df, version, index, applied_key, applied_value)
+                if applied is not None:
+                    mask &= applied
+        elif mask is not None:
+            applied = _selection_mask(df, version, index, key, value)
+            if applied is not None:
+                mask &= applied
+
     # Search functionality across all columns
     search_term = st.sidebar.text_input("🔍 Search Anything", key="search_filter").lower()
-    filtered = df.copy()
-
-    if search_term:
-        # Apply search across all string-convertible columns
-        filtered = filtered[filtered.apply(lambda row: row.astype(str).str.lower().str.contains(search_term).any(), axis=1)]
+    prefix_only = st.sidebar.checkbox("Match word starts only", key="search_prefix")
+    narrow("search", _normalize_search(search_term, prefix_only))
 
     # Selectbox filters for categorical columns
-    for col in ["Operator", "Contractor", "flowline_Shakers", "Hole_Size"]:
-        if col in filtered.columns:
-            options = sorted(filtered[col].dropna().astype(str).unique().tolist())
-            selected = st.sidebar.selectbox(col, ["All"] + options, key=f"filter_{col}") # Unique key for each selectbox
-            if selected != "All":
-                filtered = filtered[filtered[col].astype(str) == selected]
+    for col in SELECT_FILTER_COLUMNS:
+        if col in index.values:
+            key = f"filter_{col}"
+            options[key] = cached.options[key] if mask is None else index.facet_counts(mask, [col])[col]
+            selected = st.sidebar.selectbox(col, ["All"] + list(options[key]), key=key, # Unique key for each selectbox
+                                            format_func=facet_label(options[key]))
+            narrow(key, selected)
 
     # Date range slider for 'TD_Date'
-    if "TD_Date" in filtered.columns and not filtered["TD_Date"].empty:
-        filtered["TD_Date"] = pd.to_datetime(filtered["TD_Date"], errors="coerce")
-        # Get min/max year from data, or use a default range if data is empty
-        min_year = int(filtered["TD_Date"].dt.year.min()) if not filtered["TD_Date"].empty and pd.notna(filtered["TD_Date"].dt.year.min()) else 2020
-        max_year = int(filtered["TD_Date"].dt.year.max()) if not filtered["TD_Date"].empty and pd.notna(filtered["TD_Date"].dt.year.max()) else 2026
-        
-        # Ensure slider range is valid
-        if min_year > max_year:
-            # Fallback if data years are problematic or single year
-            min_year, max_year = 2020, 2026 
-            if not filtered["TD_Date"].empty:
-                min_year = int(filtered["TD_Date"].dt.year.min())
-                max_year = int(filtered["TD_Date"].dt.year.max())
-                if min_year == max_year: # If only one year, make range 1 year
-                    min_year -= 1
-                    max_year += 1
-
+    if mask is None:
+        options["filter_td_date"] = cached.options["filter_td_date"]
+    elif "TD_Date" in df.columns and mask.any():
+        # Get min/max year from the remaining rows, or use a default range if they have no dates
+        bounds = index.year_bounds(mask)
+        min_year, max_year = bounds if bounds else (2020, 2026)
+        if min_year == max_year: # If only one year, make range 1 year either side
+            min_year -= 1
+            max_year += 1
+        options["filter_td_date"] = (min_year, max_year)
+    else:
+        options["filter_td_date"] = None
+    if options["filter_td_date"] is not None:
+        min_year, max_year = options["filter_td_date"]
         year_range = st.sidebar.slider("TD Date Range", min_year, max_year, (min_year, max_year), key="filter_td_date")
-        filtered = filtered[(filtered["TD_Date"].dt.year >= year_range[0]) & (filtered["TD_Date"].dt.year <= year_range[1])]
-
-    # Depth bin selection for 'MD Depth'
-    if "MD Depth" in filtered.columns and not filtered["MD Depth"].empty:
-        depth_bins = {
-            "<5000 ft": (0, 5000), "5000–10000 ft": (5000, 10000),
-            "10000–15000 ft": (10000, 15000), "15000–20000 ft": (15000, 20000),
-            "20000–25000 ft": (20000, 25000), ">25000 ft": (25000, float("inf"))
-        }
-        selected_depth = st.sidebar.selectbox("Depth", ["All"] + list(depth_bins.keys()), key="filter_depth")
-        if selected_depth != "All":
-            low, high = depth_bins[selected_depth]
-            filtered = filtered[(filtered["MD Depth"] >= low) & (filtered["MD Depth"] < high)]
-
-    # Mud Weight bin selection for 'AMW'
-    if "AMW" in filtered.columns and not filtered["AMW"].empty:
-        mw_bins = {
-            "<3": (0, 3), "3–6": (3, 6), "6–9": (6, 9),
-            "9–11": (9, 11), "11–14": (11, 14), "14–30": (14, 30)
-        }
-        selected_mw = st.sidebar.selectbox("Average Mud Weight", ["All"] + list(mw_bins.keys()), key="filter_amw")
-        if selected_mw != "All":
-            low, high = mw_bins[selected_mw]
-            filtered = filtered[(filtered["AMW"] >= low) & (filtered["AMW"] < high)]
-
-    return filtered
+        narrow("filter_td_date", (int(year_range[0]), int(year_range[1])))
+    else:
+        narrow("filter_td_date", None)
+
+    # Depth and Mud Weight bins for 'MD Depth' and 'AMW'
+    for key, col, label, bins in [("filter_depth", "MD Depth", "Depth", DEPTH_BINS),
+                                  ("filter_amw", "AMW", "Average Mud Weight", MW_BINS)]:
+        options[key] = cached.options[key] if mask is None else (col in df.columns and bool(mask.any()))
+        selected = st.sidebar.selectbox(label, ["All"] + list(bins.keys()), key=key) if options[key] else "All"
+        narrow(key, selected)
+
+    if mask is None:
+        positions = cached.positions
+    else:
+        positions = np.flatnonzero(mask)
+        cache.put((version, filter_state_key(state)), FilterResult(positions, options))
+
+    return SharedFilterSelection(positions, state)
+
+
+def data_scope_selection(catalog):
+    """
+    Renders the sidebar filters choosing which partitions of the dataset are loaded.
+
+    Each dropdown lists the values (and row counts) of the partitions left by the
+    dropdowns above it, read from the partition catalog without loading any rows.
+
+    Args:
+        catalog (PartitionCatalog): Catalog of the partitioned dataset.
 
+    Returns:
+        dict: The scope to pass to ``load_scoped_data``.
+    """
+    st.sidebar.header("🗺️ Data Scope")
+    scope = {}
+    for col in SCOPE_SELECT_COLUMNS:
+        counts = catalog.value_counts(col, scope)
+        scope[col] = st.sidebar.selectbox(col, ["All"] + list(counts), key=f"scope_{col}",
+                                          format_func=facet_label(counts, "rows"))
+
+    years = list(catalog.value_counts("TD Year", scope))
+    scope["TD Year"] = None
+    if len(years) > 1:
+        year_range = st.sidebar.slider("TD Year", years[0], years[-1], (years[0], years[-1]), key="scope_td_year")
+        # The full range also keeps undated rows
+        if tuple(year_range) != (years[0], years[-1]):
+            scope["TD Year"] = (int(year_range[0]), int(year_range[1]))
+
+    selected = catalog.select(scope)
+    st.sidebar.caption(f"Loading {sum(entry['rows'] for entry in selected):,} of {catalog.rows():,} rows "
+                       f"({len(selected)} of {len(catalog)} partitions)")
+    return scope
+
+
+def apply_shared_filters(df):
+    """
+    Applies a set of common filters to the DataFrame based on sidebar selections.
+
+    Args:
+        df (pd.DataFrame): The input DataFrame to filter.
+
+    Returns:
+        pd.DataFrame: The filtered DataFrame.
+    """
+    return df.iloc[shared_filter_selection(df).positions]
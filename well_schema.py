@@ -0,0 +1,127 @@
+# well_schema.py (Declared Schema for the Well CSV)
+
+import pandas as pd
+
+# Column name -> dtype for every column of 'Refine Sample.csv'.
+# Always-present identifiers are int64, metrics and the sparse county/state codes are
+# float64 and free-text fields are strings. 'API Number' stays text: as a float it loses precision.
+WELL_SCHEMA = {
+    "No": "int64",
+    "Well_Job_ID": "int64",
+    "API Number": str,
+    "Operator": str,
+    "Contractor": str,
+    "DSRE": "float64",
+    "DSR": "float64",
+    "TMLDR": "float64",
+    "Discard Ratio": "float64",
+    "TLML": "float64",
+    "Down_Loss": "float64",
+    "Evap_Loss": "float64",
+    "Total_SCE": "float64",
+    "Total_Dil": "float64",
+    "ROP": "float64",
+    "Temp": "float64",
+    "Well_Name": str,
+    "Well_Coord_Lon": "float64",
+    "Well_Coord_Lat": "float64",
+    "flowline_Shakers": str,
+    "DOW": "int64",
+    "IntLength": "float64",
+    "AMW": "float64",
+    "Drilling_Hours": "float64",
+    "Haul_OFF": "float64",
+    "Base_Oil": "float64",
+    "Water": "float64",
+    "Weight_Material": "float64",
+    "Chemicals": "float64",
+    "Reserve_Adds": "float64",
+    "TD_Date": "datetime64[ns]",
+    "Hole_Size": "float64",
+    "Dilution_Ratio": "float64",
+    "Dil_Per_Hole_Vol_Ratio": "float64",
+    "Solids_Generated": "float64",
+    "Average_LGS%": "float64",
+    "IsReviewed": "int64",
+    "Basin": str,
+    "DI Basin": str,
+    "AAPG Geologic Province": str,
+    "MD Depth": "float64",
+    "County Code": "float64",
+    "State Code": "float64",
+}
+
+# Date formats tried in order. Dates are written dd-mm-YYYY; rows that went through
+# a spreadsheet with day <= 12 come back as 'd/m/YYYY 0:00'.
+DATE_FORMATS = {
+    "TD_Date": ["%d-%m-%Y", "%d/%m/%Y %H:%M"],
+}
+
+
+def _parse_dates(series, formats):
+    """Parses a string column with a fixed list of formats, no inference."""
+    parsed = pd.to_datetime(series, format=formats[0], errors="coerce")
+    for fmt in formats[1:]:
+        remaining = parsed.isna() & series.notna()
+        if not remaining.any():
+            break
+        parsed[remaining] = pd.to_datetime(series[remaining], format=fmt, errors="coerce")
+    return parsed
+
+
+def read_well_csv(path_or_buffer):
+    """
+    Parses a well CSV in one pass using the declared WELL_SCHEMA.
+
+    Numeric columns are read directly with their declared dtypes. If a column holds
+    values that cannot be converted, it is re-read as text and coerced, with the
+    unconvertible values set to missing and counted.
+
+    Args:
+        path_or_buffer (str | file-like): CSV path or open buffer.
+
+    Returns:
+        tuple[pd.DataFrame, dict]: The parsed DataFrame and a mapping of column name
+        to the number of values that failed to convert (only columns with errors).
+    """
+    date_cols = [col for col, dtype in WELL_SCHEMA.items() if dtype == "datetime64[ns]"]
+    read_dtypes = {col: (str if col in date_cols else dtype) for col, dtype in WELL_SCHEMA.items()}
+    if hasattr(path_or_buffer, "seek"):
+        start = path_or_buffer.tell()
+
+    parse_errors = {}
+    try:
+        df = pd.read_csv(path_or_buffer, dtype=read_dtypes)
+    except (ValueError, TypeError):
+        # At least one numeric column holds bad values: read numerics as text and coerce
+        if hasattr(path_or_buffer, "seek"):
+            path_or_buffer.seek(start)
+        df = pd.read_csv(path_or_buffer, dtype={col: str for col in read_dtypes})
+        for col, dtype in read_dtypes.items():
+            if col not in df.columns or dtype not in ("float64", "int64"):
+                continue
+            raw = df[col].str.strip()
+            converted = pd.to_numeric(raw, errors="coerce")
+            failed = int((converted.isna() & raw.notna() & (raw != "")).sum())
+            if failed:
+                parse_errors[col] = failed
+            if dtype == "int64":
+                fractional = converted.notna() & (converted % 1 != 0)
+                if fractional.any():
+                    parse_errors[col] = parse_errors.get(col, 0) + int(fractional.sum())
+                    converted[fractional] = float("nan")
+                # Integer identifiers with dropped values fall back to the nullable type
+                dtype = "Int64" if converted.isna().any() else dtype
+            df[col] = converted.astype(dtype)
+
+    for col in date_cols:
+        if col not in df.columns:
+            continue
+        raw = df[col]
+        parsed = _parse_dates(raw, DATE_FORMATS.get(col, ["%Y-%m-%d"]))
+        failed = int((parsed.isna() & raw.notna()).sum())
+        if failed:
+            parse_errors[col] = failed
+        df[col] = parsed.astype("datetime64[ns]")
+
+    return df, parse_errors
@@ -0,0 +1,234 @@
+# well_summary.py (Materialized Per-Well Aggregate Table)
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import split_appended
+from spatial_index import LAT_COLUMN, LON_COLUMN, valid_coordinates
+
+# Columns summed per well (volumes, footage and hours); every other metric is averaged
+SUM_COLUMNS = ["IntLength", "Total_Dil", "Haul_OFF", "Drilling_Hours", "Base_Oil", "Water", "Chemicals"]
+SUM_SUFFIX = " Sum"
+
+# Numeric columns that are identifiers or codes rather than metrics
+NON_METRIC_COLUMNS = ["No", "Well_Job_ID", "DOW", "IsReviewed", "County Code", "State Code",
+                      "Well_Coord_Lon", "Well_Coord_Lat"]
+
+COORD_COLUMNS = [LAT_COLUMN, LON_COLUMN]
+
+
+# Sentinels for "no date yet" in the running first / last TD date (int64 nanoseconds)
+_NAT = np.iinfo(np.int64).min
+_NO_FIRST_DATE = np.iinfo(np.int64).max
+
+# Value of each aggregate for a well without rows (everything else starts at 0)
+_EMPTY_AGGREGATES = {"first": -1, "First TD_Date": _NO_FIRST_DATE, "Last TD_Date": _NAT}
+
+
+def _column_values(df, columns, coord_columns):
+    """Returns float arrays of the columns; coordinates are NaN where the map would skip them."""
+    values = {col: df[col].to_numpy(dtype="float64", na_value=np.nan) for col in columns}
+    if coord_columns:
+        # Out-of-range and (0, 0) placeholder coordinates must not pull the well means
+        values.update((col, coords) for col, coords in zip([LAT_COLUMN, LON_COLUMN], valid_coordinates(df))
+                      if col in coord_columns)
+    return values
+
+
+def _move_wells(aggregates, codes, n_wells):
+    """Places per-well aggregates at new well codes in arrays of n_wells (other wells empty)."""
+    def move(key, values):
+        moved = np.full(n_wells, _EMPTY_AGGREGATES.get(key, 0), dtype=values.dtype)
+        moved[codes] = values
+        return moved
+    return {key: tuple(move(key, part) for part in values) if isinstance(values, tuple) else move(key, values)
+            for key, values in aggregates.items()}
+
+
+def _merge_aggregates(a, b):
+    """Combines the aggregates of two disjoint sets of rows (``a``'s rows come first)."""
+    merged = {}
+    for key, values in a.items():
+        if key == "first":
+            merged[key] = np.where(values >= 0, values, b[key])
+        elif key == "First TD_Date":
+            merged[key] = np.minimum(values, b[key])
+        elif key == "Last TD_Date":
+            merged[key] = np.maximum(values, b[key])
+        elif isinstance(values, tuple):
+            merged[key] = tuple(x + y for x, y in zip(values, b[key]))
+        else:
+            merged[key] = values + b[key]
+    return merged
+
+
+class WellSummary:
+    """
+    Per-well aggregates of one dataset version.
+
+    The summary of all rows is materialized once as ``table``. Any filtered view is
+    derived from the same per-row well codes with weighted bincounts, so it matches
+    regrouping the filtered rows without touching the raw table. The table is kept
+    as additive aggregates (row counts, sums and value counts, first row and date
+    bounds), so appended rows are merged in without revisiting earlier ones.
+
+    The table is indexed by 'Well_Name' and has 'Rows', 'Operator' (of the first row),
+    the mean of every metric column, '<col> Sum' for SUM_COLUMNS, 'First TD_Date',
+    'Last TD_Date' and the mean well coordinates. Missing values (and invalid
+    coordinates, as on the map) are skipped.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.codes, self.wells = pd.factorize(df["Well_Name"], sort=True)
+        self.wells = pd.Index(self.wells.astype(str), name="Well_Name")
+        self.operators = df["Operator"].astype(str).to_numpy() if "Operator" in df.columns else None
+        numeric = df.select_dtypes(include="number").columns
+        self.mean_columns = [col for col in numeric if col not in NON_METRIC_COLUMNS]
+        self.sum_columns = [col for col in SUM_COLUMNS if col in numeric]
+        self.coord_columns = [col for col in COORD_COLUMNS if col in numeric]
+        self.values = _column_values(df, dict.fromkeys(self.mean_columns + self.sum_columns + self.coord_columns),
+                                     self.coord_columns)
+        self.dates = df["TD_Date"].to_numpy(dtype="datetime64[ns]") if "TD_Date" in df.columns else None
+        self._totals = self._aggregate(np.flatnonzero(self.codes >= 0))
+        self.table = self._table(self._totals)
+
+    def summarize(self, positions=None):
+        """
+        Returns the per-well summary of the given rows.
+
+        Args:
+            positions (np.ndarray, optional): Row positions (e.g. from the shared filters).
+                Defaults to every row, which returns the materialized table.
+
+        Returns:
+            pd.DataFrame: One row per well present in the selection, sorted by well name.
+        """
+        if positions is None or len(positions) == self.n_rows:
+            return self.table
+        positions = np.asarray(positions)
+        return self._table(self._aggregate(positions[self.codes[positions] >= 0]))
+
+    def first_rows(self, positions):
+        """
+        Returns one row per well: the first of the given rows of each well.
+
+        Args:
+            positions (np.ndarray): Sorted row positions.
+
+        Returns:
+            np.ndarray: Sorted row positions, one per named well present.
+        """
+        positions = np.asarray(positions)
+        positions = positions[self.codes[positions] >= 0]
+        _, first = np.unique(self.codes[positions], return_index=True)
+        return np.sort(positions[first])
+
+    def extend(self, delta):
+        """
+        Returns the summary of this dataset with the rows of ``delta`` appended.
+
+        The appended rows are aggregated on their own and merged into the existing
+        per-well aggregates (remapped where new wells sort between existing ones).
+
+        Args:
+            delta (pd.DataFrame): The appended rows (same columns as the summarized rows).
+
+        Returns:
+            WellSummary: A new summary; this one is left unchanged.
+        """
+        n_old = self.n_rows
+        delta_codes, delta_wells = pd.factorize(delta["Well_Name"], sort=True)
+        delta_wells = pd.Index(delta_wells.astype(str))
+        wells = self.wells.union(delta_wells)
+        old_codes, new_codes = wells.get_indexer(self.wells), wells.get_indexer(delta_wells)
+
+        extended = WellSummary.__new__(WellSummary)
+        extended.n_rows = n_old + len(delta)
+        extended.codes = np.concatenate([np.append(old_codes, -1)[self.codes], np.append(new_codes, -1)[delta_codes]])
+        extended.wells = pd.Index(wells, name="Well_Name")
+        extended.operators = None if self.operators is None else \
+            np.concatenate([self.operators, delta["Operator"].astype(str).to_numpy()])
+        extended.mean_columns, extended.sum_columns = self.mean_columns, self.sum_columns
+        extended.coord_columns = self.coord_columns
+        delta_values = _column_values(delta, self.values, self.coord_columns)
+        extended.values = {col: np.concatenate([values, delta_values[col]]) for col, values in self.values.items()}
+        extended.dates = None if self.dates is None else \
+            np.concatenate([self.dates, delta["TD_Date"].to_numpy(dtype="datetime64[ns]")])
+
+        appended = np.arange(n_old, extended.n_rows)
+        extended._totals = _merge_aggregates(_move_wells(self._totals, old_codes, len(wells)),
+                                             extended._aggregate(appended[extended.codes[appended] >= 0]))
+        extended.table = extended._table(extended._totals)
+        return extended
+
+    def _aggregate(self, positions):
+        """Returns the additive per-well aggregates of the given rows (all with a well name)."""
+        codes = self.codes[positions]
+        n_wells = len(self.wells)
+        aggregates = {"Rows": np.bincount(codes, minlength=n_wells)}
+        # Position of each well's first row
+        first = np.full(n_wells, -1)
+        present, first_index = np.unique(codes, return_index=True)
+        first[present] = positions[first_index]
+        aggregates["first"] = first
+
+        def grouped_sum(values):
+            valid = ~np.isnan(values)
+            return (np.bincount(codes[valid], weights=values[valid], minlength=n_wells),
+                    np.bincount(codes[valid], minlength=n_wells))
+
+        for col in dict.fromkeys(self.mean_columns + self.coord_columns):
+            aggregates[col] = grouped_sum(self.values[col][positions])
+        for col in self.sum_columns:
+            values = self.values[col][positions]
+            aggregates[col + SUM_SUFFIX] = np.bincount(codes, weights=np.nan_to_num(values), minlength=n_wells)
+        if self.dates is not None:
+            # Dates as int64 nanoseconds, where NaT is the smallest int64
+            dates = self.dates[positions].astype(np.int64)
+            valid = dates != _NAT
+            first_date = np.full(n_wells, _NO_FIRST_DATE)
+            last_date = np.full(n_wells, _NAT)
+            np.minimum.at(first_date, codes[valid], dates[valid])
+            np.maximum.at(last_date, codes[valid], dates[valid])
+            aggregates["First TD_Date"] = first_date
+            aggregates["Last TD_Date"] = last_date
+        return aggregates
+
+    def _table(self, aggregates):
+        """Turns per-well aggregates into the summary table (wells without rows dropped)."""
+        n_wells = len(self.wells)
+        rows = aggregates["Rows"]
+        summary = {"Rows": rows}
+        if self.operators is not None:
+            first = aggregates["first"]
+            summary["Operator"] = np.where(first >= 0, self.operators[first], None)
+
+        def mean(col):
+            totals, counts = aggregates[col]
+            return np.divide(totals, counts, out=np.full(n_wells, np.nan), where=counts > 0)
+
+        for col in self.mean_columns:
+            summary[col] = mean(col)
+        for col in self.sum_columns:
+            summary[col + SUM_SUFFIX] = aggregates[col + SUM_SUFFIX]
+        if self.dates is not None:
+            first_date = aggregates["First TD_Date"].copy()
+            first_date[first_date == _NO_FIRST_DATE] = _NAT
+            summary["First TD_Date"] = first_date.astype("datetime64[ns]")
+            summary["Last TD_Date"] = aggregates["Last TD_Date"].astype("datetime64[ns]")
+        for col in self.coord_columns:
+            summary[col] = mean(col)
+
+        return pd.DataFrame(summary, index=self.wells)[rows > 0]
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_well_summary(_df, version):
+    """Returns the per-well summary of a dataset version, shared across sessions."""
+    appended = split_appended(_df)
+    if appended is not None:
+        parent, parent_version, delta = appended
+        return get_well_summary(parent, parent_version).extend(delta)
+    return WellSummary(_df)